@@ -5,18 +5,70 @@ import json
 import google.generativeai as genai
 from datetime import datetime, timedelta
 import base64
+import hashlib
 import os
 import re
 import time
-import unicodedata
-from html import escape as html_escape
 from dotenv import load_dotenv
 from notification_assignment import (
     build_assignment_dedupe_key,
+    enqueue_assignment_notification,
+    migrate_legacy_ticket_log_queue_sqlite,
     start_assignment_notification_worker_once,
+    wake_assignment_notification_worker,
+    worker_settings,
 )
 from master_data_admin import render_admin_panel
+from catalog_retrieval import (
+    LLM_CATALOG_FULL_MAX,
+    LLM_CATALOG_TOP_K,
+    format_catalog_lines,
+)
 from db_adapter import DBAdapter
+from display_resolver import DisplayValueResolver, build_label_maps
+from extraction_cache import EXTRACTION_CACHE, cache_key, context_hash
+from master_catalog import (
+    CATALOG_RECORDS,
+    MENTION_FIELDS,
+    build_master_indexes,
+    find_catalog_mentions,
+    normalize_text,
+    resolve_catalog_candidate,
+    resolve_user_candidate,
+)
+from master_snapshot import (
+    CATALOG_TABLES,
+    MASTER_STORE,
+    SnapshotFile,
+    bump_catalog_version,
+    fetch_catalog_versions,
+)
+from audit_events import (
+    EVENT_ASSIGNMENT_NOTICE,
+    EVENT_COMMENT,
+    EVENT_FIELD_CHANGE,
+    EVENT_SUBTASK_CREATED,
+    EVENT_SUBTASK_DELETED,
+    EVENT_SUBTASK_UPDATED,
+    insert_field_change_logs,
+    legacy_event_type_sql,
+    typed_id,
+)
+from ticket_activity import ACTIVITY_PAGE_SIZE, ACTIVITY_TYPES, fetch_activity_page
+from ticket_export import (
+    EXPORT_FILE_TTL_SECONDS,
+    EXPORT_FORMATS,
+    ExportJob,
+    available_export_formats,
+    cleanup_stale_exports,
+)
+from printable_view import (
+    DEFAULT_PAGE_ROWS,
+    get_printable_html,
+    get_printable_pdf,
+    page_count,
+    pdf_export_available,
+)
 
 # Cargar variables de entorno
 load_dotenv()
@@ -26,15 +78,6 @@ load_dotenv()
 # ==========================================
 
 
-def normalize_text(value):
-    if value is None:
-        return ""
-    text = str(value).strip().lower()
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join(ch for ch in text if not unicodedata.combining(ch))
-    return re.sub(r"\s+", " ", text)
-
-
 def get_secret(name, default=None):
     value = None
     try:
@@ -142,6 +185,62 @@ def ensure_sqlite_schema():
         schema_path = get_secret("SQLITE_SCHEMA_PATH", "schema_sqlite.sql")
         seed_path = get_secret("SQLITE_SEED_PATH", "seed_sqlite.sql")
 
+        # Columnas de prioridad del outbox antes del schema: su índice las usa.
+        if adapter.table_exists(conn, "NotificationOutbox"):
+            outbox_cols = set(adapter.list_columns(conn, "NotificationOutbox"))
+            if "prioridadid" not in outbox_cols:
+                conn.execute(
+                    f"ALTER TABLE {qname('NotificationOutbox')} ADD COLUMN "
+                    "PrioridadId INTEGER REFERENCES Prioridades (PrioridadId)"
+                )
+            if "prioridadnivel" not in outbox_cols:
+                conn.execute(
+                    f"ALTER TABLE {qname('NotificationOutbox')} ADD COLUMN "
+                    "PrioridadNivel INTEGER NOT NULL DEFAULT 99"
+                )
+                # Pendientes previos: toman la prioridad actual del ticket.
+                conn.execute(
+                    f"""
+                    UPDATE {qname('NotificationOutbox')}
+                    SET
+                        PrioridadId = (
+                            SELECT t.PrioridadId FROM {qname('Tickets')} t
+                            WHERE t.TicketId = {qname('NotificationOutbox')}.TicketId
+                        ),
+                        PrioridadNivel = COALESCE(
+                            (
+                                SELECT p.Nivel
+                                FROM {qname('Tickets')} t
+                                JOIN {qname('Prioridades')} p
+                                    ON p.PrioridadId = t.PrioridadId
+                                WHERE t.TicketId = {qname('NotificationOutbox')}.TicketId
+                            ),
+                            99
+                        )
+                    WHERE Status = 'pending'
+                    """
+                )
+
+        # Eventos tipados de auditoría (EventType, OldId, NewId) en logs existentes.
+        for logs_table in ("TicketLogs", "TicketLogsArchive"):
+            if not adapter.table_exists(conn, logs_table):
+                continue
+            log_cols = set(adapter.list_columns(conn, logs_table))
+            for column, ddl in (
+                ("eventtype", "EventType TEXT"),
+                ("oldid", "OldId INTEGER"),
+                ("newid", "NewId INTEGER"),
+            ):
+                if column not in log_cols:
+                    conn.execute(f"ALTER TABLE {qname(logs_table)} ADD COLUMN {ddl}")
+            if "eventtype" not in log_cols:
+                # Filas previas: tipo derivado de FieldName (sin IDs, solo nombres).
+                conn.execute(
+                    f"UPDATE {qname(logs_table)} "
+                    f"SET EventType = {legacy_event_type_sql()} "
+                    "WHERE EventType IS NULL"
+                )
+
         # Ejecutar siempre el schema idempotente para crear tablas/índices faltantes.
         for stmt in _read_sql_statements(schema_path):
             conn.execute(stmt)
@@ -153,6 +252,16 @@ def ensure_sqlite_schema():
         if "divisionid" not in user_cols:
             conn.execute(f"ALTER TABLE {qname('Users')} ADD COLUMN DivisionId INTEGER")
 
+        # Cola de notificaciones legacy (TicketLogs) -> NotificationOutbox.
+        migrate_legacy_ticket_log_queue_sqlite(
+            conn,
+            qname("TicketLogs"),
+            qname("NotificationOutbox"),
+            qname("SchemaMigrations"),
+            qname("Tickets"),
+            qname("Prioridades"),
+        )
+
         if os.path.exists(seed_path):
             for stmt in _read_sql_statements(seed_path):
                 conn.execute(stmt)
@@ -196,103 +305,134 @@ def render_printable_dataframe(df, title, state_key):
     if not st.session_state[show_key]:
         return
 
-    base_col_width = 120
-    col_widths = []
-    for col in df_print.columns:
-        if col == "Title":
-            width_px = base_col_width * 2
-        elif col == "Description":
-            width_px = base_col_width * 3
-        else:
-            width_px = base_col_width
-        col_widths.append(f'<col style="width:{width_px}px">')
-
-    colgroup_html = "<colgroup>" + "".join(col_widths) + "</colgroup>"
-    table_html = df_print.to_html(index=False, escape=True, classes="print-table")
-    table_html = table_html.replace(">", ">" + colgroup_html, 1)
-    title_safe = html_escape(title)
-    html_doc = f"""
-    <!doctype html>
-    <html>
-    <head>
-      <meta charset="utf-8" />
-      <style>
-        :root {{
-          --text: #111827;
-          --line: #d1d5db;
-          --header-bg: #f3f4f6;
-        }}
-        body {{
-          margin: 0;
-          padding: 16px;
-          font-family: Segoe UI, Calibri, Arial, sans-serif;
-          color: var(--text);
-          background: #ffffff;
-        }}
-        .toolbar {{
-          display: flex;
-          justify-content: space-between;
-          align-items: center;
-          margin-bottom: 12px;
-        }}
-        .title {{
-          font-size: 18px;
-          font-weight: 600;
-        }}
-        button {{
-          border: 1px solid #111827;
-          background: #111827;
-          color: #ffffff;
-          padding: 8px 12px;
-          border-radius: 6px;
-          cursor: pointer;
-        }}
-        table.print-table {{
-          border-collapse: collapse;
-          width: 100%;
-          font-size: 12px;
-        }}
-        table.print-table th,
-        table.print-table td {{
-          border: 1px solid var(--line);
-          padding: 6px 8px;
-          vertical-align: top;
-          text-align: left;
-        }}
-        table.print-table th {{
-          background: var(--header-bg);
-          font-weight: 700;
-        }}
-        @media print {{
-          @page {{
-            size: A4 landscape;
-            margin: 10mm;
-          }}
-          .toolbar {{
-            display: none;
-          }}
-          table.print-table thead {{
-            display: table-header-group;
-          }}
-          table.print-table tr {{
-            page-break-inside: avoid;
-          }}
-        }}
-      </style>
-    </head>
-    <body>
-      <div class="toolbar">
-        <div class="title">{title_safe}</div>
-        <button onclick="window.print()">Imprimir</button>
-      </div>
-      {table_html}
-    </body>
-    </html>
-    """
+    try:
+        page_rows = int(get_secret("PRINT_PAGE_ROWS", DEFAULT_PAGE_ROWS))
+        max_inline_rows = int(get_secret("PRINT_MAX_INLINE_ROWS", 2000))
+    except Exception:
+        page_rows, max_inline_rows = DEFAULT_PAGE_ROWS, 2000
+
+    # Tablas grandes: se muestra una página por vez para no maquetar miles de filas.
+    page_index = None
+    total_pages = page_count(len(df_print), page_rows)
+    if len(df_print) > max_inline_rows:
+        page_col, info_col = st.columns([1, 6], gap="small")
+        with page_col:
+            page_number = st.number_input(
+                "Página",
+                min_value=1,
+                max_value=total_pages,
+                value=1,
+                step=1,
+                key=f"{state_key}_page",
+            )
+        with info_col:
+            full_hint = (
+                "descargá el PDF"
+                if pdf_export_available()
+                else "usá la exportación de la bandeja"
+            )
+            st.caption(
+                f"{len(df_print)} filas en {total_pages} páginas. "
+                f"Imprimir solo imprime la página actual; para todo, {full_hint}."
+            )
+        page_index = int(page_number) - 1
+
+    html_doc = get_printable_html(
+        df_print, title, page_rows=page_rows, page_index=page_index
+    )
     components.html(html_doc, height=620, scrolling=True)
 
+    if pdf_export_available():
+        st.download_button(
+            "Descargar PDF",
+            data=lambda: get_printable_pdf(df_print, title),
+            file_name=f"{state_key}.pdf",
+            mime="application/pdf",
+            key=f"{state_key}_btn_pdf",
+        )
+
+
+def render_tray_export(filters, total_rows, state_key):
+    formats = available_export_formats()
+    job_key = f"{state_key}_job"
+    try:
+        background_min_rows = int(get_secret("EXPORT_BACKGROUND_MIN_ROWS", 5000))
+    except Exception:
+        background_min_rows = 5000
+
+    fmt_col, btn_col, _ = st.columns([1.6, 1, 5.4], gap="small")
+    with fmt_col:
+        export_format = st.selectbox(
+            "Formato de exportación",
+            formats,
+            format_func=lambda f: EXPORT_FORMATS[f]["label"],
+            key=f"{state_key}_format",
+            label_visibility="collapsed",
+        )
+    with btn_col:
+        start_export = st.button("Exportar", key=f"{state_key}_btn_start")
+
+    if start_export:
+        previous_job = st.session_state.get(job_key)
+        if previous_job is not None:
+            previous_job.cleanup()
+        cleanup_stale_exports(
+            int(get_secret("EXPORT_FILE_TTL_SECONDS", EXPORT_FILE_TTL_SECONDS))
+        )
+        # Se reejecuta la consulta de la bandeja y se vuelca desde el cursor por bloques.
+        sql, params = build_tray_query(filters)
+        job = ExportJob(
+            get_connection=get_azure_master_connection,
+            sql=sql,
+            params=params,
+            export_format=export_format,
+            file_stem=f"bandeja_tickets_{datetime.now():%Y%m%d_%H%M%S}",
+            total_rows=total_rows,
+        )
+        st.session_state[job_key] = job
+        if total_rows >= background_min_rows:
+            job.start()
+        else:
+            job.run()
+
+    job = st.session_state.get(job_key)
+    if job is None:
+        return
+    if not job.is_finished:
+        _render_export_progress(job)
+        return
+    if job.status == "error":
+        st.error(f"No se pudo generar la exportación: {job.error}")
+        return
+    # El archivo se lee al hacer click y se borra; para volver a bajarlo se reexporta.
+    st.download_button(
+        f"Descargar {job.file_name} ({job.rows_written} filas)",
+        data=job.take_bytes,
+        file_name=job.file_name,
+        mime=job.mime,
+        key=f"{state_key}_btn_download",
+        on_click=st.session_state.pop,
+        args=(job_key, None),
+    )
+
+
+@st.fragment(run_every=1)
+def _render_export_progress(job):
+    if job.is_finished:
+        st.rerun()
+    total_label = job.total_rows if job.total_rows else "?"
+    st.progress(
+        job.progress,
+        text=f"Exportando en segundo plano... {job.rows_written}/{total_label} filas",
+    )
+
 
 def get_users_by_id(master_data):
+    # Con el snapshot de la sesión se usa el índice ya armado, sin recorrer usuarios.
+    if master_data is st.session_state.get("master_data"):
+        by_id = (st.session_state.get("master_indexes") or {}).get("usuarios_by_id")
+        if by_id is not None:
+            return by_id
     return {
         u["id"]: u for u in master_data.get("usuarios", []) if u.get("id") is not None
     }
@@ -457,6 +597,7 @@ def create_solicitante_user(email_value, principal_name):
             cursor.execute("SELECT CAST(SCOPE_IDENTITY() AS INT)")
             new_row = cursor.fetchone()
             new_id = new_row[0] if new_row else None
+        bump_catalog_version(conn, adapter, CATALOG_TABLES["usuarios"])
         conn.commit()
         return {
             "id": new_id,
@@ -487,7 +628,7 @@ def ensure_local_default_admin_user(master_data):
         user_norm = normalize_text(user.get("username"))
         return (email_norm == preferred_email_norm) or (user_norm in preferred_usernames)
 
-    users = master_data.setdefault("usuarios", [])
+    users = master_data.get("usuarios", [])
     preferred = next((u for u in users if _is_preferred(u)), None)
 
     conn = get_azure_master_connection()
@@ -500,8 +641,13 @@ def ensure_local_default_admin_user(master_data):
                     f"UPDATE {qname('Users')} SET Role = ? WHERE UserId = ?",
                     ("Administrador", preferred["id"]),
                 )
+                bump_catalog_version(conn, adapter, CATALOG_TABLES["usuarios"])
                 conn.commit()
-                preferred["role"] = "Administrador"
+                # El snapshot compartido no se edita: se recargan solo los usuarios.
+                sync_master_snapshot()
+                return get_users_by_id(st.session_state.master_data).get(
+                    preferred["id"], preferred
+                )
             return preferred
 
         cursor.execute(
@@ -517,6 +663,7 @@ def ensure_local_default_admin_user(master_data):
             cursor.execute("SELECT CAST(SCOPE_IDENTITY() AS INT)")
             row = cursor.fetchone()
             new_id = row[0] if row else None
+        bump_catalog_version(conn, adapter, CATALOG_TABLES["usuarios"])
         conn.commit()
     finally:
         conn.close()
@@ -529,9 +676,7 @@ def ensure_local_default_admin_user(master_data):
         "area_id": None,
         "division_id": None,
     }
-    users.append(created_user)
-    if "master_indexes" in st.session_state:
-        st.session_state.master_indexes = build_master_indexes(master_data)
+    sync_master_snapshot()
     return created_user
 
 
@@ -553,9 +698,7 @@ def ensure_session_user(master_data):
             email_value=login_value,
             principal_name=auth_identity.get("principal_name"),
         )
-        master_data.setdefault("usuarios", []).append(created_user)
-        if "master_indexes" in st.session_state:
-            st.session_state.master_indexes = build_master_indexes(master_data)
+        sync_master_snapshot()
         st.session_state.current_user_id = created_user["id"]
         st.session_state.current_user_role = created_user.get("role", "Solicitante")
         st.session_state.current_user_area_id = created_user.get("area_id")
@@ -567,6 +710,8 @@ def ensure_session_user(master_data):
     st.session_state.auth_user_mapped = False
     st.session_state.auth_user_autocreated = False
     preferred_local_user = ensure_local_default_admin_user(master_data)
+    # Un alta o cambio de rol pudo haber publicado un snapshot nuevo.
+    master_data = st.session_state.master_data
     users = master_data.get("usuarios", [])
     if not users:
         raise RuntimeError("No hay usuarios activos en la base para iniciar sesión.")
@@ -750,275 +895,197 @@ def extract_suggested_user_from_text(value):
     return None
 
 
-def load_user_area_division_map():
-    conn = get_azure_master_connection()
+def get_display_resolver():
+    indexes = st.session_state.get("master_indexes") or {}
+    labels_by_id = indexes.get("labels_by_id")
+    if labels_by_id is None and "master_data" in st.session_state:
+        labels_by_id = build_label_maps(st.session_state.master_data)
+    return DisplayValueResolver(labels_by_id, get_db_adapter())
+
+
+def format_full_name_from_username(username):
+    norm_user = normalize_text(username).replace(".", "_")
+    parts = [p for p in re.split(r"[_\s-]+", norm_user) if p]
+    if not parts:
+        return str(username or "").strip()
+    if len(parts) >= 2:
+        # Convención local habitual: apellido_nombre
+        return f"{parts[1].title()} {parts[0].title()}"
+    return parts[0].title()
+
+
+def get_master_catalog_queries():
+    """Catálogo de master_data -> SQL, columnas en el orden de CATALOG_RECORDS."""
+    return {
+        "plantas": f"SELECT PlantaId, Nombre FROM {qname('Plantas')} WHERE Activo = 1",
+        "divisiones": f"SELECT DivisionId, Nombre FROM {qname('Divisiones')} WHERE Activo = 1",
+        "areas": f"SELECT AreaId, Nombre, DivisionId FROM {qname('Areas')} WHERE Activo = 1",
+        "categorias": f"SELECT CategoriaId, Nombre FROM {qname('Categorias')} WHERE Activo = 1",
+        "subcategorias": f"SELECT SubcategoriaId, Nombre, CategoriaId FROM {qname('Subcategorias')} WHERE Activo = 1",
+        "prioridades": f"SELECT PrioridadId, Nombre, Nivel FROM {qname('Prioridades')}",
+        "estados": f"SELECT EstadoId, Nombre FROM {qname('Estados')}",
+        "usuarios": f"SELECT UserId, Username, Email, Role, AreaId, DivisionId FROM {qname('Users')} WHERE Active = 1",
+    }
+
+
+def load_master_data(catalogs=None):
+    """Carga todos los catálogos o solo los indicados (recarga incremental).
+
+    Un solo viaje a la base: en Azure un batch con varios result sets; en SQLite
+    una transacción de lectura, así todos los catálogos ven el mismo estado.
+    """
+    queries = [
+        (catalog, sql)
+        for catalog, sql in get_master_catalog_queries().items()
+        if catalogs is None or catalog in catalogs
+    ]
+    if not queries:
+        return {}
     adapter = get_db_adapter()
+    conn = get_azure_master_connection()
     try:
         cursor = conn.cursor()
-        user_cols = set(adapter.list_columns(conn, "Users"))
-        if "username" not in user_cols:
-            return {}
-
-        has_active = "active" in user_cols
-        has_area_id = "areaid" in user_cols
-        has_division_id = "divisionid" in user_cols
-        has_area_name = "area" in user_cols
-        has_division_name = "division" in user_cols
-
-        if has_area_id:
-            active_filter = "WHERE u.Active = 1" if has_active else ""
-            sql = f"""
-                SELECT
-                    u.Username,
-                    a.Nombre AS AreaNombre,
-                    COALESCE(d_from_user.Nombre, d_from_area.Nombre) AS DivisionNombre
-                FROM {qname("Users")} u
-                LEFT JOIN {qname("Areas")} a ON u.AreaId = a.AreaId
-                LEFT JOIN {qname("Divisiones")} d_from_user
-                    ON {"u.DivisionId = d_from_user.DivisionId" if has_division_id else "1=0"}
-                LEFT JOIN {qname("Divisiones")} d_from_area ON a.DivisionId = d_from_area.DivisionId
-                {active_filter}
-            """
-            rows = cursor.execute(sql).fetchall()
-        elif has_area_name or has_division_name:
-            select_area = "u.Area" if has_area_name else "NULL"
-            select_div = "u.Division" if has_division_name else "NULL"
-            active_filter = "WHERE u.Active = 1" if has_active else ""
-            rows = cursor.execute(
-                f"""
-                SELECT
-                    u.Username,
-                    {select_area} AS AreaNombre,
-                    {select_div} AS DivisionNombre
-                FROM {qname("Users")} u
-                {active_filter}
-                """
-            ).fetchall()
+        results = []
+        if adapter.is_sqlite:
+            cursor.execute("BEGIN")
+            try:
+                for _catalog, sql in queries:
+                    cursor.execute(sql)
+                    results.append(cursor.fetchall())
+            finally:
+                conn.rollback()
         else:
-            return {}
-
-        out = {}
-        for row in rows:
-            username = row[0]
-            if not username:
-                continue
-            out[normalize_text(username)] = {"area": row[1], "division": row[2]}
-        return out
-    except Exception:
-        return {}
+            cursor.execute(";\n".join(sql for _catalog, sql in queries))
+            while True:
+                results.append(cursor.fetchall())
+                if not cursor.nextset():
+                    break
+        # Filas compactas e inmutables (master_catalog), con acceso estilo dict.
+        return {
+            catalog: [CATALOG_RECORDS[catalog](*row) for row in rows]
+            for (catalog, _sql), rows in zip(queries, results)
+        }
     finally:
         conn.close()
 
 
-def build_master_indexes(master_data):
-    indexes = {
-        "plantas_by_norm": {},
-        "divisiones_by_norm": {},
-        "areas_by_norm": {},
-        "categorias_by_norm": {},
-        "subcategorias_by_norm": {},
-        "prioridades_by_norm": {},
-        "usuarios_by_norm": {},
-        "usuarios_by_email_local": {},
-        "usuarios_by_token": {},
-        "areas_by_id": {},
-        "subcats_by_categoria_and_norm": {},
-        "user_to_area_division": {},
-    }
-
-    for p in master_data.get("plantas", []):
-        indexes["plantas_by_norm"][normalize_text(p["nombre"])] = p
-    for d in master_data.get("divisiones", []):
-        indexes["divisiones_by_norm"][normalize_text(d["nombre"])] = d
-    for a in master_data.get("areas", []):
-        indexes["areas_by_norm"][normalize_text(a["nombre"])] = a
-        indexes["areas_by_id"][a["id"]] = a
-    for c in master_data.get("categorias", []):
-        indexes["categorias_by_norm"][normalize_text(c["nombre"])] = c
-    for s in master_data.get("subcategorias", []):
-        key = normalize_text(s["nombre"])
-        indexes["subcategorias_by_norm"].setdefault(key, []).append(s)
-        combo = (s["categoria_id"], key)
-        indexes["subcats_by_categoria_and_norm"][combo] = s
-    for p in master_data.get("prioridades", []):
-        indexes["prioridades_by_norm"][normalize_text(p["nombre"])] = p
-    for u in master_data.get("usuarios", []):
-        norm_user = normalize_text(u["username"])
-        indexes["usuarios_by_norm"][norm_user] = u
-        email = normalize_text(u.get("email"))
-        if "@" in email:
-            local = email.split("@", 1)[0]
-            indexes["usuarios_by_email_local"][local] = u
-        # Alias por tokens de username (ej: firmapaz_alfredo -> "firmapaz", "alfredo")
-        for token in re.split(r"[_\s\.-]+", norm_user):
-            if token:
-                indexes["usuarios_by_token"].setdefault(token, []).append(u)
-
-    user_area_division = load_user_area_division_map()
-    for norm_user, mapping in user_area_division.items():
-        area = indexes["areas_by_norm"].get(normalize_text(mapping.get("area")))
-        division = indexes["divisiones_by_norm"].get(
-            normalize_text(mapping.get("division"))
-        )
-        indexes["user_to_area_division"][norm_user] = {
-            "area_id": area["id"] if area else None,
-            "division_id": division["id"] if division else None,
-        }
+def build_master_snapshot():
+    master_data = load_master_data()
+    return master_data, build_master_indexes(master_data)
 
-    return indexes
 
+def rebuild_master_snapshot(snapshot, catalogs):
+    """Recarga solo los catálogos cambiados y los índices que dependen de ellos."""
+    master_data = dict(snapshot.master_data)
+    master_data.update(load_master_data(catalogs))
+    indexes = build_master_indexes(
+        master_data, catalogs=catalogs, base=snapshot.indexes
+    )
+    return master_data, indexes
 
-def resolve_user_candidate(raw_user, indexes):
-    usuarios_by_norm = indexes.get("usuarios_by_norm", {})
-    usuarios_by_email_local = indexes.get("usuarios_by_email_local", {})
-    usuarios_by_token = indexes.get("usuarios_by_token", {})
 
-    norm_value = normalize_text(raw_user)
-    if not norm_value:
-        return None, None
+def get_master_snapshot_file():
+    """Copia local para arranque en frío; MASTER_DATA_SNAPSHOT_PATH=off la desactiva."""
+    default_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), ".cache", "master_data.json"
+    )
+    path = str(get_secret("MASTER_DATA_SNAPSHOT_PATH", default_path)).strip()
+    if path.lower() in ("off", "false", "0"):
+        return None
+    return SnapshotFile(path, get_db_source_id())
 
-    # 1) Match exacto por username
-    exact = usuarios_by_norm.get(norm_value)
-    if exact:
-        return exact, None
 
-    # 2) Match por local-part de email (antes de @)
-    local = norm_value.replace(" ", "")
-    by_email = usuarios_by_email_local.get(local)
-    if by_email:
-        return by_email, None
+def get_db_source_id():
+    """Identifica la base sin guardar la cadena de conexión (tiene credenciales)."""
+    adapter = get_db_adapter()
+    return hashlib.sha256(
+        "|".join(
+            str(part or "")
+            for part in (
+                adapter.mode,
+                adapter.schema,
+                adapter.sqlite_path,
+                adapter.odbc_conn_str,
+            )
+        ).encode("utf-8")
+    ).hexdigest()
 
-    # 3) Match por token único de username (nombre/apellido)
-    token = norm_value.split(" ")[0]
-    token_hits = usuarios_by_token.get(token, [])
-    if len(token_hits) == 1:
-        return token_hits[0], None
-    if len(token_hits) > 1:
-        opciones = ", ".join(sorted({u["username"] for u in token_hits}))
-        return None, f"Usuario ambiguo '{raw_user}'. Opciones: {opciones}."
 
-    return None, f"No se encontró usuario para '{raw_user}'."
+def get_master_catalog_version():
+    """Base + versiones de MasterDataVersion del snapshot (estable entre reinicios)."""
+    snapshot = MASTER_STORE.current()
+    versions = snapshot.catalog_versions if snapshot else {}
+    return context_hash(get_db_source_id(), versions)
 
 
-def format_full_name_from_username(username):
-    norm_user = normalize_text(username).replace(".", "_")
-    parts = [p for p in re.split(r"[_\s-]+", norm_user) if p]
-    if not parts:
-        return str(username or "").strip()
-    if len(parts) >= 2:
-        # Convención local habitual: apellido_nombre
-        return f"{parts[1].title()} {parts[0].title()}"
-    return parts[0].title()
+def get_extraction_cache():
+    """EXTRACTION_CACHE con la configuración actual; TTL 0 lo desactiva."""
+    default_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), ".cache", "extraction_cache.sqlite"
+    )
+    path = str(get_secret("EXTRACTION_CACHE_PATH", default_path)).strip()
+    if path.lower() in ("off", "false", "0"):
+        path = None
+    EXTRACTION_CACHE.configure(
+        max_entries=int(get_secret("EXTRACTION_CACHE_MAX_ENTRIES", 512)),
+        ttl_seconds=int(get_secret("EXTRACTION_CACHE_TTL_SECONDS", 3600)),
+        path=path,
+    )
+    return EXTRACTION_CACHE
 
 
-def load_master_data():
+def fetch_master_versions():
     conn = get_azure_master_connection()
     try:
-        cursor = conn.cursor()
-
-        def run_fetchall(sql):
-            cursor.execute(sql)
-            return cursor.fetchall()
-
-        master_data = {
-            "plantas": [
-                {"id": row[0], "nombre": row[1]}
-                for row in run_fetchall(
-                    f"SELECT PlantaId, Nombre FROM {qname('Plantas')} WHERE Activo = 1"
-                )
-            ],
-            "divisiones": [
-                {"id": row[0], "nombre": row[1]}
-                for row in run_fetchall(
-                    f"SELECT DivisionId, Nombre FROM {qname('Divisiones')} WHERE Activo = 1"
-                )
-            ],
-            "areas": [
-                {"id": row[0], "nombre": row[1], "division_id": row[2]}
-                for row in run_fetchall(
-                    f"SELECT AreaId, Nombre, DivisionId FROM {qname('Areas')} WHERE Activo = 1"
-                )
-            ],
-            "categorias": [
-                {"id": row[0], "nombre": row[1]}
-                for row in run_fetchall(
-                    f"SELECT CategoriaId, Nombre FROM {qname('Categorias')} WHERE Activo = 1"
-                )
-            ],
-            "subcategorias": [
-                {"id": row[0], "nombre": row[1], "categoria_id": row[2]}
-                for row in run_fetchall(
-                    f"SELECT SubcategoriaId, Nombre, CategoriaId FROM {qname('Subcategorias')} WHERE Activo = 1"
-                )
-            ],
-            "prioridades": [
-                {"id": row[0], "nombre": row[1], "nivel": row[2]}
-                for row in run_fetchall(
-                    f"SELECT PrioridadId, Nombre, Nivel FROM {qname('Prioridades')}"
-                )
-            ],
-            "estados": [
-                {"id": row[0], "nombre": row[1]}
-                for row in run_fetchall(
-                    f"SELECT EstadoId, Nombre FROM {qname('Estados')}"
-                )
-            ],
-            "usuarios": [
-                {
-                    "id": row[0],
-                    "username": row[1],
-                    "email": row[2],
-                    "role": row[3],
-                    "area_id": row[4],
-                    "division_id": row[5],
-                }
-                for row in run_fetchall(
-                    f"SELECT UserId, Username, Email, Role, AreaId, DivisionId FROM {qname('Users')} WHERE Active = 1"
-                )
-            ],
-        }
-        return master_data
+        return fetch_catalog_versions(conn, get_db_adapter())
     finally:
         conn.close()
 
 
-def get_llm_catalogs(master_data):
-    def unique_in_order(values):
-        seen = set()
-        out = []
-        for value in values:
-            if not value:
-                continue
-            norm = normalize_text(value)
-            if norm in seen:
-                continue
-            seen.add(norm)
-            out.append(value)
-        return out
+def adopt_master_snapshot(snapshot):
+    """Apunta la sesión al snapshot compartido (referencia, sin copiar)."""
+    st.session_state.master_data = snapshot.master_data
+    st.session_state.master_indexes = snapshot.indexes
+    st.session_state.master_data_version = snapshot.version
+
 
+def sync_master_snapshot():
+    """Tras un cambio propio ya versionado: recarga solo los catálogos cambiados."""
+    MASTER_STORE.request_check()
+    snapshot = MASTER_STORE.sync(
+        fetch_master_versions, rebuild_master_snapshot, min_interval=0
+    )
+    if snapshot is not None:
+        adopt_master_snapshot(snapshot)
+    return snapshot
+
+
+def get_local_mentions(user_input, indexes):
+    """{campo de ticket_draft: nombre} de catálogos nombrados tal cual en el texto."""
+    mentions = find_catalog_mentions(indexes, normalize_text(user_input))
     return {
-        "plantas": unique_in_order(
-            [p["nombre"] for p in master_data.get("plantas", [])]
-        ),
-        "divisiones": unique_in_order(
-            [d["nombre"] for d in master_data.get("divisiones", [])]
-        ),
-        "areas": unique_in_order([a["nombre"] for a in master_data.get("areas", [])]),
-        "categorias": unique_in_order(
-            [c["nombre"] for c in master_data.get("categorias", [])]
-        ),
-        "subcategorias": unique_in_order(
-            [s["nombre"] for s in master_data.get("subcategorias", [])]
-        ),
-        "prioridades": unique_in_order(
-            [p["nombre"] for p in master_data.get("prioridades", [])]
-        ),
-        "usuarios": unique_in_order(
-            [u["username"] for u in master_data.get("usuarios", [])]
-        ),
+        field: row[MENTION_FIELDS[field][1]] for field, row in mentions.items()
     }
 
 
+def get_llm_catalogs(indexes, user_input, draft=None):
+    """Catálogos para el prompt: completos los chicos y, en los grandes, solo los
+    candidatos del mensaje y del borrador (LLM_CATALOG_TOP_K=0 envía todo)."""
+    retriever = indexes["catalog_retriever"]
+    top_k = int(get_secret("LLM_CATALOG_TOP_K", LLM_CATALOG_TOP_K))
+    if top_k <= 0:
+        return retriever.full()
+    query = " ".join(
+        [user_input or ""]
+        + [v for v in (draft or {}).values() if isinstance(v, str) and v]
+    )
+    return retriever.select(
+        normalize_text(query),
+        top_k=top_k,
+        full_max=int(get_secret("LLM_CATALOG_FULL_MAX", LLM_CATALOG_FULL_MAX)),
+    )
+
+
 def map_entities_to_ids(draft, indexes, master_data):
     mapped = {
         "planta_id": None,
@@ -1032,19 +1099,25 @@ def map_entities_to_ids(draft, indexes, master_data):
     }
     warnings = []
 
-    planta = indexes["plantas_by_norm"].get(normalize_text(draft.get("planta")))
+    planta, fuzzy_warning = resolve_catalog_candidate(
+        draft.get("planta"), indexes, "plantas", "Planta"
+    )
     if planta:
         mapped["planta_id"] = planta["id"]
+    if fuzzy_warning:
+        warnings.append(fuzzy_warning)
 
     division = indexes["divisiones_by_norm"].get(normalize_text(draft.get("division")))
     if division:
         mapped["division_id"] = division["id"]
 
-    categoria = indexes["categorias_by_norm"].get(
-        normalize_text(draft.get("categoria"))
+    categoria, fuzzy_warning = resolve_catalog_candidate(
+        draft.get("categoria"), indexes, "categorias", "Categoría"
     )
     if categoria:
         mapped["categoria_id"] = categoria["id"]
+    if fuzzy_warning:
+        warnings.append(fuzzy_warning)
 
     prio = indexes["prioridades_by_norm"].get(normalize_text(draft.get("prioridad")))
     if prio:
@@ -1053,6 +1126,8 @@ def map_entities_to_ids(draft, indexes, master_data):
     usuario, user_warning = resolve_user_candidate(
         draft.get("usuario_sugerido"), indexes
     )
+    if user_warning and draft.get("usuario_sugerido"):
+        warnings.append(user_warning)
     if usuario:
         mapped["suggested_assignee_id"] = usuario["id"]
         rel = indexes["user_to_area_division"].get(normalize_text(usuario["username"]))
@@ -1062,20 +1137,17 @@ def map_entities_to_ids(draft, indexes, master_data):
                 mapped["area_id"] = rel["area_id"]
             if not mapped["division_id"] and rel.get("division_id"):
                 mapped["division_id"] = rel["division_id"]
-    elif user_warning and draft.get("usuario_sugerido"):
-        warnings.append(user_warning)
-        area = indexes["areas_by_norm"].get(normalize_text(draft.get("area")))
-        if area:
-            mapped["area_id"] = area["id"]
-            if not mapped["division_id"]:
-                mapped["division_id"] = area["division_id"]
     else:
         # Usuario desconocido/no informado: inferimos área desde el texto del ticket.
-        area = indexes["areas_by_norm"].get(normalize_text(draft.get("area")))
+        area, fuzzy_warning = resolve_catalog_candidate(
+            draft.get("area"), indexes, "areas", "Área"
+        )
         if area:
             mapped["area_id"] = area["id"]
             if not mapped["division_id"]:
                 mapped["division_id"] = area["division_id"]
+        if fuzzy_warning:
+            warnings.append(fuzzy_warning)
 
     sub_norm = normalize_text(draft.get("subcategoria"))
     if sub_norm:
@@ -1201,114 +1273,146 @@ def insert_ticket_record(draft, ids, metadata):
         conn.close()
 
 
-def fetch_tickets_for_form(filters, limit=None):
-    conn = get_azure_master_connection()
+def build_tray_where(filters):
+    """(WHERE sobre Tickets t / Estados e, parámetros) con visibilidad por rol."""
     adapter = get_db_adapter()
-    try:
-        where = []
-        params = []
-        archived_status_name = "archivado"
-        estado_norm_expr = (
-            "IFNULL(LOWER(TRIM(e.Nombre)), '')"
-            if adapter.is_sqlite
-            else "ISNULL(LOWER(LTRIM(RTRIM(e.Nombre))), '')"
-        )
+    where = []
+    params = []
+    archived_status_name = "archivado"
+    estado_norm_expr = (
+        "IFNULL(LOWER(TRIM(e.Nombre)), '')"
+        if adapter.is_sqlite
+        else "ISNULL(LOWER(LTRIM(RTRIM(e.Nombre))), '')"
+    )
 
-        # ── Filtros de visibilidad por rol ──
-        user_role = st.session_state.get("current_user_role", "Solicitante")
-        user_area_id = st.session_state.get("current_user_area_id")
-        user_id = st.session_state.get("current_user_id")
-
-        if user_role == "Solicitante":
-            # Solo ve tickets propios
-            if user_id:
-                where.append("t.RequesterId = ?")
-                params.append(user_id)
-        elif user_role in ("Analista", "Jefe"):
-            # Ve tickets de su área + tickets huérfanos (sin área ni asignado)
-            if user_area_id:
-                where.append(
-                    "(t.AreaId = ? OR (t.AreaId IS NULL AND t.AssigneeId IS NULL))"
-                )
-                params.append(user_area_id)
-            else:
-                # Analista/Jefe sin área asignada: solo ve tickets huérfanos
-                where.append("(t.AreaId IS NULL AND t.AssigneeId IS NULL)")
-        # Director y Administrador ven todo — sin filtro adicional
-
-        # ── Filtros del formulario ──
-        if filters.get("estado_id"):
-            where.append("t.EstadoId = ?")
-            params.append(filters["estado_id"])
-        if filters.get("prioridad_id"):
-            where.append("t.PrioridadId = ?")
-            params.append(filters["prioridad_id"])
-        if filters.get("area_id"):
-            where.append("t.AreaId = ?")
-            params.append(filters["area_id"])
-        if filters.get("suggested_assignee_id"):
-            where.append("t.SuggestedAssigneeId = ?")
-            params.append(filters["suggested_assignee_id"])
-        if filters.get("query"):
-            where.append("(t.Title LIKE ? OR t.Description LIKE ?)")
-            pattern = f"%{filters['query']}%"
-            params.extend([pattern, pattern])
-
-        # Archivado: excluir salvo que sea Admin con include_archived
-        if not filters.get("include_archived", False) or user_role != "Administrador":
-            if user_role != "Administrador":
-                # Nunca mostrar Archivado a no-admin
-                where.append(f"{estado_norm_expr} <> ?")
-                params.append(archived_status_name)
-            elif not filters.get("include_archived", False):
-                # Admin sin filtro explícito: también excluir por defecto
-                where.append(f"{estado_norm_expr} <> ?")
-                params.append(archived_status_name)
-
-        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
-        if limit:
-            if adapter.is_sqlite:
-                top_clause = ""
-                limit_clause = f"LIMIT {int(limit)}"
-            else:
-                top_clause = f"TOP {int(limit)}"
-                limit_clause = ""
+    # ── Filtros de visibilidad por rol ──
+    user_role = st.session_state.get("current_user_role", "Solicitante")
+    user_area_id = st.session_state.get("current_user_area_id")
+    user_id = st.session_state.get("current_user_id")
+
+    if user_role == "Solicitante":
+        # Solo ve tickets propios
+        if user_id:
+            where.append("t.RequesterId = ?")
+            params.append(user_id)
+    elif user_role in ("Analista", "Jefe"):
+        # Ve tickets de su área + tickets huérfanos (sin área ni asignado)
+        if user_area_id:
+            where.append(
+                "(t.AreaId = ? OR (t.AreaId IS NULL AND t.AssigneeId IS NULL))"
+            )
+            params.append(user_area_id)
         else:
+            # Analista/Jefe sin área asignada: solo ve tickets huérfanos
+            where.append("(t.AreaId IS NULL AND t.AssigneeId IS NULL)")
+    # Director y Administrador ven todo — sin filtro adicional
+
+    # ── Filtros del formulario ──
+    if filters.get("estado_id"):
+        where.append("t.EstadoId = ?")
+        params.append(filters["estado_id"])
+    if filters.get("prioridad_id"):
+        where.append("t.PrioridadId = ?")
+        params.append(filters["prioridad_id"])
+    if filters.get("area_id"):
+        where.append("t.AreaId = ?")
+        params.append(filters["area_id"])
+    if filters.get("suggested_assignee_id"):
+        where.append("t.SuggestedAssigneeId = ?")
+        params.append(filters["suggested_assignee_id"])
+    if filters.get("query"):
+        where.append("(t.Title LIKE ? OR t.Description LIKE ?)")
+        pattern = f"%{filters['query']}%"
+        params.extend([pattern, pattern])
+
+    # Archivado: excluir salvo que sea Admin con include_archived
+    if not filters.get("include_archived", False) or user_role != "Administrador":
+        if user_role != "Administrador":
+            # Nunca mostrar Archivado a no-admin
+            where.append(f"{estado_norm_expr} <> ?")
+            params.append(archived_status_name)
+        elif not filters.get("include_archived", False):
+            # Admin sin filtro explícito: también excluir por defecto
+            where.append(f"{estado_norm_expr} <> ?")
+            params.append(archived_status_name)
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    return where_sql, params
+
+
+def build_tray_query(filters, limit=None):
+    adapter = get_db_adapter()
+    where_sql, params = build_tray_where(filters)
+    if limit:
+        if adapter.is_sqlite:
             top_clause = ""
+            limit_clause = f"LIMIT {int(limit)}"
+        else:
+            top_clause = f"TOP {int(limit)}"
             limit_clause = ""
-        sql = f"""
-            SELECT
-                {top_clause}
-                t.TicketId,
-                t.Title,
-                t.Description,
-                p.Nombre AS Planta,
-                d.Nombre AS Division,
-                a.Nombre AS Area,
-                c.Nombre AS Categoria,
-                s.Nombre AS Subcategoria,
-                pr.Nombre AS Prioridad,
-                e.Nombre AS Estado,
-                ureq.Username AS Solicitante,
-                uasg.Username AS Asignado,
-                usug.Username AS Sugerido,
-                t.NeedByAt,
-                t.CreatedAt
+    else:
+        top_clause = ""
+        limit_clause = ""
+    sql = f"""
+        SELECT
+            {top_clause}
+            t.TicketId,
+            t.Title,
+            t.Description,
+            p.Nombre AS Planta,
+            d.Nombre AS Division,
+            a.Nombre AS Area,
+            c.Nombre AS Categoria,
+            s.Nombre AS Subcategoria,
+            pr.Nombre AS Prioridad,
+            e.Nombre AS Estado,
+            ureq.Username AS Solicitante,
+            uasg.Username AS Asignado,
+            usug.Username AS Sugerido,
+            t.NeedByAt,
+            t.CreatedAt
+        FROM {qname("Tickets")} t
+        LEFT JOIN {qname("Plantas")} p ON t.PlantaId = p.PlantaId
+        LEFT JOIN {qname("Areas")} a ON t.AreaId = a.AreaId
+        LEFT JOIN {qname("Divisiones")} d ON a.DivisionId = d.DivisionId
+        LEFT JOIN {qname("Categorias")} c ON t.CategoriaId = c.CategoriaId
+        LEFT JOIN {qname("Subcategorias")} s ON t.SubcategoriaId = s.SubcategoriaId
+        LEFT JOIN {qname("Prioridades")} pr ON t.PrioridadId = pr.PrioridadId
+        LEFT JOIN {qname("Estados")} e ON t.EstadoId = e.EstadoId
+        LEFT JOIN {qname("Users")} ureq ON t.RequesterId = ureq.UserId
+        LEFT JOIN {qname("Users")} uasg ON t.AssigneeId = uasg.UserId
+        LEFT JOIN {qname("Users")} usug ON t.SuggestedAssigneeId = usug.UserId
+        {where_sql}
+        ORDER BY t.TicketId DESC
+        {limit_clause}
+    """
+    return sql, params
+
+
+def count_tickets_for_form(filters):
+    """Total de tickets de la bandeja con los mismos filtros que build_tray_query."""
+    where_sql, params = build_tray_where(filters)
+    conn = get_azure_master_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""
+            SELECT COUNT(1)
             FROM {qname("Tickets")} t
-            LEFT JOIN {qname("Plantas")} p ON t.PlantaId = p.PlantaId
-            LEFT JOIN {qname("Areas")} a ON t.AreaId = a.AreaId
-            LEFT JOIN {qname("Divisiones")} d ON a.DivisionId = d.DivisionId
-            LEFT JOIN {qname("Categorias")} c ON t.CategoriaId = c.CategoriaId
-            LEFT JOIN {qname("Subcategorias")} s ON t.SubcategoriaId = s.SubcategoriaId
-            LEFT JOIN {qname("Prioridades")} pr ON t.PrioridadId = pr.PrioridadId
             LEFT JOIN {qname("Estados")} e ON t.EstadoId = e.EstadoId
-            LEFT JOIN {qname("Users")} ureq ON t.RequesterId = ureq.UserId
-            LEFT JOIN {qname("Users")} uasg ON t.AssigneeId = uasg.UserId
-            LEFT JOIN {qname("Users")} usug ON t.SuggestedAssigneeId = usug.UserId
             {where_sql}
-            ORDER BY t.TicketId DESC
-            {limit_clause}
-        """
+            """,
+            params,
+        )
+        return int(cursor.fetchone()[0] or 0)
+    finally:
+        conn.close()
+
+
+def fetch_tickets_for_form(filters, limit=None):
+    sql, params = build_tray_query(filters, limit=limit)
+    conn = get_azure_master_connection()
+    try:
         cursor = conn.cursor()
         cursor.execute(sql, params)
         rows = cursor.fetchall()
@@ -1354,51 +1458,14 @@ def update_ticket_from_form(ticket_id, updates, actor_user_id):
             return None
         return str(v)
 
-    def _lookup_display_value(cursor, field_name, raw_value):
-        if raw_value is None:
-            return None
-
-        lookup_map = {
-            "PlantaId": ("Plantas", "PlantaId", "Nombre"),
-            "AreaId": ("Areas", "AreaId", "Nombre"),
-            "CategoriaId": ("Categorias", "CategoriaId", "Nombre"),
-            "SubcategoriaId": ("Subcategorias", "SubcategoriaId", "Nombre"),
-            "PrioridadId": ("Prioridades", "PrioridadId", "Nombre"),
-            "EstadoId": ("Estados", "EstadoId", "Nombre"),
-            "AssigneeId": ("Users", "UserId", "Username"),
-        }
-        if field_name not in lookup_map:
-            return _normalize_cmp(raw_value)
+    # Las etiquetas salen de master_indexes; la base solo se consulta ante un faltante.
+    resolver = get_display_resolver()
 
-        table, pk_col, label_col = lookup_map[field_name]
-        if adapter.is_sqlite:
-            cursor.execute(
-                f"SELECT {label_col} FROM {qname(table)} WHERE {pk_col} = ? LIMIT 1",
-                (raw_value,),
-            )
-        else:
-            cursor.execute(
-                f"SELECT TOP 1 {label_col} FROM {qname(table)} WHERE {pk_col} = ?",
-                (raw_value,),
-            )
-        row = cursor.fetchone()
-        return row[0] if row else _normalize_cmp(raw_value)
+    def _lookup_display_value(cursor, field_name, raw_value):
+        return resolver.display_value(cursor, field_name, raw_value)
 
     def _lookup_username(cursor, user_id):
-        if user_id is None:
-            return "Sistema"
-        if adapter.is_sqlite:
-            cursor.execute(
-                f"SELECT Username FROM {qname('Users')} WHERE UserId = ? LIMIT 1",
-                (user_id,),
-            )
-        else:
-            cursor.execute(
-                f"SELECT TOP 1 Username FROM {qname('Users')} WHERE UserId = ?",
-                (user_id,),
-            )
-        row = cursor.fetchone()
-        return row[0] if row and row[0] else "Sistema"
+        return resolver.label(cursor, "Users", user_id) or "Sistema"
 
     backend = get_ticket_log_backend()
     conn = get_azure_master_connection()
@@ -1465,19 +1532,8 @@ def update_ticket_from_form(ticket_id, updates, actor_user_id):
         updated_at_row = cursor.fetchone()
         ticket_updated_at = updated_at_row[0] if updated_at_row else None
 
-        field_alias = {
-            "Title": "Title",
-            "Description": "Description",
-            "PlantaId": "Planta",
-            "AreaId": "Area",
-            "CategoriaId": "Categoria",
-            "SubcategoriaId": "Subcategoria",
-            "PrioridadId": "Prioridad",
-            "EstadoId": "Estado",
-            "AssigneeId": "Assignee",
-            "NeedByAt": "NeedByAt",
-        }
-
+        notification_enqueued = False
+        digest_seconds = get_notification_digest_seconds()
         assignee_change = next(
             (
                 (old_value, new_value)
@@ -1487,22 +1543,14 @@ def update_ticket_from_form(ticket_id, updates, actor_user_id):
             None,
         )
 
-        for field_name, old_value, new_value in changed_items:
-            old_disp = _lookup_display_value(cursor, field_name, old_value)
-            new_disp = _lookup_display_value(cursor, field_name, new_value)
-            cursor.execute(
-                f"""
-                INSERT INTO {backend["table"]} (TicketId, UserId, IsAi, FieldName, OldValue, NewValue)
-                VALUES (?, ?, 0, ?, ?, ?)
-                """,
-                (
-                    ticket_id,
-                    actor_user_id,
-                    field_alias.get(field_name, field_name),
-                    None if old_disp is None else str(old_disp),
-                    None if new_disp is None else str(new_disp),
-                ),
-            )
+        insert_field_change_logs(
+            cursor,
+            backend["table"],
+            ticket_id,
+            actor_user_id,
+            changed_items,
+            resolver,
+        )
 
         if assignee_change:
             old_assignee_id, new_assignee_id = assignee_change
@@ -1524,14 +1572,20 @@ def update_ticket_from_form(ticket_id, updates, actor_user_id):
                 )
                 cursor.execute(
                     f"""
-                    INSERT INTO {backend["table"]} (TicketId, UserId, IsAi, FieldName, OldValue, NewValue)
-                    VALUES (?, ?, 0, 'CambioAsignacion', ?, ?)
+                    INSERT INTO {backend["table"]} (
+                        TicketId, UserId, IsAi, FieldName, OldValue, NewValue,
+                        EventType, OldId, NewId
+                    )
+                    VALUES (?, ?, 0, 'CambioAsignacion', ?, ?, ?, ?, ?)
                     """,
                     (
                         ticket_id,
                         actor_user_id,
                         None if old_assignee_name is None else str(old_assignee_name),
                         None if new_assignee_name is None else str(new_assignee_name),
+                        EVENT_ASSIGNMENT_NOTICE,
+                        typed_id("AssigneeId", old_assignee_id),
+                        typed_id("AssigneeId", new_assignee_id),
                     ),
                 )
 
@@ -1541,6 +1595,9 @@ def update_ticket_from_form(ticket_id, updates, actor_user_id):
                     new_assignee_id=new_assignee_id,
                     ticket_updated_at=ticket_updated_at,
                 )
+                effective_prioridad_id = updates.get(
+                    "PrioridadId", current.get("PrioridadId")
+                )
                 payload = {
                     "ticket_id": ticket_id,
                     "old_assignee_id": old_assignee_id,
@@ -1549,23 +1606,47 @@ def update_ticket_from_form(ticket_id, updates, actor_user_id):
                     "estado": effective_estado_name,
                     "assigned_by": _lookup_username(cursor, actor_user_id),
                 }
-                cursor.execute(
-                    f"""
-                    INSERT INTO {backend["table"]} (TicketId, UserId, IsAi, FieldName, OldValue, NewValue)
-                    VALUES (?, ?, 0, 'NotificacionPendiente', ?, ?)
-                    """,
-                    (
-                        ticket_id,
-                        actor_user_id,
-                        str(dedupe_key),
-                        json.dumps(payload, ensure_ascii=False),
-                    ),
+                enqueue_assignment_notification(
+                    cursor,
+                    outbox_table=qname("NotificationOutbox"),
+                    ticket_id=ticket_id,
+                    actor_user_id=actor_user_id,
+                    recipient_user_id=new_assignee_id,
+                    dedupe_key=dedupe_key,
+                    payload=payload,
+                    delay_seconds=digest_seconds,
+                    prioridad_id=effective_prioridad_id,
+                    priority_level=get_priority_level(effective_prioridad_id),
                 )
+                notification_enqueued = True
 
         conn.commit()
     finally:
         conn.close()
 
+    invalidate_ticket_activity()
+    if notification_enqueued:
+        # Despierta al worker en proceso; ya no espera al próximo poll.
+        wake_assignment_notification_worker(delay_seconds=digest_seconds)
+
+
+def get_priority_level(prioridad_id):
+    """Prioridades.Nivel desde los maestros en memoria (None si no se conoce)."""
+    if prioridad_id is None:
+        return None
+    prioridades = (st.session_state.get("master_data") or {}).get("prioridades", [])
+    for prio in prioridades:
+        if prio.get("id") == prioridad_id:
+            return prio.get("nivel")
+    return None
+
+
+def get_notification_digest_seconds():
+    try:
+        return max(0, int(get_secret("NOTIF_DIGEST_WINDOW_SECONDS", 0)))
+    except (TypeError, ValueError):
+        return 0
+
 
 def get_ticket_log_backend():
     adapter = get_db_adapter()
@@ -1576,43 +1657,36 @@ def get_ticket_log_backend():
             raise RuntimeError(
                 f"No existe {prefix}TicketLogs. Ejecuta primero el bootstrap del esquema."
             )
-        return {"mode": "normalized", "table": qname("TicketLogs")}
+        backend = {"mode": "normalized", "table": qname("TicketLogs")}
+        # Logs de tickets cerrados movidos por scripts/archive_ticket_logs.py.
+        if adapter.table_exists(conn, "TicketLogsArchive"):
+            backend["archive_table"] = qname("TicketLogsArchive")
+        return backend
     finally:
         conn.close()
 
 
-def fetch_ticket_comments(ticket_id):
+def fetch_ticket_activity_page(ticket_id, after=None, types=None, page_size=None):
     backend = get_ticket_log_backend()
     adapter = get_db_adapter()
+    # Los usuarios salen de master_indexes; sin JOIN a Users por fila.
+    resolver = get_display_resolver()
 
     conn = get_azure_master_connection()
     try:
-        cursor = conn.cursor()
-        if adapter.is_sqlite:
-            limit_clause = "LIMIT 100"
-            top_clause = ""
-        else:
-            limit_clause = ""
-            top_clause = "TOP 100"
-        cursor.execute(
-            f"""
-            SELECT {top_clause}
-                l.ChangedAt AS FechaHora,
-                COALESCE(u.Username, 'Sistema') AS Usuario,
-                l.FieldName AS Campo,
-                l.OldValue AS [Valor Anterior],
-                l.NewValue AS [Nuevo Valor]
-            FROM {backend["table"]} l
-            LEFT JOIN {qname("Users")} u ON l.UserId = u.UserId
-            WHERE TicketId = ?
-            ORDER BY l.ChangedAt DESC
-            {limit_clause}
-            """,
-            (ticket_id,),
+        return fetch_activity_page(
+            conn,
+            backend["table"],
+            ticket_id,
+            is_sqlite=adapter.is_sqlite,
+            after=after,
+            page_size=page_size or ACTIVITY_PAGE_SIZE,
+            types=types,
+            resolve_username=lambda cursor, user_id: resolver.label(
+                cursor, "Users", user_id
+            ),
+            archive_table=backend.get("archive_table"),
         )
-        rows = cursor.fetchall()
-        cols = [c[0] for c in cursor.description]
-        return pd.DataFrame.from_records(rows, columns=cols)
     finally:
         conn.close()
 
@@ -1625,23 +1699,44 @@ def add_ticket_comment(ticket_id, comment, user_id=None):
         cursor = conn.cursor()
         cursor.execute(
             f"""
-            INSERT INTO {backend["table"]} (TicketId, UserId, IsAi, FieldName, OldValue, NewValue)
-            VALUES (?, ?, 0, 'comment', NULL, ?)
+            INSERT INTO {backend["table"]} (
+                TicketId, UserId, IsAi, FieldName, OldValue, NewValue, EventType
+            )
+            VALUES (?, ?, 0, 'comment', NULL, ?, ?)
             """,
-            (ticket_id, user_id, comment),
+            (ticket_id, user_id, comment, EVENT_COMMENT),
         )
         conn.commit()
     finally:
         conn.close()
+    invalidate_ticket_activity()
+
+
+def invalidate_ticket_activity():
+    # El seguimiento paginado se vuelve a leer desde la primera página.
+    st.session_state.pop("ticket_activity", None)
 
 
 def _log_ticket_change(
-    cursor, backend_table, ticket_id, user_id, field_name, old_value, new_value
+    cursor,
+    backend_table,
+    ticket_id,
+    user_id,
+    field_name,
+    old_value,
+    new_value,
+    event_type=EVENT_FIELD_CHANGE,
+    old_id=None,
+    new_id=None,
 ):
+    invalidate_ticket_activity()
     cursor.execute(
         f"""
-        INSERT INTO {backend_table} (TicketId, UserId, IsAi, FieldName, OldValue, NewValue)
-        VALUES (?, ?, 0, ?, ?, ?)
+        INSERT INTO {backend_table} (
+            TicketId, UserId, IsAi, FieldName, OldValue, NewValue,
+            EventType, OldId, NewId
+        )
+        VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?)
         """,
         (
             ticket_id,
@@ -1649,57 +1744,36 @@ def _log_ticket_change(
             field_name,
             None if old_value is None else str(old_value),
             None if new_value is None else str(new_value),
+            event_type,
+            old_id,
+            new_id,
         ),
     )
 
 
-def _subtask_lookup_display_value(cursor, field_name, raw_value):
-    adapter = get_db_adapter()
+def _subtask_lookup_display_value(cursor, field_name, raw_value, resolver):
     if raw_value is None:
         return None
     if field_name in ("NeedByAt", "CompletedAt") and isinstance(raw_value, datetime):
         return raw_value.replace(microsecond=0).isoformat(sep=" ")
-    if field_name == "AssigneeId":
-        if adapter.is_sqlite:
-            cursor.execute(
-                f"SELECT Username FROM {qname('Users')} WHERE UserId = ? LIMIT 1",
-                (raw_value,),
-            )
-        else:
-            cursor.execute(
-                f"SELECT TOP 1 Username FROM {qname('Users')} WHERE UserId = ?",
-                (raw_value,),
-            )
-        row = cursor.fetchone()
-        return row[0] if row else str(raw_value)
-    if field_name == "EstadoId":
-        if adapter.is_sqlite:
-            cursor.execute(
-                f"SELECT Nombre FROM {qname('Estados')} WHERE EstadoId = ? LIMIT 1",
-                (raw_value,),
-            )
-        else:
-            cursor.execute(
-                f"SELECT TOP 1 Nombre FROM {qname('Estados')} WHERE EstadoId = ?",
-                (raw_value,),
-            )
-        row = cursor.fetchone()
-        return row[0] if row else str(raw_value)
+    if field_name in ("AssigneeId", "EstadoId"):
+        return resolver.display_value(cursor, field_name, raw_value)
     return str(raw_value)
 
 
-def _subtask_compact_repr(cursor, row_dict):
-    assignee = _subtask_lookup_display_value(
-        cursor, "AssigneeId", row_dict.get("AssigneeId")
-    )
-    estado = _subtask_lookup_display_value(cursor, "EstadoId", row_dict.get("EstadoId"))
+def _subtask_compact_repr(cursor, row_dict, resolver):
+    def _disp(field_name):
+        return _subtask_lookup_display_value(
+            cursor, field_name, row_dict.get(field_name), resolver
+        )
+
     return (
         f"SubtaskId={row_dict.get('SubtaskId')} | "
         f"Title={row_dict.get('Title')} | "
-        f"Assignee={assignee} | "
-        f"Estado={estado} | "
-        f"NeedByAt={_subtask_lookup_display_value(cursor, 'NeedByAt', row_dict.get('NeedByAt'))} | "
-        f"CompletedAt={_subtask_lookup_display_value(cursor, 'CompletedAt', row_dict.get('CompletedAt'))}"
+        f"Assignee={_disp('AssigneeId')} | "
+        f"Estado={_disp('EstadoId')} | "
+        f"NeedByAt={_disp('NeedByAt')} | "
+        f"CompletedAt={_disp('CompletedAt')}"
     )
 
 
@@ -1763,6 +1837,7 @@ def create_subtask(ticket_id, payload, actor_user_id):
     backend = get_subtasks_backend()
     logs_backend = get_ticket_log_backend()
     adapter = get_db_adapter()
+    resolver = get_display_resolver()
     conn = get_azure_master_connection()
     try:
         cursor = conn.cursor()
@@ -1856,7 +1931,9 @@ def create_subtask(ticket_id, payload, actor_user_id):
                     actor_user_id,
                     "subtask_created",
                     None,
-                    _subtask_compact_repr(cursor, created_dict),
+                    _subtask_compact_repr(cursor, created_dict, resolver),
+                    event_type=EVENT_SUBTASK_CREATED,
+                    new_id=typed_id("SubtaskId", new_subtask_id),
                 )
 
         conn.commit()
@@ -1885,6 +1962,7 @@ def update_subtask(subtask_id, updates, actor_user_id):
     backend = get_subtasks_backend()
     logs_backend = get_ticket_log_backend()
     adapter = get_db_adapter()
+    resolver = get_display_resolver()
     conn = get_azure_master_connection()
     try:
         cursor = conn.cursor()
@@ -1970,8 +2048,11 @@ def update_subtask(subtask_id, updates, actor_user_id):
                 current["TicketId"],
                 actor_user_id,
                 f"subtask.{field_name}",
-                _subtask_lookup_display_value(cursor, field_name, old_value),
-                _subtask_lookup_display_value(cursor, field_name, new_value),
+                _subtask_lookup_display_value(cursor, field_name, old_value, resolver),
+                _subtask_lookup_display_value(cursor, field_name, new_value, resolver),
+                event_type=EVENT_SUBTASK_UPDATED,
+                old_id=typed_id(field_name, old_value),
+                new_id=typed_id(field_name, new_value),
             )
 
         conn.commit()
@@ -1984,6 +2065,7 @@ def delete_subtask(subtask_id, actor_user_id=None):
     backend = get_subtasks_backend()
     logs_backend = get_ticket_log_backend()
     adapter = get_db_adapter()
+    resolver = get_display_resolver()
     conn = get_azure_master_connection()
     try:
         cursor = conn.cursor()
@@ -2037,8 +2119,10 @@ def delete_subtask(subtask_id, actor_user_id=None):
                 current["TicketId"],
                 actor_user_id,
                 "subtask_deleted",
-                _subtask_compact_repr(cursor, current),
+                _subtask_compact_repr(cursor, current, resolver),
                 None,
+                event_type=EVENT_SUBTASK_DELETED,
+                old_id=typed_id("SubtaskId", subtask_id),
             )
         conn.commit()
         return cursor.rowcount > 0
@@ -2052,18 +2136,40 @@ def delete_subtask(subtask_id, actor_user_id=None):
 
 
 class TicketAssistant:
-    def __init__(self, api_key, model_name):
+    def __init__(self, api_key, model_name, cache=None):
         self.api_key = api_key
+        self.model_name = model_name
+        # ExtractionCache compartido por proceso; cache_hit indica la última llamada.
+        self.cache = cache
+        self.cache_hit = False
         if api_key:
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel(model_name)
         else:
             self.model = None
 
-    def extract_entities(self, user_input, context_json, catalogs):
+    def extract_entities(
+        self, user_input, context_json, catalogs, resolved=None, catalog_version=""
+    ):
+        """resolved: {campo: valor} ya resuelto localmente (ver
+        find_catalog_mentions); el prompt no lista su catálogo ni lo pide.
+        catalog_version identifica los maestros para la clave del cache."""
+        self.cache_hit = False
         if not self.model:
             return {"error": "API Key no configurada"}, 0, ""
 
+        resolved = resolved or {}
+        catalog_lines = format_catalog_lines(catalogs, resolved)
+        resolved_block = ""
+        if resolved:
+            resolved_block = (
+                "### Campos ya resueltos (no los extraigas, devolvelos en null):\n"
+                + "\n".join(
+                    f"        - {field}: {value}" for field, value in resolved.items()
+                )
+                + "\n"
+            )
+
         system_prompt = f"""
         Eres un experto en clasificación de intenciones y extracción de entidades para un sistema de tickets industrial.
         Tu salida debe ser ÚNICAMENTE un objeto JSON válido.
@@ -2096,18 +2202,29 @@ class TicketAssistant:
         - Si la fecha es inferible (ej: "hoy", "próximo lunes"), devuelve fecha_necesidad en formato YYYY-MM-DD.
 
         ### Catálogos disponibles para validar:
-        Plantas: {", ".join(catalogs.get("plantas", []))}
-        Divisiones: {", ".join(catalogs.get("divisiones", []))}
-        Áreas: {", ".join(catalogs.get("areas", []))}
-        Categorías: {", ".join(catalogs.get("categorias", []))}
-        Subcategorías: {", ".join(catalogs.get("subcategorias", []))}
-        Prioridades: {", ".join(catalogs.get("prioridades", []))}
-        Usuarios (username): {", ".join(catalogs.get("usuarios", []))}
-        
-        Contexto Actual: {json.dumps(context_json)}
+        {catalog_lines}
+
+        {resolved_block}
+        Contexto Actual: {json.dumps(context_json, default=dict)}
         Mensaje: "{user_input}"
         """
 
+        key = None
+        if self.cache is not None and self.cache.enabled:
+            # La fecha entra en la clave: "hoy" o "el lunes" cambian de un día a otro.
+            key = cache_key(
+                normalize_text(user_input),
+                context_hash(
+                    context_json, catalogs, resolved, datetime.now().date().isoformat()
+                ),
+                catalog_version,
+                self.model_name,
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hit = True
+                return cached[0], 0, system_prompt
+
         start_time = datetime.now()
         try:
             response = self.model.generate_content(system_prompt)
@@ -2115,6 +2232,8 @@ class TicketAssistant:
             clean_res = response.text.replace("```json", "").replace("```", "").strip()
             entities = json.loads(clean_res)
             processing_time = (datetime.now() - start_time).total_seconds() * 1000
+            if key is not None:
+                self.cache.put(key, entities, processing_time)
             return entities, processing_time, system_prompt
         except Exception as e:
             return {"error": str(e)}, 0, system_prompt
@@ -2479,7 +2598,9 @@ st.markdown(
 
 startup_placeholder = st.empty()
 db_boot_error = None
-needs_master_bootstrap = "master_data" not in st.session_state
+needs_master_bootstrap = (
+    MASTER_STORE.current() is None and "master_data" not in st.session_state
+)
 _db_label = get_db_mode_label()
 if needs_master_bootstrap:
     with startup_placeholder.container():
@@ -2491,9 +2612,27 @@ except Exception as db_err:
     st.session_state.db_connected = False
     db_boot_error = db_err
 
-if st.session_state.db_connected and needs_master_bootstrap:
-    st.session_state.master_data = load_master_data()
-    st.session_state.master_indexes = build_master_indexes(st.session_state.master_data)
+# Un snapshot por proceso: la primera sesión lo carga y las demás lo reutilizan.
+if st.session_state.db_connected:
+    MASTER_STORE.get(
+        build_master_snapshot,
+        fetch_master_versions,
+        snapshot_file=get_master_snapshot_file(),
+        index_builder=build_master_indexes,
+    )
+    # Cambios de los editores de maestros: una consulta barata, espaciada.
+    try:
+        MASTER_STORE.sync(
+            fetch_master_versions,
+            rebuild_master_snapshot,
+            min_interval=int(get_secret("MASTER_DATA_CHECK_SECONDS", "30")),
+        )
+    except Exception as sync_err:
+        db_boot_error = sync_err
+_master_snapshot = MASTER_STORE.current()
+if _master_snapshot is not None:
+    if st.session_state.get("master_data_version") != _master_snapshot.version:
+        adopt_master_snapshot(_master_snapshot)
 elif "master_data" not in st.session_state:
     startup_placeholder.empty()
     st.error(f"❌ Error de conexión a {_db_label}: {db_boot_error}")
@@ -2502,24 +2641,10 @@ elif "master_data" not in st.session_state:
         st.rerun()
     st.stop()
 
-if "master_indexes" not in st.session_state:
-    st.session_state.master_indexes = build_master_indexes(st.session_state.master_data)
-else:
-    required_index_keys = {
-        "usuarios_by_norm",
-        "usuarios_by_email_local",
-        "usuarios_by_token",
-        "user_to_area_division",
-    }
-    if not required_index_keys.issubset(set(st.session_state.master_indexes.keys())):
-        st.session_state.master_indexes = build_master_indexes(
-            st.session_state.master_data
-        )
-
 startup_placeholder.empty()
 if db_boot_error and "master_data" in st.session_state:
     st.warning(
-        f"⚠️ Conexión {_db_label} inestable. Se continúa con datos maestros en caché de la sesión."
+        f"⚠️ Conexión {_db_label} inestable. Se continúa con datos maestros en caché."
     )
 
 try:
@@ -2573,19 +2698,35 @@ try:
     poll_seconds = int(get_secret("NOTIF_POLL_SECONDS", 5))
 except Exception:
     poll_seconds = 5
-start_assignment_notification_worker_once(
-    get_connection=get_azure_master_connection,
-    get_schema=get_master_schema,
-    app_url=get_secret("APP_BASE_URL", ""),
-    poll_seconds=poll_seconds,
-    smtp_config={
-        "SMTP_HOST": get_secret("SMTP_HOST", ""),
-        "SMTP_PORT": get_secret("SMTP_PORT", 587),
-        "SMTP_USER": get_secret("SMTP_USER", ""),
-        "SMTP_PASSWORD": get_secret("SMTP_PASSWORD", ""),
-        "SMTP_SENDER": get_secret("SMTP_SENDER", ""),
-    },
-)
+try:
+    poll_max_seconds = int(get_secret("NOTIF_POLL_MAX_SECONDS", 60))
+except Exception:
+    poll_max_seconds = 60
+try:
+    smtp_concurrency = int(get_secret("NOTIF_SMTP_CONCURRENCY", 4))
+except Exception:
+    smtp_concurrency = 4
+# NOTIF_INPROCESS_WORKER=false cuando corre `python -m notification_assignment` aparte.
+inprocess_worker = str(get_secret("NOTIF_INPROCESS_WORKER", "true")).strip().lower()
+if inprocess_worker not in ("0", "false", "no", "off"):
+    start_assignment_notification_worker_once(
+        get_connection=get_azure_master_connection,
+        get_schema=get_master_schema,
+        app_url=get_secret("APP_BASE_URL", ""),
+        poll_seconds=poll_seconds,
+        poll_max_seconds=poll_max_seconds,
+        smtp_concurrency=smtp_concurrency,
+        digest_window_seconds=get_notification_digest_seconds(),
+        **worker_settings(get_secret),
+        smtp_config={
+            "SMTP_HOST": get_secret("SMTP_HOST", ""),
+            "SMTP_PORT": get_secret("SMTP_PORT", 587),
+            "SMTP_USER": get_secret("SMTP_USER", ""),
+            "SMTP_PASSWORD": get_secret("SMTP_PASSWORD", ""),
+            "SMTP_SENDER": get_secret("SMTP_SENDER", ""),
+            "SMTP_STARTTLS": get_secret("SMTP_STARTTLS", "true"),
+        },
+    )
 
 # Cargar API Key: prioridad Streamlit Secrets (deploy), fallback .env (local)
 try:
@@ -2636,6 +2777,8 @@ if "last_ai_res" not in st.session_state:
     st.session_state.last_ai_res = {}
 if "last_prompt" not in st.session_state:
     st.session_state.last_prompt = ""
+if "last_local_fields" not in st.session_state:
+    st.session_state.last_local_fields = {}
 if "show_confirm_buttons" not in st.session_state:
     st.session_state.show_confirm_buttons = False
 if "chat_draft_edit_mode" not in st.session_state:
@@ -2863,6 +3006,16 @@ def render_chat_mode(api_key, model_name, debug_expander):
             st.write("**Estado Chat:**", st.session_state.get("chat_flow_state"))
             st.write("**Borrador Actual:**", st.session_state.ticket_draft)
             st.write("**Última Respuesta JSON IA:**", st.session_state.last_ai_res)
+            st.write("**Resuelto localmente:**", st.session_state.last_local_fields)
+            st.write(
+                "**Cache de extracción:**",
+                {
+                    **EXTRACTION_CACHE.stats(),
+                    "ultima_desde_cache": st.session_state.get(
+                        "last_extraction_cached", False
+                    ),
+                },
+            )
             st.write("**Prompt Enviado:**")
             st.code(st.session_state.last_prompt or "", language="text")
 
@@ -2878,15 +3031,28 @@ def handle_chat_input_and_processing(api_key, model_name):
         st.rerun()
 
     if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-        assistant = TicketAssistant(api_key, model_name)
+        assistant = TicketAssistant(api_key, model_name, cache=get_extraction_cache())
         user_input = st.session_state.messages[-1]["content"]
         with st.spinner("Procesando..."):
-            catalogs = get_llm_catalogs(st.session_state.master_data)
+            catalogs = get_llm_catalogs(
+                st.session_state.master_indexes,
+                user_input,
+                st.session_state.ticket_draft,
+            )
+            local_fields = get_local_mentions(
+                user_input, st.session_state.master_indexes
+            )
             ai_res, p_time, s_prompt = assistant.extract_entities(
-                user_input, st.session_state.ticket_draft, catalogs
+                user_input,
+                st.session_state.ticket_draft,
+                catalogs,
+                local_fields,
+                catalog_version=get_master_catalog_version(),
             )
             ai_res["ai_processing_time"] = int(p_time)
             st.session_state.last_ai_res = ai_res
+            st.session_state.last_extraction_cached = assistant.cache_hit
+            st.session_state.last_local_fields = local_fields
             st.session_state.last_prompt = s_prompt
             suggested_user_by_rule = extract_suggested_user_from_text(user_input)
 
@@ -2899,7 +3065,7 @@ def handle_chat_input_and_processing(api_key, model_name):
                     )
                 elif intencion == "crear_ticket":
                     for k in st.session_state.ticket_draft.keys():
-                        v = ai_res.get(k)
+                        v = local_fields.get(k, ai_res.get(k))
                         if v is not None and v != "":
                             if k == "descripcion":
                                 if should_update_description(
@@ -3128,21 +3294,35 @@ def render_form_mode():
                 else None
             )
 
-            df = fetch_tickets_for_form(
-                {
-                    "estado_id": estado_id,
-                    "prioridad_id": prioridad_id,
-                    "area_id": area_id,
-                    "suggested_assignee_id": suggested_assignee_id,
-                    "query": q.strip() if q else None,
-                },
-                limit=None,
-            )
+            tray_filters = {
+                "estado_id": estado_id,
+                "prioridad_id": prioridad_id,
+                "area_id": area_id,
+                "suggested_assignee_id": suggested_assignee_id,
+                "query": q.strip() if q else None,
+            }
+            # TRAY_DISPLAY_LIMIT (0 = sin tope) acota la grilla a los más recientes;
+            # la exportación lee siempre todo en bloques.
+            display_limit = max(0, int(get_secret("TRAY_DISPLAY_LIMIT", 0)))
+            df = fetch_tickets_for_form(tray_filters, limit=display_limit or None)
             if df.empty:
                 st.info("No hay tickets para los filtros seleccionados.")
                 return
 
-            st.caption(f"Mostrando {len(df)} tickets.")
+            total_tray_rows = (
+                count_tickets_for_form(tray_filters)
+                if display_limit and len(df) >= display_limit
+                else len(df)
+            )
+            if total_tray_rows > len(df):
+                st.warning(
+                    f"Mostrando los {len(df)} tickets más recientes de "
+                    f"{total_tray_rows} (TRAY_DISPLAY_LIMIT). La reasignación masiva "
+                    "y la vista imprimible solo incluyen estos; exportá para "
+                    "obtener todos."
+                )
+            else:
+                st.caption(f"Mostrando {len(df)} tickets.")
             SIN_DEFINIR = "Sin definir"
             display_columns = [
                 "TicketId",
@@ -3420,6 +3600,11 @@ def render_form_mode():
                 title=f"Bandeja de tickets filtrados ({len(df)} registros)",
                 state_key="form_ticket_grid_print",
             )
+            render_tray_export(
+                filters=tray_filters,
+                total_rows=total_tray_rows,
+                state_key="form_ticket_grid_export",
+            )
             return
 
         selected_ticket_id = st.session_state.form_selected_ticket_id
@@ -3834,24 +4019,54 @@ def render_form_mode():
 
         st.markdown("#### Seguimiento / Comentarios")
         try:
-            comments = fetch_ticket_comments(selected_ticket_id)
-            if comments.empty:
-                st.caption("Sin comentarios registrados.")
+            activity_types = st.multiselect(
+                "Tipo de actividad",
+                options=list(ACTIVITY_TYPES),
+                default=list(ACTIVITY_TYPES),
+                format_func=ACTIVITY_TYPES.get,
+                key="form_activity_types",
+            )
+            # Páginas ya leídas por ticket y filtro; "Cargar más" sigue desde el cursor.
+            activity_key = (selected_ticket_id, tuple(activity_types))
+            activity = st.session_state.get("ticket_activity")
+            if not activity or activity["key"] != activity_key:
+                rows, next_cursor = fetch_ticket_activity_page(
+                    selected_ticket_id, types=activity_types
+                )
+                activity = {"key": activity_key, "rows": rows, "cursor": next_cursor}
+                st.session_state["ticket_activity"] = activity
+
+            if not activity_types:
+                st.caption("Elegí al menos un tipo de actividad.")
+            elif not activity["rows"]:
+                st.caption("Sin actividad registrada.")
             else:
                 st.dataframe(
-                    comments[
-                        [
+                    pd.DataFrame.from_records(
+                        activity["rows"],
+                        columns=[
                             "FechaHora",
                             "Usuario",
+                            "Tipo",
                             "Campo",
                             "Valor Anterior",
                             "Nuevo Valor",
-                        ]
-                    ],
+                        ],
+                    ),
                     width="stretch",
                     height=180,
                     hide_index=True,
                 )
+            if activity["cursor"] is not None:
+                if st.button("Cargar más", key="form_activity_more"):
+                    rows, next_cursor = fetch_ticket_activity_page(
+                        selected_ticket_id,
+                        after=activity["cursor"],
+                        types=activity_types,
+                    )
+                    activity["rows"].extend(rows)
+                    activity["cursor"] = next_cursor
+                    st.rerun()
             cmt = st.text_area("Nuevo comentario", key="form_comment_text")
             if st.button("Agregar comentario", key="form_add_comment"):
                 if cmt.strip():
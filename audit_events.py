@@ -0,0 +1,112 @@
+# Tipos de evento de TicketLogs.EventType (valores persistidos, no renombrar).
+EVENT_FIELD_CHANGE = "field_change"
+EVENT_STATUS_CHANGE = "status_change"
+EVENT_ASSIGNMENT = "assignment"
+EVENT_PRIORITY_CHANGE = "priority_change"
+EVENT_ASSIGNMENT_NOTICE = "assignment_notice"
+EVENT_COMMENT = "comment"
+EVENT_SUBTASK_CREATED = "subtask_created"
+EVENT_SUBTASK_UPDATED = "subtask_updated"
+EVENT_SUBTASK_DELETED = "subtask_deleted"
+EVENT_NOTIFICATION = "notification"
+
+# Columna de Tickets con FK -> tipo de evento propio; el resto es field_change.
+_TICKET_FIELD_EVENTS = {
+    "EstadoId": EVENT_STATUS_CHANGE,
+    "AssigneeId": EVENT_ASSIGNMENT,
+    "PrioridadId": EVENT_PRIORITY_CHANGE,
+}
+
+# Columnas cuyo valor es un ID: se guardan también en OldId/NewId.
+# SubtaskId identifica la subtarea en subtask_created/subtask_deleted.
+ID_FIELDS = (
+    "PlantaId",
+    "AreaId",
+    "CategoriaId",
+    "SubcategoriaId",
+    "PrioridadId",
+    "EstadoId",
+    "AssigneeId",
+    "SubtaskId",
+)
+
+# Columna de Tickets -> FieldName que se escribe en TicketLogs.
+TICKET_LOG_FIELD_NAMES = {
+    "PlantaId": "Planta",
+    "AreaId": "Area",
+    "CategoriaId": "Categoria",
+    "SubcategoriaId": "Subcategoria",
+    "PrioridadId": "Prioridad",
+    "EstadoId": "Estado",
+    "AssigneeId": "Assignee",
+}
+
+# FieldName ya escrito en TicketLogs -> EventType (backfill de filas previas).
+LEGACY_FIELD_EVENTS = {
+    "Estado": EVENT_STATUS_CHANGE,
+    "Assignee": EVENT_ASSIGNMENT,
+    "Prioridad": EVENT_PRIORITY_CHANGE,
+    "CambioAsignacion": EVENT_ASSIGNMENT_NOTICE,
+    "comment": EVENT_COMMENT,
+    "subtask_created": EVENT_SUBTASK_CREATED,
+    "subtask_deleted": EVENT_SUBTASK_DELETED,
+}
+
+
+def ticket_field_event(field_name):
+    return _TICKET_FIELD_EVENTS.get(field_name, EVENT_FIELD_CHANGE)
+
+
+def typed_id(field_name, raw_value):
+    """ID entero para OldId/NewId; None si el campo no es de catálogo."""
+    if raw_value is None or field_name not in ID_FIELDS:
+        return None
+    try:
+        return int(raw_value)
+    except (TypeError, ValueError):
+        return None
+
+
+def insert_field_change_logs(
+    cursor, table, ticket_id, actor_user_id, changed_items, resolver
+):
+    """Una fila tipada de log por (campo, valor anterior, valor nuevo).
+
+    Las etiquetas salen de `resolver` (DisplayValueResolver), que solo consulta
+    la base ante un ID que no está en los maestros.
+    """
+    labels = resolver.display_changes(cursor, changed_items)
+    for (field_name, old_value, new_value), (old_disp, new_disp) in zip(
+        changed_items, labels
+    ):
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (
+                TicketId, UserId, IsAi, FieldName, OldValue, NewValue,
+                EventType, OldId, NewId
+            )
+            VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                ticket_id,
+                actor_user_id,
+                TICKET_LOG_FIELD_NAMES.get(field_name, field_name),
+                old_disp,
+                new_disp,
+                ticket_field_event(field_name),
+                typed_id(field_name, old_value),
+                typed_id(field_name, new_value),
+            ),
+        )
+
+
+def legacy_event_type_sql(column="FieldName"):
+    """CASE SQL que deriva EventType desde FieldName para filas sin tipar."""
+    whens = " ".join(
+        f"WHEN '{field}' THEN '{event}'" for field, event in LEGACY_FIELD_EVENTS.items()
+    )
+    return (
+        f"CASE WHEN {column} LIKE 'subtask.%' THEN '{EVENT_SUBTASK_UPDATED}' "
+        f"WHEN {column} LIKE 'Notificacion%' THEN '{EVENT_NOTIFICATION}' "
+        f"ELSE CASE {column} {whens} ELSE '{EVENT_FIELD_CHANGE}' END END"
+    )
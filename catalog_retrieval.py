@@ -0,0 +1,125 @@
+import math
+import sys
+from array import array
+
+from fuzzy_index import FUZZY_ACCEPT_SCORE, FuzzyIndex
+from mention_matcher import mention_tokens
+
+# (campo de ticket_draft, catálogo, rótulo en el prompt), en el orden del prompt.
+LLM_CATALOG_FIELDS = (
+    ("planta", "plantas", "Plantas"),
+    ("division", "divisiones", "Divisiones"),
+    ("area", "areas", "Áreas"),
+    ("categoria", "categorias", "Categorías"),
+    ("subcategoria", "subcategorias", "Subcategorías"),
+    ("prioridad", "prioridades", "Prioridades"),
+    ("usuario_sugerido", "usuarios", "Usuarios (username)"),
+)
+LLM_CATALOGS = tuple(catalog for _field, catalog, _label in LLM_CATALOG_FIELDS)
+
+# Catálogos de hasta FULL_MAX entradas van completos (la categoría se infiere
+# por significado, no por palabras); los más grandes se recortan a TOP_K.
+LLM_CATALOG_TOP_K = 25
+LLM_CATALOG_FULL_MAX = 60
+
+# Palabras de la consulta más cortas no se buscan con tolerancia a errores.
+_FUZZY_MIN_TOKEN = 4
+# Cobertura mínima: coincidir solo en "subcategoria" no hace plausible a ninguna.
+_MIN_COVERAGE = 0.3
+
+
+def format_catalog_lines(catalogs, resolved=(), indent="        "):
+    """Sección "Catálogos disponibles" del prompt, sin los campos ya resueltos."""
+    return f"\n{indent}".join(
+        f"{label}: {', '.join(catalogs.get(catalog, []))}"
+        for field, catalog, label in LLM_CATALOG_FIELDS
+        if field not in resolved
+    )
+
+
+class _CatalogTerms:
+    """Palabras de los nombres de un catálogo con su peso IDF."""
+
+    __slots__ = ("names", "_postings", "_idf", "_norms", "_vocab")
+
+    def __init__(self, entries):
+        # entries: (nombre, nombre_normalizado) sin repetidos.
+        self.names = tuple(name for name, _norm in entries)
+        postings = {}
+        entry_tokens = []
+        for entry_id, (_name, norm) in enumerate(entries):
+            tokens = {sys.intern(t) for t in mention_tokens(norm)}
+            entry_tokens.append(tokens)
+            for token in tokens:
+                postings.setdefault(token, array("I")).append(entry_id)
+        total = len(self.names)
+        # Una palabra que aparece en casi todo el catálogo ("planta") pesa poco.
+        self._idf = {
+            token: math.log((total + 1) / (len(ids) + 0.5)) + 0.1
+            for token, ids in postings.items()
+        }
+        self._norms = array(
+            "d", (sum(self._idf[t] for t in tokens) or 1.0 for tokens in entry_tokens)
+        )
+        self._postings = postings
+        self._vocab = FuzzyIndex(
+            (token, token) for token in postings if len(token) >= _FUZZY_MIN_TOKEN
+        )
+
+    def top(self, query_tokens, top_k):
+        # Palabra del catálogo -> peso de la coincidencia (1 exacta, <1 aproximada).
+        weights = {}
+        for token in query_tokens:
+            if token in self._postings:
+                weights[token] = 1.0
+            elif len(token) >= _FUZZY_MIN_TOKEN:
+                for match, score in self._vocab.search(token, limit=2):
+                    if score >= FUZZY_ACCEPT_SCORE:
+                        weights[match] = max(weights.get(match, 0.0), score)
+        scores = {}
+        for token, weight in weights.items():
+            gain = weight * self._idf[token]
+            for entry_id in self._postings[token]:
+                scores[entry_id] = scores.get(entry_id, 0.0) + gain
+        # Cobertura: qué parte del nombre (ponderada por IDF) aparece en la consulta.
+        ranked = [
+            (score / self._norms[entry_id], score, entry_id)
+            for entry_id, score in scores.items()
+            if score / self._norms[entry_id] >= _MIN_COVERAGE
+        ]
+        ranked.sort(key=lambda hit: (-hit[0], -hit[1], hit[2]))
+        return [self.names[entry_id] for _cov, _score, entry_id in ranked[:top_k]]
+
+
+class CatalogRetriever:
+    """Recorta los catálogos del prompt a los candidatos plausibles de un mensaje.
+
+    Puntaje léxico por palabras (IDF y cobertura del nombre) con tolerancia a
+    errores de tipeo vía FuzzyIndex sobre el vocabulario de cada catálogo. Se
+    arma junto con los índices de maestros; `base` reutiliza los catálogos que
+    no cambiaron.
+    """
+
+    __slots__ = ("_terms",)
+
+    def __init__(self, entries_by_catalog, base=None):
+        self._terms = dict(base._terms) if base is not None else {}
+        for catalog, entries in entries_by_catalog.items():
+            self._terms[catalog] = _CatalogTerms(entries)
+
+    def full(self):
+        """{catálogo: nombres} sin recortar (comportamiento previo)."""
+        return {catalog: list(terms.names) for catalog, terms in self._terms.items()}
+
+    def select(
+        self, norm_query, top_k=LLM_CATALOG_TOP_K, full_max=LLM_CATALOG_FULL_MAX
+    ):
+        """{catálogo: nombres}: completos si son chicos, top_k si no."""
+        query_tokens = set(mention_tokens(norm_query))
+        out = {}
+        for catalog, terms in self._terms.items():
+            if len(terms.names) <= full_max:
+                out[catalog] = list(terms.names)
+            else:
+                out[catalog] = terms.top(query_tokens, top_k)
+        return out
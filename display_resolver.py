@@ -0,0 +1,121 @@
+from datetime import datetime
+
+# Campo de Tickets/Subtasks -> tabla de catálogo que lo resuelve.
+FIELD_CATALOGS = {
+    "PlantaId": "Plantas",
+    "AreaId": "Areas",
+    "CategoriaId": "Categorias",
+    "SubcategoriaId": "Subcategorias",
+    "PrioridadId": "Prioridades",
+    "EstadoId": "Estados",
+    "AssigneeId": "Users",
+}
+
+# Tabla de catálogo -> (clave en master_data, atributo con la etiqueta, PK, columna SQL).
+CATALOG_SOURCES = {
+    "Plantas": ("plantas", "nombre", "PlantaId", "Nombre"),
+    "Divisiones": ("divisiones", "nombre", "DivisionId", "Nombre"),
+    "Areas": ("areas", "nombre", "AreaId", "Nombre"),
+    "Categorias": ("categorias", "nombre", "CategoriaId", "Nombre"),
+    "Subcategorias": ("subcategorias", "nombre", "SubcategoriaId", "Nombre"),
+    "Prioridades": ("prioridades", "nombre", "PrioridadId", "Nombre"),
+    "Estados": ("estados", "nombre", "EstadoId", "Nombre"),
+    "Users": ("usuarios", "username", "UserId", "Username"),
+}
+
+
+def build_label_maps(master_data):
+    labels_by_id = {}
+    for table, (data_key, label_attr, _pk, _col) in CATALOG_SOURCES.items():
+        labels_by_id[table] = {
+            row["id"]: row[label_attr]
+            for row in master_data.get(data_key, [])
+            if row.get("id") is not None
+        }
+    return labels_by_id
+
+
+def format_plain_value(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0).isoformat(sep=" ")
+    return str(value)
+
+
+class DisplayValueResolver:
+    """Etiquetas de catálogo desde memoria; la base se consulta solo ante un faltante."""
+
+    def __init__(self, labels_by_id, adapter):
+        # Los mapas de master_indexes se comparten por referencia, no se copian.
+        self._labels = labels_by_id or {}
+        self._fetched = {}
+        self._adapter = adapter
+        self.hits = 0
+        self.misses = 0
+
+    def label(self, cursor, table, raw_id):
+        if raw_id is None:
+            return None
+        key = _normalize_id(raw_id)
+        labels = self._labels.get(table, {})
+        if key in labels:
+            self.hits += 1
+            return labels[key]
+        fetched = self._fetched.setdefault(table, {})
+        if key in fetched:
+            self.hits += 1
+            return fetched[key]
+
+        self.misses += 1
+        label = self._fetch_label(cursor, table, key)
+        # Se memoriza también el faltante (None) para no repetir la consulta.
+        fetched[key] = label
+        return label
+
+    def display_value(self, cursor, field_name, raw_value):
+        if raw_value is None:
+            return None
+        table = FIELD_CATALOGS.get(field_name)
+        if table is None:
+            return format_plain_value(raw_value)
+        label = self.label(cursor, table, raw_value)
+        return label if label is not None else format_plain_value(raw_value)
+
+    def display_changes(self, cursor, changed_items):
+        """(etiqueta anterior, etiqueta nueva) como texto por cada (campo, old, new)."""
+        return [
+            (
+                _as_text(self.display_value(cursor, field_name, old_value)),
+                _as_text(self.display_value(cursor, field_name, new_value)),
+            )
+            for field_name, old_value, new_value in changed_items
+        ]
+
+    def _fetch_label(self, cursor, table, raw_id):
+        if cursor is None or table not in CATALOG_SOURCES:
+            return None
+        _data_key, _attr, pk_col, label_col = CATALOG_SOURCES[table]
+        if self._adapter.is_sqlite:
+            cursor.execute(
+                f"SELECT {label_col} FROM {self._adapter.qname(table)} WHERE {pk_col} = ? LIMIT 1",
+                (raw_id,),
+            )
+        else:
+            cursor.execute(
+                f"SELECT TOP 1 {label_col} FROM {self._adapter.qname(table)} WHERE {pk_col} = ?",
+                (raw_id,),
+            )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+def _as_text(value):
+    return None if value is None else str(value)
+
+
+def _normalize_id(raw_id):
+    try:
+        return int(raw_id)
+    except (TypeError, ValueError):
+        return raw_id
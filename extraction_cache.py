@@ -0,0 +1,198 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+
+# Cada cuántas escrituras se borran del archivo las entradas vencidas.
+_PRUNE_EVERY = 100
+
+
+def context_hash(*parts):
+    """SHA-256 estable de estructuras JSON (borrador, catálogos enviados, etc.)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=dict)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_key(norm_message, context, catalog_version, model_name):
+    return context_hash(norm_message, context, str(catalog_version), model_name)
+
+
+class ExtractionCache:
+    """Respuestas de extracción por clave, LRU con vencimiento, una por proceso.
+
+    Opcionalmente persiste en un archivo SQLite local (path) para sobrevivir
+    reinicios; si el archivo falla se sigue solo en memoria. Las respuestas se
+    guardan como JSON: cada lectura devuelve un dict nuevo que el llamador
+    puede modificar.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=3600, path=None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._configured_path = None
+        self._path = None
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self.last_error = None
+        self.configure(max_entries, ttl_seconds, path)
+
+    def configure(self, max_entries, ttl_seconds, path=None):
+        with self._lock:
+            self.max_entries = max(0, int(max_entries))
+            self.ttl_seconds = max(0, float(ttl_seconds))
+            if path != self._configured_path:
+                # Un archivo que falló no se reintenta hasta que cambie la ruta.
+                self._configured_path = self._path = path
+                self.last_error = None
+                if path:
+                    self._init_file()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, key):
+        """(respuesta, ms que costó generarla) o None."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+            path = self._path
+        if entry is None:
+            # El archivo se lee fuera del lock: no frena a los demás hilos.
+            entry = self._load(path, key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self._remember(key, entry)
+            self.hits += 1
+            self.saved_ms += entry[2]
+        return json.loads(entry[1]), entry[2]
+
+    def put(self, key, response, processing_ms):
+        if not self.enabled:
+            return
+        entry = (
+            time.time() + self.ttl_seconds,
+            json.dumps(response, ensure_ascii=False, default=str),
+            float(processing_ms or 0),
+        )
+        with self._lock:
+            self._remember(key, entry)
+            path = self._path
+            self._puts += 1
+            prune = self._puts % _PRUNE_EVERY == 0
+            max_entries = self.max_entries
+        if path:
+            self._store(path, key, entry, max_entries if prune else None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "saved_ms": int(self.saved_ms),
+            "persistent": bool(self._path),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+            self.saved_ms = 0.0
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # --- Persistencia ---
+    # _init_file corre con self._lock tomado; _load y _store no, y reciben la
+    # ruta leída bajo el lock (cada llamada abre su propia conexión).
+
+    def _connect(self, path=None):
+        return sqlite3.connect(path or self._path, timeout=5)
+
+    def _init_file(self):
+        try:
+            folder = os.path.dirname(self._path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS ExtractionCache (
+                        CacheKey TEXT PRIMARY KEY,
+                        Response TEXT NOT NULL,
+                        ProcessingMs REAL NOT NULL,
+                        ExpiresAt REAL NOT NULL
+                    )
+                    """
+                )
+        except (OSError, sqlite3.Error) as exc:
+            self._disable_file(self._path, exc)
+
+    def _load(self, path, key, now):
+        if not path:
+            return None
+        try:
+            with closing(self._connect(path)) as conn:
+                row = conn.execute(
+                    "SELECT ExpiresAt, Response, ProcessingMs FROM ExtractionCache "
+                    "WHERE CacheKey = ? AND ExpiresAt > ?",
+                    (key, now),
+                ).fetchone()
+        except sqlite3.Error as exc:
+            self._disable_file(path, exc)
+            return None
+        return tuple(row) if row else None
+
+    def _store(self, path, key, entry, prune_to=None):
+        """Guarda la entrada; con prune_to borra vencidas y recorta a ese tope."""
+        try:
+            with closing(self._connect(path)) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ExtractionCache "
+                    "(CacheKey, ExpiresAt, Response, ProcessingMs) VALUES (?, ?, ?, ?)",
+                    (key, *entry),
+                )
+                if prune_to is not None:
+                    conn.execute(
+                        "DELETE FROM ExtractionCache WHERE ExpiresAt <= ?",
+                        (time.time(),),
+                    )
+                    # Mismo tope que en memoria: quedan las que vencen más tarde.
+                    conn.execute(
+                        "DELETE FROM ExtractionCache WHERE CacheKey NOT IN ("
+                        "SELECT CacheKey FROM ExtractionCache "
+                        "ORDER BY ExpiresAt DESC LIMIT ?)",
+                        (prune_to,),
+                    )
+        except sqlite3.Error as exc:
+            self._disable_file(path, exc)
+
+    def _disable_file(self, path, exc):
+        # Sin archivo solo se pierde el cache entre reinicios. Si mientras tanto
+        # se configuró otra ruta, el error viejo no la desactiva.
+        if path == self._path:
+            self.last_error = exc
+            self._path = None
+
+
+EXTRACTION_CACHE = ExtractionCache()
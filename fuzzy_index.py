@@ -0,0 +1,126 @@
+from array import array
+from bisect import bisect_left
+from math import ceil
+
+# Puntaje mínimo para devolver un candidato y para aceptarlo sin preguntar.
+FUZZY_MIN_SCORE = 0.5
+FUZZY_ACCEPT_SCORE = 0.72
+# Ventaja mínima del primero sobre el segundo para no considerarlo ambiguo.
+FUZZY_MARGIN = 0.1
+
+
+def trigrams(text):
+    """Trigramas de caracteres con relleno (los bordes de palabra pesan más)."""
+    if not text:
+        return set()
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_similarity(a, b):
+    """1 - distancia de edición (con transposiciones) / largo mayor."""
+    if a == b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    prev2, prev = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            cost = 0 if ca == cb else 1
+            row[j] = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                row[j] = min(row[j], prev2[j - 2] + 1)
+        prev2, prev = prev, row
+    return 1.0 - prev[-1] / max(len(a), len(b))
+
+
+class FuzzyIndex:
+    """Índice de trigramas para resolver nombres mal escritos.
+
+    Candidatos: coeficiente de Dice entre los trigramas de la consulta y los de
+    cada clave, generados solo desde los trigramas más raros de la consulta
+    (prefix filtering): quien no comparte ninguno no puede llegar al mínimo.
+    Los mejores se reordenan con la similitud de edición, que tolera letras
+    invertidas ("calidda") mejor que los trigramas.
+    Las claves deben venir normalizadas (normalize_text); la consulta también.
+    """
+
+    __slots__ = ("_items", "_keys", "_sizes", "_postings")
+
+    def __init__(self, entries=()):
+        # entries: (clave_normalizada, item); un item puede tener varias claves.
+        self._items = []
+        self._keys = []
+        self._sizes = array("H")
+        postings = {}
+        for key, item in entries:
+            grams = trigrams(key)
+            if not grams:
+                continue
+            entry_id = len(self._items)
+            self._items.append(item)
+            self._keys.append(key)
+            self._sizes.append(min(len(grams), 0xFFFF))
+            for gram in grams:
+                postings.setdefault(gram, array("I")).append(entry_id)
+        # Los entry_id se agregan en orden creciente: cada posting queda ordenado.
+        self._postings = postings
+
+    def __len__(self):
+        return len(self._items)
+
+    def search(self, norm_text, limit=5, min_score=FUZZY_MIN_SCORE):
+        """[(item, puntaje)] de mayor a menor puntaje, un resultado por item."""
+        query = trigrams(norm_text)
+        if not query or not self._items:
+            return []
+        q = len(query)
+        # Dice = 2c/(q+n) y n >= c  =>  hace falta c >= s*q/(2-s).
+        needed = max(1, ceil(min_score * q / (2 - min_score) - 1e-9))
+        empty = array("I")
+        grams = sorted(
+            (self._postings.get(gram, empty) for gram in query), key=len
+        )
+        prefix, rest = grams[: q - needed + 1], grams[q - needed + 1 :]
+
+        shared = {}
+        for posting in prefix:
+            for entry_id in posting:
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        scored = []
+        for entry_id, count in shared.items():
+            for posting in rest:
+                pos = bisect_left(posting, entry_id)
+                if pos < len(posting) and posting[pos] == entry_id:
+                    count += 1
+            score = 2.0 * count / (q + self._sizes[entry_id])
+            if score >= min_score:
+                scored.append((score, entry_id))
+        scored.sort(reverse=True)
+
+        best = {}
+        for score, entry_id in scored[: max(limit * 4, 10)]:
+            score = max(score, edit_similarity(norm_text, self._keys[entry_id]))
+            item = self._items[entry_id]
+            previous = best.get(id(item))
+            if previous is None or score > previous[1]:
+                best[id(item)] = (item, score)
+        ranked = sorted(best.values(), key=lambda hit: -hit[1])
+        return [(item, round(score, 3)) for item, score in ranked[:limit]]
+
+
+def pick_fuzzy(index, norm_text):
+    """(item, hits): item si el mejor candidato es claro; hits para sugerencias."""
+    if index is None or not norm_text:
+        return None, []
+    hits = index.search(norm_text, limit=3)
+    if not hits or hits[0][1] < FUZZY_ACCEPT_SCORE:
+        return None, hits
+    if hits[0][1] >= 1.0 and (len(hits) == 1 or hits[1][1] < 1.0):
+        # Clave idéntica ("juan perez" -> perez_juan): gana aunque haya parecidos.
+        return hits[0][0], hits
+    if len(hits) > 1 and hits[0][1] - hits[1][1] < FUZZY_MARGIN:
+        return None, hits
+    return hits[0][0], hits
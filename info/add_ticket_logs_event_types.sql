@@ -0,0 +1,117 @@
+/*
+Eventos tipados de auditoria en TicketLogs
+Script idempotente para Azure SQL Server.
+
+Objetivo:
+- Agregar EventType (enum en texto, ver audit_events.py) y OldId/NewId (IDs tipados)
+  a gestar.TicketLogs y, si existe, a gestar.TicketLogsArchive
+- Indice (EventType, ChangedAt) para analitica de transiciones sin parsear textos
+- Completar EventType de filas previas a partir de FieldName (sin IDs: solo hay nombres)
+*/
+
+SET NOCOUNT ON;
+GO
+
+IF OBJECT_ID('gestar.TicketLogs', 'U') IS NULL
+BEGIN
+    THROW 50001, 'No existe gestar.TicketLogs.', 1;
+END
+GO
+
+IF COL_LENGTH('gestar.TicketLogs', 'EventType') IS NULL
+    ALTER TABLE gestar.TicketLogs ADD EventType NVARCHAR(40) NULL;
+IF COL_LENGTH('gestar.TicketLogs', 'OldId') IS NULL
+    ALTER TABLE gestar.TicketLogs ADD OldId INT NULL;
+IF COL_LENGTH('gestar.TicketLogs', 'NewId') IS NULL
+    ALTER TABLE gestar.TicketLogs ADD NewId INT NULL;
+GO
+
+IF OBJECT_ID('gestar.TicketLogsArchive', 'U') IS NOT NULL
+BEGIN
+    IF COL_LENGTH('gestar.TicketLogsArchive', 'EventType') IS NULL
+        ALTER TABLE gestar.TicketLogsArchive ADD EventType NVARCHAR(40) NULL;
+    IF COL_LENGTH('gestar.TicketLogsArchive', 'OldId') IS NULL
+        ALTER TABLE gestar.TicketLogsArchive ADD OldId INT NULL;
+    IF COL_LENGTH('gestar.TicketLogsArchive', 'NewId') IS NULL
+        ALTER TABLE gestar.TicketLogsArchive ADD NewId INT NULL;
+END
+GO
+
+-- Backfill en lotes por rangos de LogId (clave primaria): cada lote lee solo su
+-- rango, en vez de volver a buscar filas NULL desde el principio de la tabla.
+-- Un solo recorrido para TicketLogs y, si existe, TicketLogsArchive.
+-- El CASE es la salida de audit_events.legacy_event_type_sql(), fuente única del
+-- mapeo FieldName -> EventType: si cambia allí, copiarlo de nuevo (lo verifica
+-- test/test_audit_events.py).
+DECLARE @tables TABLE (Orden INT NOT NULL, Nombre SYSNAME NOT NULL);
+INSERT INTO @tables (Orden, Nombre) VALUES (1, N'gestar.TicketLogs');
+IF OBJECT_ID('gestar.TicketLogsArchive', 'U') IS NOT NULL
+    INSERT INTO @tables (Orden, Nombre) VALUES (2, N'gestar.TicketLogsArchive');
+
+DECLARE @batch INT = 5000;
+DECLARE @orden INT;
+DECLARE @table SYSNAME;
+DECLARE @from INT;
+DECLARE @max INT;
+DECLARE @sql NVARCHAR(MAX);
+
+SELECT @orden = MIN(Orden) FROM @tables;
+WHILE @orden IS NOT NULL
+BEGIN
+    SELECT @table = Nombre FROM @tables WHERE Orden = @orden;
+
+    SET @sql = N'SELECT @from = MIN(LogId), @max = MAX(LogId) FROM ' + @table
+        + N' WHERE EventType IS NULL;';
+    EXEC sp_executesql
+        @sql,
+        N'@from INT OUTPUT, @max INT OUTPUT',
+        @from = @from OUTPUT,
+        @max = @max OUTPUT;
+
+    SET @sql = N'UPDATE ' + @table + N'
+        SET EventType =
+            CASE
+                WHEN FieldName LIKE ''subtask.%'' THEN ''subtask_updated''
+                WHEN FieldName LIKE ''Notificacion%'' THEN ''notification''
+                ELSE CASE FieldName
+                    WHEN ''Estado'' THEN ''status_change''
+                    WHEN ''Assignee'' THEN ''assignment''
+                    WHEN ''Prioridad'' THEN ''priority_change''
+                    WHEN ''CambioAsignacion'' THEN ''assignment_notice''
+                    WHEN ''comment'' THEN ''comment''
+                    WHEN ''subtask_created'' THEN ''subtask_created''
+                    WHEN ''subtask_deleted'' THEN ''subtask_deleted''
+                    ELSE ''field_change''
+                END
+            END
+        WHERE LogId >= @from AND LogId < @from + @batch
+          AND EventType IS NULL;';
+    WHILE @from IS NOT NULL AND @from <= @max
+    BEGIN
+        EXEC sp_executesql @sql, N'@from INT, @batch INT', @from = @from, @batch = @batch;
+        SET @from = @from + @batch;
+    END
+
+    SELECT @orden = MIN(Orden) FROM @tables WHERE Orden > @orden;
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_TicketLogs_EventType'
+      AND object_id = OBJECT_ID('gestar.TicketLogs')
+)
+BEGIN
+    CREATE INDEX IX_TicketLogs_EventType
+        ON gestar.TicketLogs (EventType, ChangedAt)
+        INCLUDE (TicketId, OldId, NewId);
+END
+GO
+
+-- Verificacion rapida
+SELECT EventType, COUNT(1) AS Cantidad
+FROM gestar.TicketLogs
+GROUP BY EventType
+ORDER BY Cantidad DESC;
+GO
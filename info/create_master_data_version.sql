@@ -0,0 +1,30 @@
+/*
+Versiones de datos maestros
+Script idempotente para Azure SQL Server.
+
+Objetivo:
+- Crear tabla gestar.MasterDataVersion (una fila por catalogo: Plantas, Areas, Users, ...)
+- Los editores de maestros incrementan Version en la misma transaccion del guardado
+- Las sesiones abiertas comparan versiones y recargan solo los catalogos cambiados
+*/
+
+SET NOCOUNT ON;
+GO
+
+IF OBJECT_ID('gestar.MasterDataVersion', 'U') IS NULL
+BEGIN
+    CREATE TABLE gestar.MasterDataVersion (
+        Catalog NVARCHAR(64) NOT NULL,
+        Version INT NOT NULL CONSTRAINT DF_MasterDataVersion_Version DEFAULT (0),
+        UpdatedAt DATETIME2 NOT NULL CONSTRAINT DF_MasterDataVersion_UpdatedAt DEFAULT (SYSUTCDATETIME()),
+
+        CONSTRAINT PK_MasterDataVersion PRIMARY KEY (Catalog)
+    );
+END
+GO
+
+-- Verificacion rapida
+SELECT Catalog, Version, UpdatedAt
+FROM gestar.MasterDataVersion
+ORDER BY Catalog;
+GO
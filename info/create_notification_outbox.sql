@@ -0,0 +1,218 @@
+/*
+Outbox de notificaciones de asignacion
+Script idempotente para Azure SQL Server.
+
+Objetivo:
+- Crear tabla gestar.NotificationOutbox (cola dedicada, separada de TicketLogs)
+- Indice filtrado sobre filas pendientes para el claim del worker
+- Prioridad del ticket al encolar (PrioridadId/PrioridadNivel) para ordenar el claim
+- Migrar notificaciones pendientes/en proceso que hoy viven en gestar.TicketLogs
+*/
+
+SET NOCOUNT ON;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.schemas WHERE name = 'gestar')
+BEGIN
+    THROW 50001, 'No existe el esquema gestar.', 1;
+END
+GO
+
+IF OBJECT_ID('gestar.Tickets', 'U') IS NULL
+BEGIN
+    THROW 50002, 'No existe gestar.Tickets. No se puede crear gestar.NotificationOutbox.', 1;
+END
+GO
+
+IF OBJECT_ID('gestar.Users', 'U') IS NULL
+BEGIN
+    THROW 50003, 'No existe gestar.Users. No se puede crear gestar.NotificationOutbox.', 1;
+END
+GO
+
+IF OBJECT_ID('gestar.NotificationOutbox', 'U') IS NULL
+BEGIN
+    CREATE TABLE gestar.NotificationOutbox (
+        OutboxId INT IDENTITY(1,1) NOT NULL,
+        TicketId INT NOT NULL,
+        ActorUserId INT NULL,
+        RecipientUserId INT NULL,
+        DedupeKey NVARCHAR(400) NOT NULL,
+        Payload NVARCHAR(MAX) NULL,
+        Status NVARCHAR(20) NOT NULL CONSTRAINT DF_NotificationOutbox_Status DEFAULT (N'pending'),
+        Attempts INT NOT NULL CONSTRAINT DF_NotificationOutbox_Attempts DEFAULT (0),
+        NextAttemptAt DATETIME2 NOT NULL CONSTRAINT DF_NotificationOutbox_NextAttemptAt DEFAULT (SYSUTCDATETIME()),
+        ClaimedAt DATETIME2 NULL,
+        SentAt DATETIME2 NULL,
+        LastError NVARCHAR(400) NULL,
+        PrioridadId INT NULL,
+        PrioridadNivel INT NOT NULL CONSTRAINT DF_NotificationOutbox_PrioridadNivel DEFAULT (99),
+        CreatedAt DATETIME2 NOT NULL CONSTRAINT DF_NotificationOutbox_CreatedAt DEFAULT (SYSUTCDATETIME()),
+
+        CONSTRAINT PK_NotificationOutbox PRIMARY KEY (OutboxId),
+        CONSTRAINT UQ_NotificationOutbox_DedupeKey UNIQUE (DedupeKey),
+
+        CONSTRAINT FK_NotificationOutbox_Tickets
+            FOREIGN KEY (TicketId) REFERENCES gestar.Tickets(TicketId),
+        CONSTRAINT FK_NotificationOutbox_Actor
+            FOREIGN KEY (ActorUserId) REFERENCES gestar.Users(UserId),
+        CONSTRAINT FK_NotificationOutbox_Recipient
+            FOREIGN KEY (RecipientUserId) REFERENCES gestar.Users(UserId),
+        CONSTRAINT FK_NotificationOutbox_Prioridades
+            FOREIGN KEY (PrioridadId) REFERENCES gestar.Prioridades(PrioridadId)
+    );
+END
+GO
+
+-- Tablas creadas antes de la cola por prioridad.
+IF COL_LENGTH('gestar.NotificationOutbox', 'PrioridadId') IS NULL
+BEGIN
+    ALTER TABLE gestar.NotificationOutbox ADD PrioridadId INT NULL;
+    ALTER TABLE gestar.NotificationOutbox ADD CONSTRAINT FK_NotificationOutbox_Prioridades
+        FOREIGN KEY (PrioridadId) REFERENCES gestar.Prioridades(PrioridadId);
+END
+GO
+
+IF COL_LENGTH('gestar.NotificationOutbox', 'PrioridadNivel') IS NULL
+BEGIN
+    ALTER TABLE gestar.NotificationOutbox ADD PrioridadNivel INT NOT NULL
+        CONSTRAINT DF_NotificationOutbox_PrioridadNivel DEFAULT (99);
+END
+GO
+
+-- Pendientes previos a la columna: toman la prioridad actual del ticket.
+UPDATE o
+SET
+    o.PrioridadId = t.PrioridadId,
+    o.PrioridadNivel = p.Nivel
+FROM gestar.NotificationOutbox o
+JOIN gestar.Tickets t ON t.TicketId = o.TicketId
+JOIN gestar.Prioridades p ON p.PrioridadId = t.PrioridadId
+WHERE o.Status = N'pending'
+  AND o.PrioridadId IS NULL;
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_NotificationOutbox_Pending'
+      AND object_id = OBJECT_ID('gestar.NotificationOutbox')
+)
+BEGIN
+    CREATE INDEX IX_NotificationOutbox_Pending
+        ON gestar.NotificationOutbox (NextAttemptAt, OutboxId)
+        WHERE Status = N'pending';
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_NotificationOutbox_PendingPriority'
+      AND object_id = OBJECT_ID('gestar.NotificationOutbox')
+)
+BEGIN
+    -- Claim por (nivel de prioridad, elegibilidad); 0 = Critica.
+    CREATE INDEX IX_NotificationOutbox_PendingPriority
+        ON gestar.NotificationOutbox (PrioridadNivel, NextAttemptAt, OutboxId)
+        WHERE Status = N'pending';
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_NotificationOutbox_Processing'
+      AND object_id = OBJECT_ID('gestar.NotificationOutbox')
+)
+BEGIN
+    CREATE INDEX IX_NotificationOutbox_Processing
+        ON gestar.NotificationOutbox (ClaimedAt)
+        WHERE Status = N'processing';
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_NotificationOutbox_PendingRecipient'
+      AND object_id = OBJECT_ID('gestar.NotificationOutbox')
+)
+BEGIN
+    -- Modo digest: filas retenidas del mismo destinatario.
+    CREATE INDEX IX_NotificationOutbox_PendingRecipient
+        ON gestar.NotificationOutbox (RecipientUserId)
+        WHERE Status = N'pending';
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_NotificationOutbox_Dead'
+      AND object_id = OBJECT_ID('gestar.NotificationOutbox')
+)
+BEGIN
+    -- Dead-letter: listado del panel admin y metricas de cola.
+    CREATE INDEX IX_NotificationOutbox_Dead
+        ON gestar.NotificationOutbox (OutboxId)
+        WHERE Status = N'dead';
+END
+GO
+
+-- Migracion de la cola legacy: una fila por DedupeKey sin NotificacionEnviada.
+IF OBJECT_ID('gestar.TicketLogs', 'U') IS NOT NULL
+BEGIN
+    BEGIN TRANSACTION;
+
+    -- La prioridad sale del ticket aca: el backfill de PrioridadNivel corre antes.
+    INSERT INTO gestar.NotificationOutbox (
+        TicketId, ActorUserId, RecipientUserId, DedupeKey, Payload, Status, CreatedAt,
+        PrioridadId, PrioridadNivel
+    )
+    SELECT
+        p.TicketId,
+        p.UserId,
+        TRY_CAST(JSON_VALUE(p.NewValue, '$.new_assignee_id') AS INT),
+        p.OldValue,
+        p.NewValue,
+        N'pending',
+        p.ChangedAt,
+        t.PrioridadId,
+        ISNULL(pr.Nivel, 99)
+    FROM gestar.TicketLogs p
+    LEFT JOIN gestar.Tickets t ON t.TicketId = p.TicketId
+    LEFT JOIN gestar.Prioridades pr ON pr.PrioridadId = t.PrioridadId
+    WHERE p.LogId IN (
+        SELECT MIN(l.LogId)
+        FROM gestar.TicketLogs l
+        WHERE l.FieldName IN ('NotificacionPendiente', 'NotificacionEnProceso')
+          AND l.OldValue IS NOT NULL
+        GROUP BY l.OldValue
+    )
+      AND NOT EXISTS (
+          SELECT 1
+          FROM gestar.TicketLogs e
+          WHERE e.TicketId = p.TicketId
+            AND e.FieldName = 'NotificacionEnviada'
+            AND e.OldValue = p.OldValue
+      )
+      AND NOT EXISTS (
+          SELECT 1
+          FROM gestar.NotificationOutbox o
+          WHERE o.DedupeKey = p.OldValue
+      );
+
+    UPDATE gestar.TicketLogs
+    SET FieldName = 'NotificacionMigrada'
+    WHERE FieldName IN ('NotificacionPendiente', 'NotificacionEnProceso');
+
+    COMMIT TRANSACTION;
+END
+GO
+
+-- Verificacion rapida
+SELECT Status, COUNT(1) AS Cantidad
+FROM gestar.NotificationOutbox
+GROUP BY Status;
+GO
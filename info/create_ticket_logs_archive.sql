@@ -0,0 +1,73 @@
+/*
+Archivo de logs de tickets cerrados
+Script idempotente para Azure SQL Server.
+
+Objetivo:
+- Crear tabla gestar.TicketLogsArchive con las mismas columnas que gestar.TicketLogs
+- Conserva LogId original: el cursor (LogId) del seguimiento sigue valido
+- El movimiento de filas lo hace scripts/archive_ticket_logs.py en lotes acotados
+*/
+
+SET NOCOUNT ON;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.schemas WHERE name = 'gestar')
+BEGIN
+    THROW 50001, 'No existe el esquema gestar.', 1;
+END
+GO
+
+IF OBJECT_ID('gestar.TicketLogsArchive', 'U') IS NULL
+BEGIN
+    CREATE TABLE gestar.TicketLogsArchive (
+        LogId INT NOT NULL,
+        TicketId INT NOT NULL,
+        UserId INT NULL,
+        IsAi BIT NOT NULL CONSTRAINT DF_TicketLogsArchive_IsAi DEFAULT (0),
+        FieldName NVARCHAR(200) NOT NULL,
+        OldValue NVARCHAR(MAX) NULL,
+        NewValue NVARCHAR(MAX) NULL,
+        ChangedAt DATETIME2 NOT NULL,
+        EventType NVARCHAR(40) NULL,
+        OldId INT NULL,
+        NewId INT NULL,
+        ArchivedAt DATETIME2 NOT NULL CONSTRAINT DF_TicketLogsArchive_ArchivedAt DEFAULT (SYSUTCDATETIME()),
+
+        CONSTRAINT PK_TicketLogsArchive PRIMARY KEY (LogId)
+    )
+    -- Tabla fria: se lee poco y ocupa mucho.
+    WITH (DATA_COMPRESSION = PAGE);
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_TicketLogsArchive_TicketId'
+      AND object_id = OBJECT_ID('gestar.TicketLogsArchive')
+)
+BEGIN
+    CREATE INDEX IX_TicketLogsArchive_TicketId
+        ON gestar.TicketLogsArchive (TicketId, ChangedAt DESC, LogId DESC)
+        WITH (DATA_COMPRESSION = PAGE);
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_TicketLogsArchive_TicketLogId'
+      AND object_id = OBJECT_ID('gestar.TicketLogsArchive')
+)
+BEGIN
+    CREATE INDEX IX_TicketLogsArchive_TicketLogId
+        ON gestar.TicketLogsArchive (TicketId, LogId DESC)
+        INCLUDE (ChangedAt, UserId, FieldName)
+        WITH (DATA_COMPRESSION = PAGE);
+END
+GO
+
+-- Verificacion rapida
+SELECT COUNT(1) AS FilasArchivadas, COUNT(DISTINCT TicketId) AS Tickets
+FROM gestar.TicketLogsArchive;
+GO
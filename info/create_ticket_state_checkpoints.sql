@@ -0,0 +1,51 @@
+/*
+Checkpoints de estado de tickets
+Script idempotente para Azure SQL Server.
+
+Objetivo:
+- Crear tabla gestar.TicketStateCheckpoints (estado visible del ticket cada N cambios)
+- La reconstruccion a una fecha parte del checkpoint mas cercano, no del log completo
+- Los escribe scripts/export_ticket_history.py checkpoints
+*/
+
+SET NOCOUNT ON;
+GO
+
+IF OBJECT_ID('gestar.Tickets', 'U') IS NULL
+BEGIN
+    THROW 50001, 'No existe gestar.Tickets. No se puede crear gestar.TicketStateCheckpoints.', 1;
+END
+GO
+
+IF OBJECT_ID('gestar.TicketStateCheckpoints', 'U') IS NULL
+BEGIN
+    CREATE TABLE gestar.TicketStateCheckpoints (
+        TicketId INT NOT NULL,
+        LogId INT NOT NULL,
+        AsOf DATETIME2 NOT NULL,
+        State NVARCHAR(MAX) NOT NULL,
+        CreatedAt DATETIME2 NOT NULL CONSTRAINT DF_TicketStateCheckpoints_CreatedAt DEFAULT (SYSUTCDATETIME()),
+
+        CONSTRAINT PK_TicketStateCheckpoints PRIMARY KEY (TicketId, LogId),
+        CONSTRAINT FK_TicketStateCheckpoints_Tickets
+            FOREIGN KEY (TicketId) REFERENCES gestar.Tickets(TicketId)
+    );
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_TicketStateCheckpoints_AsOf'
+      AND object_id = OBJECT_ID('gestar.TicketStateCheckpoints')
+)
+BEGIN
+    CREATE INDEX IX_TicketStateCheckpoints_AsOf
+        ON gestar.TicketStateCheckpoints (TicketId, AsOf);
+END
+GO
+
+-- Verificacion rapida
+SELECT COUNT(1) AS Checkpoints, COUNT(DISTINCT TicketId) AS Tickets
+FROM gestar.TicketStateCheckpoints;
+GO
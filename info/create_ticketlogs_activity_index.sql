@@ -0,0 +1,56 @@
+/*
+Indice del seguimiento paginado de tickets
+Script idempotente para Azure SQL Server.
+
+Objetivo:
+- Paginacion por cursor (LogId) del detalle de ticket sin TOP 100
+- IX_TicketLogs_TicketLogId (TicketId, LogId DESC): cada "Cargar mas" lee la
+  pagina en orden de indice, sin ordenar todo el historial del ticket
+- Mismos indices que IX_TicketLogs_TicketId/IX_TicketLogs_TicketLogId de SQLite;
+  se crean solo si faltan
+*/
+
+SET NOCOUNT ON;
+GO
+
+IF OBJECT_ID('gestar.TicketLogs', 'U') IS NULL
+BEGIN
+    THROW 50001, 'No existe gestar.TicketLogs.', 1;
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_TicketLogs_TicketId'
+      AND object_id = OBJECT_ID('gestar.TicketLogs')
+)
+BEGIN
+    CREATE INDEX IX_TicketLogs_TicketId
+        ON gestar.TicketLogs (TicketId, ChangedAt DESC, LogId DESC)
+        INCLUDE (UserId, FieldName);
+END
+GO
+
+IF NOT EXISTS (
+    SELECT 1
+    FROM sys.indexes
+    WHERE name = 'IX_TicketLogs_TicketLogId'
+      AND object_id = OBJECT_ID('gestar.TicketLogs')
+)
+BEGIN
+    CREATE INDEX IX_TicketLogs_TicketLogId
+        ON gestar.TicketLogs (TicketId, LogId DESC)
+        INCLUDE (ChangedAt, UserId, FieldName);
+END
+GO
+
+-- Verificacion rapida
+SELECT i.name, c.name AS Columna, ic.key_ordinal, ic.is_descending_key, ic.is_included_column
+FROM sys.indexes i
+JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+WHERE i.object_id = OBJECT_ID('gestar.TicketLogs')
+  AND i.name IN ('IX_TicketLogs_TicketId', 'IX_TicketLogs_TicketLogId')
+ORDER BY i.name, ic.key_ordinal, ic.index_column_id;
+GO
@@ -0,0 +1,512 @@
+import re
+import sys
+import unicodedata
+
+from catalog_retrieval import LLM_CATALOGS, CatalogRetriever
+from display_resolver import CATALOG_SOURCES
+from fuzzy_index import FuzzyIndex, pick_fuzzy
+from mention_matcher import MentionMatcher, mention_tokens
+
+
+def normalize_text(value):
+    if value is None:
+        return ""
+    text = str(value).strip().lower()
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", text)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class CatalogRecord:
+    """Fila de catálogo inmutable y compacta (__slots__, sin dict por instancia).
+
+    Conserva el acceso de dict que usa el resto de la app (row["nombre"],
+    row.get("email"), dict(row)). `norm` es la etiqueta normalizada e
+    internada: la misma cadena que usan como clave los índices.
+    """
+
+    __slots__ = ("norm",)
+    _fields = ()
+    _label_field = "nombre"
+
+    def __init__(self, *values):
+        if len(values) != len(self._fields):
+            raise TypeError(
+                f"{type(self).__name__} espera {len(self._fields)} valores, "
+                f"recibió {len(values)}."
+            )
+        for name, value in zip(self._fields, values):
+            object.__setattr__(self, name, _intern(value))
+        label = getattr(self, self._label_field)
+        object.__setattr__(self, "norm", sys.intern(normalize_text(label)))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(*(data.get(name) for name in cls._fields))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} es de solo lectura.")
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        if key not in self._fields:
+            return default
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self._fields
+
+    def __iter__(self):
+        return iter(self._fields)
+
+    def __len__(self):
+        return len(self._fields)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self._fields)
+
+    def items(self):
+        return tuple((name, getattr(self, name)) for name in self._fields)
+
+    def __eq__(self, other):
+        if isinstance(other, CatalogRecord):
+            return type(self) is type(other) and self.values() == other.values()
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((type(self).__name__, self.values()))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+class Planta(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre")
+
+
+class Division(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre")
+
+
+class Area(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre", "division_id")
+
+
+class Categoria(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre")
+
+
+class Subcategoria(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre", "categoria_id")
+
+
+class Prioridad(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre", "nivel")
+
+
+class Estado(CatalogRecord):
+    __slots__ = _fields = ("id", "nombre")
+
+
+class Usuario(CatalogRecord):
+    __slots__ = _fields = (
+        "id",
+        "username",
+        "email",
+        "role",
+        "area_id",
+        "division_id",
+    )
+    _label_field = "username"
+
+
+# Clave en master_data -> tipo de fila. El orden de _fields es el del SELECT.
+CATALOG_RECORDS = {
+    "plantas": Planta,
+    "divisiones": Division,
+    "areas": Area,
+    "categorias": Categoria,
+    "subcategorias": Subcategoria,
+    "prioridades": Prioridad,
+    "estados": Estado,
+    "usuarios": Usuario,
+}
+
+
+def records_from_dicts(master_data):
+    """master_data con dicts (p. ej. leído de disco) -> filas CatalogRecord."""
+    out = {}
+    for name, items in master_data.items():
+        record_type = CATALOG_RECORDS.get(name)
+        if record_type is None:
+            out[name] = list(items)
+            continue
+        out[name] = [
+            item if isinstance(item, CatalogRecord) else record_type.from_dict(item)
+            for item in items
+        ]
+    return out
+
+
+class IdIndex:
+    """Búsqueda por ID entero sobre una lista indexada por ID.
+
+    Los IDs IDENTITY de los catálogos son densos: una lista con huecos ocupa
+    bastante menos que un dict. Si los IDs son muy dispersos se usa un dict.
+    Los valores None no se distinguen de un ID ausente.
+    """
+
+    __slots__ = ("_items", "_count")
+
+    def __init__(self, pairs=()):
+        pairs = [(key, value) for key, value in pairs if value is not None]
+        self._count = 0
+        ids = [key for key, _value in pairs]
+        dense = all(type(key) is int and key >= 0 for key in ids)
+        if dense and ids and max(ids) > 4 * len(ids) + 1024:
+            dense = False
+        if dense:
+            self._items = [None] * ((max(ids) + 1) if ids else 0)
+        else:
+            self._items = {}
+        for key, value in pairs:
+            if self.get(key) is None:
+                self._count += 1
+            self._items[key] = value
+
+    def get(self, key, default=None):
+        items = self._items
+        if isinstance(items, dict):
+            return items.get(key, default)
+        if type(key) is not int or key < 0 or key >= len(items):
+            return default
+        value = items[key]
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __len__(self):
+        return self._count
+
+    def items(self):
+        if isinstance(self._items, dict):
+            return list(self._items.items())
+        return [
+            (key, value) for key, value in enumerate(self._items) if value is not None
+        ]
+
+    def keys(self):
+        return [key for key, _value in self.items()]
+
+    def values(self):
+        return [value for _key, value in self.items()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+def build_label_indexes(master_data):
+    """Como display_resolver.build_label_maps, pero con IdIndex por tabla."""
+    return {
+        table: IdIndex(
+            (row["id"], row[label_attr])
+            for row in master_data.get(data_key, [])
+            if row.get("id") is not None
+        )
+        for table, (data_key, label_attr, _pk, _col) in CATALOG_SOURCES.items()
+    }
+
+
+def _norm(row, field):
+    # Las filas CatalogRecord traen la etiqueta ya normalizada e internada.
+    norm = getattr(row, "norm", None)
+    return norm if norm is not None else normalize_text(row[field])
+
+
+# Catálogo -> índices que se derivan solo de él.
+MASTER_INDEX_KEYS = {
+    "plantas": ("plantas_by_norm", "plantas_fuzzy"),
+    "divisiones": ("divisiones_by_norm",),
+    "areas": ("areas_by_norm", "areas_by_id", "areas_fuzzy"),
+    "categorias": ("categorias_by_norm", "categorias_fuzzy"),
+    "subcategorias": ("subcategorias_by_norm", "subcats_by_categoria_and_norm"),
+    "prioridades": ("prioridades_by_norm",),
+    "estados": (),
+    "usuarios": (
+        "usuarios_by_norm",
+        "usuarios_by_email_local",
+        "usuarios_by_token",
+        "usuarios_by_id",
+        "usuarios_fuzzy",
+    ),
+}
+
+
+def user_fuzzy_keys(norm_user):
+    """Claves aproximadas: partes del username en ambos órdenes (a_b -> a b, b a)."""
+    parts = [part for part in re.split(r"[_\s\.-]+", norm_user) if part]
+    if len(parts) < 2:
+        return [norm_user]
+    return [" ".join(parts), " ".join(reversed(parts))]
+
+
+def fuzzy_user_query(norm_value):
+    """Consulta separada igual que user_fuzzy_keys."""
+    return " ".join(part for part in re.split(r"[_\s\.-]+", norm_value) if part)
+
+
+def resolve_user_candidate(raw_user, indexes):
+    """(usuario, aviso): exacto, local-part de email, token único o aproximado.
+
+    Con usuario resuelto el aviso solo aparece si se interpretó por aproximación.
+    """
+    usuarios_by_norm = indexes.get("usuarios_by_norm", {})
+    usuarios_by_email_local = indexes.get("usuarios_by_email_local", {})
+    usuarios_by_token = indexes.get("usuarios_by_token", {})
+
+    norm_value = normalize_text(raw_user)
+    if not norm_value:
+        return None, None
+
+    # 1) Match exacto por username
+    exact = usuarios_by_norm.get(norm_value)
+    if exact:
+        return exact, None
+
+    # 2) Match por local-part de email (antes de @)
+    local = norm_value.replace(" ", "")
+    by_email = usuarios_by_email_local.get(local)
+    if by_email:
+        return by_email, None
+
+    # 3) Match por token único de username (nombre/apellido)
+    token = norm_value.split(" ")[0]
+    token_hits = usuarios_by_token.get(token, [])
+    if len(token_hits) == 1:
+        return token_hits[0], None
+
+    # 4) Match aproximado (errores de tipeo, "nombre apellido" invertido)
+    fuzzy_user, fuzzy_hits = pick_fuzzy(
+        indexes.get("usuarios_fuzzy"), fuzzy_user_query(norm_value)
+    )
+    if fuzzy_user:
+        return fuzzy_user, (
+            f"Usuario '{raw_user}' interpretado como '{fuzzy_user['username']}'."
+        )
+
+    if len(token_hits) > 1:
+        opciones = ", ".join(sorted({u["username"] for u in token_hits}))
+        return None, f"Usuario ambiguo '{raw_user}'. Opciones: {opciones}."
+    if fuzzy_hits:
+        opciones = ", ".join(u["username"] for u, _score in fuzzy_hits)
+        return None, (
+            f"No se encontró usuario para '{raw_user}'. ¿Quisiste decir: {opciones}?"
+        )
+
+    return None, f"No se encontró usuario para '{raw_user}'."
+
+
+def resolve_catalog_candidate(raw_value, indexes, catalog, label):
+    """(fila, aviso): nombre exacto y, si no, el candidato aproximado claro."""
+    norm_value = normalize_text(raw_value)
+    if not norm_value:
+        return None, None
+    exact = indexes[f"{catalog}_by_norm"].get(norm_value)
+    if exact:
+        return exact, None
+    row, _hits = pick_fuzzy(indexes.get(f"{catalog}_fuzzy"), norm_value)
+    if row:
+        return row, f"{label} '{raw_value}' interpretada como '{row['nombre']}'."
+    return None, None
+
+
+# Campo de ticket_draft -> (catálogo, atributo con el nombre a completar).
+# Prioridades queda afuera: "alta" o "media" aparecen en cualquier mensaje.
+MENTION_FIELDS = {
+    "planta": ("plantas", "nombre"),
+    "division": ("divisiones", "nombre"),
+    "area": ("areas", "nombre"),
+    "categoria": ("categorias", "nombre"),
+    "subcategoria": ("subcategorias", "nombre"),
+    "usuario_sugerido": ("usuarios", "username"),
+}
+
+
+def build_mention_matcher(indexes):
+    """MentionMatcher con los nombres normalizados de los índices *_by_norm."""
+
+    def patterns():
+        for field in ("planta", "division", "area", "categoria"):
+            catalog = MENTION_FIELDS[field][0]
+            for norm, row in indexes[f"{catalog}_by_norm"].items():
+                yield mention_tokens(norm), (field, row)
+        for norm, rows in indexes["subcategorias_by_norm"].items():
+            # El mismo nombre en varias categorías no define la subcategoría.
+            if len(rows) == 1:
+                yield mention_tokens(norm), ("subcategoria", rows[0])
+        for norm_user, u in indexes["usuarios_by_norm"].items():
+            payload = ("usuario_sugerido", u)
+            # Solo alias de dos o más palabras: un nombre de pila suelto es ambiguo.
+            for key in user_fuzzy_keys(norm_user):
+                tokens = mention_tokens(key)
+                if len(tokens) > 1:
+                    yield tokens, payload
+
+    return MentionMatcher(patterns())
+
+
+def find_catalog_mentions(indexes, norm_text):
+    """{campo de ticket_draft: fila} para los catálogos nombrados en el texto.
+
+    Un campo con menciones a dos filas distintas queda afuera (lo decide el
+    modelo).
+    """
+    matcher = indexes.get("mention_matcher")
+    if matcher is None:
+        return {}
+    found = {}
+    for _start, _end, payloads in matcher.find(mention_tokens(norm_text)):
+        for field, row in payloads:
+            found.setdefault(field, {})[id(row)] = row
+    return {
+        field: next(iter(rows.values()))
+        for field, rows in found.items()
+        if len(rows) == 1
+    }
+
+
+def llm_catalog_entries(master_data, catalog):
+    """(nombre, nombre normalizado) de un catálogo, sin repetidos, para el prompt."""
+    label_field = CATALOG_RECORDS[catalog]._label_field
+    seen = set()
+    entries = []
+    for row in master_data.get(catalog, []):
+        if not row.get(label_field):
+            continue
+        norm = _norm(row, label_field)
+        if norm in seen:
+            continue
+        seen.add(norm)
+        entries.append((row[label_field], norm))
+    return entries
+
+
+def build_master_indexes(master_data, catalogs=None, base=None):
+    """Índices de búsqueda; con base y catalogs solo rehace lo que depende de ellos.
+
+    Los índices de base no se modifican: los rehechos son objetos nuevos.
+    """
+    if base is None or catalogs is None:
+        indexes, catalogs = {}, set(MASTER_INDEX_KEYS)
+    else:
+        indexes, catalogs = dict(base), set(catalogs)
+    for catalog in catalogs:
+        for key in MASTER_INDEX_KEYS[catalog]:
+            indexes[key] = {}
+    indexes["labels_by_id"] = build_label_indexes(master_data)
+
+    if "plantas" in catalogs:
+        for p in master_data.get("plantas", []):
+            indexes["plantas_by_norm"][_norm(p, "nombre")] = p
+        indexes["plantas_fuzzy"] = FuzzyIndex(indexes["plantas_by_norm"].items())
+    if "divisiones" in catalogs:
+        for d in master_data.get("divisiones", []):
+            indexes["divisiones_by_norm"][_norm(d, "nombre")] = d
+    if "areas" in catalogs:
+        for a in master_data.get("areas", []):
+            indexes["areas_by_norm"][_norm(a, "nombre")] = a
+        indexes["areas_by_id"] = IdIndex(
+            (a["id"], a) for a in master_data.get("areas", [])
+        )
+        indexes["areas_fuzzy"] = FuzzyIndex(indexes["areas_by_norm"].items())
+    if "categorias" in catalogs:
+        for c in master_data.get("categorias", []):
+            indexes["categorias_by_norm"][_norm(c, "nombre")] = c
+        indexes["categorias_fuzzy"] = FuzzyIndex(
+            indexes["categorias_by_norm"].items()
+        )
+    if "subcategorias" in catalogs:
+        for s in master_data.get("subcategorias", []):
+            key = _norm(s, "nombre")
+            indexes["subcategorias_by_norm"].setdefault(key, []).append(s)
+            combo = (s["categoria_id"], key)
+            indexes["subcats_by_categoria_and_norm"][combo] = s
+    if "prioridades" in catalogs:
+        for p in master_data.get("prioridades", []):
+            indexes["prioridades_by_norm"][_norm(p, "nombre")] = p
+    if "usuarios" in catalogs:
+        for u in master_data.get("usuarios", []):
+            norm_user = _norm(u, "username")
+            indexes["usuarios_by_norm"][norm_user] = u
+            email = normalize_text(u.get("email"))
+            if "@" in email:
+                local = sys.intern(email.split("@", 1)[0])
+                indexes["usuarios_by_email_local"][local] = u
+            # Alias por tokens de username (firmapaz_alfredo -> firmapaz, alfredo)
+            for token in re.split(r"[_\s\.-]+", norm_user):
+                if token:
+                    token = sys.intern(token)
+                    indexes["usuarios_by_token"].setdefault(token, []).append(u)
+        indexes["usuarios_by_id"] = IdIndex(
+            (u["id"], u) for u in master_data.get("usuarios", [])
+        )
+        indexes["usuarios_fuzzy"] = FuzzyIndex(
+            (key, u)
+            for norm_user, u in indexes["usuarios_by_norm"].items()
+            for key in user_fuzzy_keys(norm_user)
+        )
+
+    if catalogs & {"usuarios", "areas", "divisiones"}:
+        # Área/división del usuario desde los catálogos ya cargados, sin otra
+        # consulta: la división propia del usuario tiene prioridad sobre la del área.
+        indexes["user_to_area_division"] = {}
+        divisiones_by_id = {d["id"]: d for d in master_data.get("divisiones", [])}
+        # Un solo dict por par (área, división): miles de usuarios lo comparten.
+        placements = {}
+        for u in master_data.get("usuarios", []):
+            area = indexes["areas_by_id"].get(u.get("area_id"))
+            if u.get("division_id") is not None:
+                division = divisiones_by_id.get(u["division_id"])
+            else:
+                division = divisiones_by_id.get(area["division_id"]) if area else None
+            pair = (area["id"] if area else None, division["id"] if division else None)
+            indexes["user_to_area_division"][_norm(u, "username")] = (
+                placements.setdefault(
+                    pair, {"area_id": pair[0], "division_id": pair[1]}
+                )
+            )
+
+    if catalogs & {catalog for catalog, _attr in MENTION_FIELDS.values()}:
+        indexes["mention_matcher"] = build_mention_matcher(indexes)
+    llm_changed = catalogs & set(LLM_CATALOGS)
+    if llm_changed:
+        indexes["catalog_retriever"] = CatalogRetriever(
+            {
+                catalog: llm_catalog_entries(master_data, catalog)
+                for catalog in sorted(llm_changed, key=LLM_CATALOGS.index)
+            },
+            base=indexes.get("catalog_retriever"),
+        )
+
+    return indexes
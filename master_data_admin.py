@@ -3,6 +3,14 @@ import os
 import pandas as pd
 import streamlit as st
 from db_adapter import DBAdapter
+from master_snapshot import MASTER_STORE, bump_catalog_version
+from notification_assignment import (
+    configured_metrics_file,
+    get_notification_metrics,
+    redrive_dead_letters,
+    wake_assignment_notification_worker,
+)
+from notification_metrics import read_metrics_file
 
 
 # set_page_config solo cuando se ejecuta standalone
@@ -55,12 +63,18 @@ def load_df(sql, params=()):
         return pd.read_sql(sql, conn, params=params)
 
 
-def execute_many(statements):
+def execute_many(statements, catalog=None):
+    """Ejecuta en una transacción; con catalog incrementa su MasterDataVersion."""
     with get_connection() as conn:
         cur = conn.cursor()
         for sql, params in statements:
             cur.execute(sql, params)
+        if catalog and statements:
+            bump_catalog_version(conn, get_db_adapter(), catalog)
         conn.commit()
+    if catalog:
+        # Este proceso recarga en la próxima corrida; el resto, al vencer su intervalo.
+        MASTER_STORE.request_check()
 
 
 def is_new_id(value):
@@ -109,7 +123,7 @@ def save_simple_table(
                 )
             )
 
-    execute_many(updates)
+    execute_many(updates, catalog=table)
 
 
 def area_editor():
@@ -175,7 +189,7 @@ def area_editor():
             statements.append(
                 (f"UPDATE {qname('Areas')} SET Activo = 0 WHERE AreaId = ?", (rid,))
             )
-        execute_many(statements)
+        execute_many(statements, catalog="Areas")
         st.success("Areas guardadas.")
         st.rerun()
 
@@ -248,7 +262,7 @@ def subcategory_editor():
                     (rid,),
                 )
             )
-        execute_many(statements)
+        execute_many(statements, catalog="Subcategorias")
         st.success("Subcategorias guardadas.")
         st.rerun()
 
@@ -389,11 +403,128 @@ def user_editor():
                 (f"UPDATE {qname('Users')} SET Active = 0 WHERE UserId = ?", (rid,))
             )
 
-        execute_many(statements)
+        execute_many(statements, catalog="Users")
         st.success("Users guardados.")
         st.rerun()
 
 
+def dead_letter_view():
+    adapter = get_db_adapter()
+    with get_connection() as conn:
+        if not adapter.table_exists(conn, "NotificationOutbox"):
+            st.info("No existe la tabla NotificationOutbox.")
+            return
+
+    top = "" if adapter.is_sqlite else adapter.limit_clause(200)
+    limit = adapter.limit_clause(200) if adapter.is_sqlite else ""
+    df = load_df(
+        f"""
+        SELECT {top} o.OutboxId, o.TicketId, u.Username AS Destinatario,
+               o.Attempts AS Intentos, o.LastError AS UltimoError, o.CreatedAt AS Creada
+        FROM {qname('NotificationOutbox')} o
+        LEFT JOIN {qname('Users')} u ON u.UserId = o.RecipientUserId
+        WHERE o.Status = 'dead'
+        ORDER BY o.OutboxId DESC
+        {limit}
+        """
+    )
+    if df.empty:
+        st.caption("No hay notificaciones en dead-letter.")
+        return
+
+    df.insert(0, "Reencolar", False)
+    edited = st.data_editor(
+        df,
+        use_container_width=True,
+        hide_index=True,
+        disabled=[c for c in df.columns if c != "Reencolar"],
+        key="admin_dead_letters",
+    )
+    selected_ids = edited.loc[edited["Reencolar"], "OutboxId"].astype(int).tolist()
+
+    col_sel, col_all = st.columns(2)
+    outbox_ids = None
+    if col_sel.button(
+        "Reencolar seleccionadas",
+        use_container_width=True,
+        disabled=not selected_ids,
+    ):
+        outbox_ids = selected_ids
+    elif col_all.button("Reencolar todas", use_container_width=True):
+        outbox_ids = "all"
+    if outbox_ids is None:
+        return
+
+    with get_connection() as conn:
+        count = redrive_dead_letters(
+            conn,
+            qname("NotificationOutbox"),
+            None if outbox_ids == "all" else outbox_ids,
+        )
+        conn.commit()
+    wake_assignment_notification_worker()
+    st.success(f"{count} notificaciones reencoladas.")
+    st.rerun()
+
+
+def notification_metrics_view():
+    adapter = get_db_adapter()
+    with get_connection() as conn:
+        if not adapter.table_exists(conn, "NotificationOutbox"):
+            st.info("No existe la tabla NotificationOutbox.")
+            return
+        metrics = get_notification_metrics(conn, qname("NotificationOutbox"))
+
+    source = "worker en este proceso"
+    if not metrics["worker_running"]:
+        # Worker standalone: sus contadores llegan por NOTIF_METRICS_FILE (JSON).
+        file_metrics = read_metrics_file(configured_metrics_file())
+        if file_metrics:
+            metrics["worker"] = file_metrics.get("worker") or metrics["worker"]
+            source = f"archivo ({file_metrics.get('generated_at', '-')})"
+        else:
+            source = "sin worker en este proceso"
+
+    queue = metrics["queue"]
+    age = queue["oldest_pending_age_seconds"]
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric(
+        "Pendientes",
+        queue["pending"],
+        help=f"{queue.get('pending_held', 0)} retenidas por digest o reintento.",
+    )
+    col2.metric("En proceso", queue["processing"])
+    col3.metric("Dead-letter", queue["dead"])
+    col4.metric("Vencido más antiguo", "-" if age is None else f"{age} s")
+
+    worker = metrics["worker"]
+    st.caption(
+        f"Fuente: {source} · Último ciclo: {worker.get('last_loop_at') or 'sin datos'}"
+    )
+    counters = worker.get("counters") or {}
+    durations = worker.get("durations") or {}
+    rows = [{"Métrica": k, "Valor": v} for k, v in counters.items()]
+    for name, stat in durations.items():
+        rows.append(
+            {
+                "Métrica": f"{name} (s) prom/máx",
+                "Valor": f"{stat['avg']:.3f} / {stat['max']:.3f}",
+            }
+        )
+    for error_class, count in (worker.get("failures_by_class") or {}).items():
+        rows.append({"Métrica": f"fallos: {error_class}", "Valor": count})
+    for error_class, count in (worker.get("loop_errors") or {}).items():
+        rows.append({"Métrica": f"errores de ciclo: {error_class}", "Valor": count})
+    if rows:
+        st.dataframe(
+            pd.DataFrame(rows).astype({"Valor": str}),
+            use_container_width=True,
+            hide_index=True,
+        )
+    if worker.get("last_error"):
+        st.caption(f"Último error del worker: {worker['last_error']}")
+
+
 def render_admin_panel():
     """Renderiza el panel de admin embedible en app.py (sin set_page_config)."""
     st.subheader("Administrador de Datos Maestros")
@@ -506,6 +637,18 @@ def render_admin_panel():
     except Exception as exc:
         st.error(f"Error al guardar datos en {table}: {exc}")
 
+    st.divider()
+    with st.expander("Métricas de notificaciones"):
+        try:
+            notification_metrics_view()
+        except Exception as exc:
+            st.error(f"No se pudieron cargar las métricas: {exc}")
+    with st.expander("Notificaciones no entregadas (dead-letter)"):
+        try:
+            dead_letter_view()
+        except Exception as exc:
+            st.error(f"No se pudieron cargar las notificaciones: {exc}")
+
 
 def main():
     st.title("Administrador de Datos Maestros")
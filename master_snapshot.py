@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from master_catalog import records_from_dicts
+
+
+VERSION_TABLE = "MasterDataVersion"
+
+# Clave en master_data -> tabla (valor de MasterDataVersion.Catalog).
+CATALOG_TABLES = {
+    "plantas": "Plantas",
+    "divisiones": "Divisiones",
+    "areas": "Areas",
+    "categorias": "Categorias",
+    "subcategorias": "Subcategorias",
+    "prioridades": "Prioridades",
+    "estados": "Estados",
+    "usuarios": "Users",
+}
+
+# Datos maestros e índices de una carga, compartidos por referencia entre sesiones.
+# catalog_versions: {tabla: versión} leído antes de cargar los datos.
+# origin: "db" o "disk" (arranque en frío desde SnapshotFile).
+MasterDataSnapshot = namedtuple(
+    "MasterDataSnapshot",
+    ["master_data", "indexes", "version", "loaded_at", "catalog_versions", "origin"],
+)
+
+_SNAPSHOT_FILE_FORMAT = 1
+
+
+def freeze_master_data(master_data):
+    """Catálogos como tuplas en un mapping de solo lectura.
+
+    Quien necesite un cambio pide un refresh al store en lugar de editar la copia.
+    """
+    if isinstance(master_data, MappingProxyType):
+        return master_data
+    return MappingProxyType(
+        {name: tuple(items) for name, items in (master_data or {}).items()}
+    )
+
+
+def fetch_catalog_versions(conn, adapter):
+    """{tabla: versión}; None si MasterDataVersion todavía no existe."""
+    if not adapter.table_exists(conn, VERSION_TABLE):
+        return None
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT Catalog, Version FROM {adapter.qname(VERSION_TABLE)}")
+    return {row[0]: int(row[1]) for row in cursor.fetchall()}
+
+
+def bump_catalog_version(conn, adapter, catalog):
+    """Incrementa la versión de un catálogo dentro de la transacción del llamador."""
+    if not adapter.table_exists(conn, VERSION_TABLE):
+        return False
+    table = adapter.qname(VERSION_TABLE)
+    cursor = conn.cursor()
+    if adapter.is_sqlite:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (Catalog, Version) VALUES (?, 1)
+            ON CONFLICT (Catalog) DO UPDATE
+            SET Version = Version + 1, UpdatedAt = CURRENT_TIMESTAMP
+            """,
+            (catalog,),
+        )
+    else:
+        cursor.execute(
+            f"""
+            MERGE {table} AS t
+            USING (SELECT ? AS Catalog) AS s ON t.Catalog = s.Catalog
+            WHEN MATCHED THEN
+                UPDATE SET Version = t.Version + 1, UpdatedAt = SYSUTCDATETIME()
+            WHEN NOT MATCHED THEN
+                INSERT (Catalog, Version) VALUES (s.Catalog, 1);
+            """,
+            (catalog,),
+        )
+    return True
+
+
+def changed_catalogs(old_versions, new_versions):
+    """Claves de master_data cuya versión cambió (sin fila cuenta como 0)."""
+    return [
+        key
+        for key, table in CATALOG_TABLES.items()
+        if old_versions.get(table, 0) != new_versions.get(table, 0)
+    ]
+
+
+class SnapshotFile:
+    """Copia local de master_data para servir la UI apenas arranca el proceso.
+
+    JSON con checksum SHA-256 en la primera línea: un archivo truncado o de otra
+    base (source distinto) se ignora y se carga desde la base como siempre.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = source
+
+    def load(self):
+        """(master_data, catalog_versions) o None si no hay copia válida."""
+        try:
+            with open(self.path, "rb") as handle:
+                checksum = handle.readline().strip().decode("ascii")
+                payload = handle.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+        if hashlib.sha256(payload).hexdigest() != checksum:
+            return None
+        try:
+            data = json.loads(payload.decode("utf-8"))
+        except ValueError:
+            return None
+        if (
+            data.get("format") != _SNAPSHOT_FILE_FORMAT
+            or data.get("source") != self.source
+        ):
+            return None
+        master_data = records_from_dicts(data["master_data"])
+        return master_data, data.get("catalog_versions") or {}
+
+    def save(self, snapshot):
+        payload = json.dumps(
+            {
+                "format": _SNAPSHOT_FILE_FORMAT,
+                "source": self.source,
+                "saved_at": snapshot.loaded_at,
+                "catalog_versions": snapshot.catalog_versions,
+                "master_data": {
+                    name: [dict(item) for item in items]
+                    for name, items in snapshot.master_data.items()
+                },
+            },
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(hashlib.sha256(payload).hexdigest().encode("ascii") + b"\n")
+            handle.write(payload)
+        # Reemplazo atómico: otro proceso nunca lee un archivo a medio escribir.
+        os.replace(tmp_path, self.path)
+
+
+class MasterDataStore:
+    """Snapshot de maestros por proceso: se construye una vez y se reemplaza entero.
+
+    `builder()` devuelve (master_data, indexes). La lectura no toma lock; la
+    construcción sí, así N sesiones que arrancan juntas disparan una sola carga.
+    """
+
+    def __init__(self):
+        self._build_lock = threading.Lock()
+        self._snapshot = None
+        self._version = 0
+        self._checked_at = 0.0
+        self._snapshot_file = None
+        self.last_error = None
+
+    def current(self):
+        return self._snapshot
+
+    def get(self, builder, fetch_versions=None, snapshot_file=None, index_builder=None):
+        """Snapshot actual; la primera llamada lo construye.
+
+        Con snapshot_file e index_builder, un proceso en frío publica la copia
+        local y recarga desde la base en un hilo aparte. Cada carga desde la base
+        se vuelve a guardar en snapshot_file.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._build_lock:
+            # Otra sesión pudo haberlo construido mientras se esperaba el lock.
+            if self._snapshot is not None:
+                return self._snapshot
+            self._snapshot_file = snapshot_file
+            saved = snapshot_file.load() if snapshot_file and index_builder else None
+            if saved is None:
+                self._swap(builder, fetch_versions)
+                return self._snapshot
+            master_data, versions = saved
+            self._publish(master_data, index_builder(master_data), versions, "disk")
+            self._checked_at = time.monotonic()
+        threading.Thread(
+            target=self._refresh_in_background,
+            args=(builder, fetch_versions),
+            name="master-data-refresh",
+            daemon=True,
+        ).start()
+        return self._snapshot
+
+    def _refresh_in_background(self, builder, fetch_versions):
+        try:
+            self.refresh(builder, fetch_versions)
+        except Exception as exc:
+            # Se sigue sirviendo la copia local; el próximo sync reintenta.
+            self.last_error = exc
+            self._checked_at = 0.0
+
+    def refresh(self, builder, fetch_versions=None):
+        """Reconstruye y publica un snapshot nuevo (p. ej. tras un alta de usuario)."""
+        with self._build_lock:
+            self._swap(builder, fetch_versions)
+            return self._snapshot
+
+    def sync(self, fetch_versions, rebuild, min_interval=30):
+        """Compara MasterDataVersion a lo sumo una vez cada min_interval segundos.
+
+        `rebuild(snapshot, catalogs)` devuelve (master_data, indexes) recargando
+        solo esos catálogos; si no cambió nada se conserva el snapshot actual.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - self._checked_at < min_interval:
+            return snapshot
+        with self._build_lock:
+            if time.monotonic() - self._checked_at < min_interval:
+                return self._snapshot
+            self._checked_at = time.monotonic()
+            versions = fetch_versions()
+            snapshot = self._snapshot
+            if snapshot.origin == "disk":
+                # La copia local pudo quedar vieja sin que cambien las versiones.
+                catalogs = list(CATALOG_TABLES)
+            elif versions is None:
+                return snapshot
+            else:
+                catalogs = changed_catalogs(snapshot.catalog_versions, versions)
+            if not catalogs:
+                return snapshot
+            master_data, indexes = rebuild(snapshot, catalogs)
+            self._publish(master_data, indexes, versions or {})
+            return self._snapshot
+
+    def request_check(self):
+        """La próxima llamada a sync consulta la base sin esperar el intervalo."""
+        self._checked_at = 0.0
+
+    def _swap(self, builder, fetch_versions=None):
+        # Versiones antes que datos: un guardado concurrente fuerza otra recarga.
+        versions = (fetch_versions() if fetch_versions else None) or {}
+        master_data, indexes = builder()
+        self._checked_at = time.monotonic()
+        self._publish(master_data, indexes, versions)
+
+    def _publish(self, master_data, indexes, versions, origin="db"):
+        self._version += 1
+        # Asignación de una sola referencia: los lectores ven el viejo o el nuevo.
+        self._snapshot = MasterDataSnapshot(
+            freeze_master_data(master_data),
+            indexes,
+            self._version,
+            time.time(),
+            dict(versions),
+            origin,
+        )
+        if origin == "db":
+            self.last_error = None
+            if self._snapshot_file is not None:
+                try:
+                    self._snapshot_file.save(self._snapshot)
+                except OSError as exc:
+                    # Sin copia local solo se pierde el arranque rápido.
+                    self.last_error = exc
+
+    def clear(self):
+        with self._build_lock:
+            self._snapshot = None
+
+
+MASTER_STORE = MasterDataStore()
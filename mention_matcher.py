@@ -0,0 +1,92 @@
+import re
+import sys
+from array import array
+from collections import deque
+
+
+def mention_tokens(norm_text):
+    """Palabras de un texto ya normalizado; "_", "-", "." y signos separan."""
+    return re.findall(r"[^\W_]+", norm_text or "")
+
+
+class MentionMatcher:
+    """Autómata Aho-Corasick sobre palabras para encontrar nombres de catálogo.
+
+    Cada patrón es una secuencia de palabras ("planta 2", "firmapaz alfredo"),
+    así una mención solo cuenta con palabras completas y "Planta 2" no coincide
+    dentro de "Planta 20". El texto se recorre una sola vez, sin importar
+    cuántos patrones haya. Las transiciones viven en un único dict
+    (nodo, palabra) -> nodo, bastante más chico que un dict por nodo.
+    """
+
+    __slots__ = ("_goto", "_fail", "_out_link", "_depth", "_out")
+
+    def __init__(self, patterns=()):
+        # patterns: (palabras, payload); un mismo patrón puede tener varios payloads.
+        goto = {}
+        children = [[]]
+        depth = array("H", [0])
+        out = {}
+        for tokens, payload in patterns:
+            if not tokens:
+                continue
+            node = 0
+            for token in map(sys.intern, tokens):
+                child = goto.get((node, token))
+                if child is None:
+                    child = len(depth)
+                    goto[(node, token)] = child
+                    depth.append(depth[node] + 1)
+                    children.append([])
+                    children[node].append((token, child))
+                node = child
+            out.setdefault(node, []).append(payload)
+
+        fail = array("I", [0]) * len(depth)
+        out_link = array("I", [0]) * len(depth)
+        queue = deque(child for _token, child in children[0])
+        while queue:
+            node = queue.popleft()
+            for token, child in children[node]:
+                state = fail[node]
+                while state and (state, token) not in goto:
+                    state = fail[state]
+                target = goto.get((state, token), 0)
+                fail[child] = target
+                # Enlace al sufijo más largo que termina un patrón.
+                out_link[child] = target if target in out else out_link[target]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._out_link = out_link
+        self._depth = depth
+        self._out = {node: tuple(payloads) for node, payloads in out.items()}
+
+    def __len__(self):
+        return len(self._out)
+
+    def iter_matches(self, tokens):
+        """(inicio, fin, payloads) de cada patrón presente, en una pasada."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for end, token in enumerate(tokens, 1):
+            while node and (node, token) not in goto:
+                node = fail[node]
+            node = goto.get((node, token), 0)
+            match = node if node in out else self._out_link[node]
+            while match:
+                yield end - self._depth[match], end, out[match]
+                match = self._out_link[match]
+
+    def find(self, tokens):
+        """Menciones sin solapamiento: la más a la izquierda y, a igualdad, la más
+        larga ("planta 2 norte" gana sobre "planta 2")."""
+        matches = sorted(self.iter_matches(tokens), key=lambda m: (m[0], -m[1]))
+        selected = []
+        covered_until = 0
+        for start, end, payloads in matches:
+            if start >= covered_until:
+                selected.append((start, end, payloads))
+                covered_until = end
+        return selected
@@ -1,18 +1,70 @@
 import json
 import os
-import smtplib
+import random
 import threading
 import time
-from datetime import datetime
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from html import escape
 
+from audit_events import EVENT_NOTIFICATION
+from notification_metrics import (
+    NotificationMetrics,
+    fetch_queue_stats,
+    write_metrics_file,
+)
+from smtp_pool import SmtpTransportPool
+
+try:
+    import tomllib  # Python 3.11+
+except ModuleNotFoundError:
+    tomllib = None
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
 
 _WORKER_LOCK = threading.Lock()
 _WORKER_STARTED = False
 _WORKER_THREAD = None
+# Avisos al worker: cada aviso incrementa _WAKE_SEQ y cada hilo compara contra
+# el último valor que vio, así ningún worker consume el aviso de otro.
+_WAKE_COND = threading.Condition()
+_WAKE_SEQ = 0
+# Vencimiento (time.monotonic) del NextAttemptAt retenido más próximo, o None.
+_WAKE_DEADLINE = None
+_WORKER_STOP = threading.Event()
 _RUNTIME = {}
+_SMTP_LOCK = threading.Lock()
+_SMTP_POOL = None
+_SEND_EXECUTOR = None
+METRICS = NotificationMetrics()
+
+OUTBOX_TABLE = "NotificationOutbox"
+OUTBOX_STATUSES = ("pending", "processing", "sent", "dead")
+
+# Errores que no se resuelven reintentando: van directo a dead-letter.
+PERMANENT_DELIVERY_ERRORS = (
+    "ERROR:missing_new_assignee_id",
+    "ERROR:assignee_without_email",
+)
+
+ClaimedNotification = namedtuple(
+    "ClaimedNotification",
+    "outbox_id ticket_id actor_user_id recipient_user_id dedupe_key payload attempts "
+    "priority_level",
+)
+
+# Nivel de las filas sin prioridad conocida: detrás de cualquier Prioridades.Nivel.
+DEFAULT_PRIORITY_LEVEL = 99
+
+# Fila de SchemaMigrations (SQLite) que marca la cola legacy ya migrada.
+LEGACY_QUEUE_MIGRATION = "ticket_log_queue_to_outbox"
 
 
 def build_assignment_dedupe_key(
@@ -25,27 +77,260 @@ def build_assignment_dedupe_key(
     return f"{ticket_id}:{old_assignee_id}->{new_assignee_id}:{updated_at_iso}"
 
 
+def enqueue_assignment_notification(
+    cursor,
+    outbox_table,
+    ticket_id,
+    actor_user_id,
+    recipient_user_id,
+    dedupe_key,
+    payload,
+    delay_seconds=0,
+    prioridad_id=None,
+    priority_level=None,
+):
+    """Encola dentro de la transacción del llamador; ignora claves ya encoladas.
+
+    delay_seconds > 0 retiene la fila (ventana de digest por destinatario).
+    priority_level es Prioridades.Nivel del ticket al encolar (0 = más urgente).
+    """
+    if cursor.__class__.__module__.startswith("sqlite3"):
+        next_sql = "datetime('now', '+' || ? || ' seconds')"
+    else:
+        next_sql = "DATEADD(SECOND, ?, SYSUTCDATETIME())"
+    cursor.execute(
+        f"""
+        INSERT INTO {outbox_table} (
+            TicketId, ActorUserId, RecipientUserId, DedupeKey, Payload,
+            PrioridadId, PrioridadNivel, NextAttemptAt
+        )
+        SELECT ?, ?, ?, ?, ?, ?, ?, {next_sql}
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {outbox_table} WHERE DedupeKey = ?
+        )
+        """,
+        (
+            ticket_id,
+            actor_user_id,
+            recipient_user_id,
+            str(dedupe_key),
+            json.dumps(payload, ensure_ascii=False),
+            prioridad_id,
+            DEFAULT_PRIORITY_LEVEL if priority_level is None else int(priority_level),
+            max(0, int(delay_seconds or 0)),
+            str(dedupe_key),
+        ),
+    )
+
+
+def migrate_legacy_ticket_log_queue_sqlite(
+    conn, logs_table, outbox_table, migrations_table, tickets_table, priorities_table
+):
+    """Migra la cola legacy de TicketLogs; en Azure lo hace el script de info/.
+
+    Corre una sola vez por base: al terminar deja una fila en migrations_table
+    y los arranques siguientes no vuelven a recorrer TicketLogs.
+    """
+    cursor = conn.cursor()
+    cursor.execute(
+        f"SELECT 1 FROM {migrations_table} WHERE Name = ?",
+        (LEGACY_QUEUE_MIGRATION,),
+    )
+    if cursor.fetchone() is not None:
+        return 0
+    cursor.execute(
+        f"""
+        SELECT 1 FROM {logs_table}
+        WHERE FieldName IN ('NotificacionPendiente', 'NotificacionEnProceso')
+        LIMIT 1
+        """
+    )
+    if cursor.fetchone() is None:
+        _mark_migration_done(cursor, migrations_table)
+        return 0
+    cursor.execute(
+        f"""
+        INSERT INTO {outbox_table} (
+            TicketId, ActorUserId, RecipientUserId, DedupeKey, Payload, Status,
+            CreatedAt, PrioridadId, PrioridadNivel
+        )
+        SELECT
+            p.TicketId,
+            p.UserId,
+            CAST(json_extract(p.NewValue, '$.new_assignee_id') AS INTEGER),
+            p.OldValue,
+            p.NewValue,
+            'pending',
+            p.ChangedAt,
+            t.PrioridadId,
+            COALESCE(pr.Nivel, {DEFAULT_PRIORITY_LEVEL})
+        FROM {logs_table} p
+        LEFT JOIN {tickets_table} t ON t.TicketId = p.TicketId
+        LEFT JOIN {priorities_table} pr ON pr.PrioridadId = t.PrioridadId
+        WHERE p.LogId IN (
+            SELECT MIN(l.LogId)
+            FROM {logs_table} l
+            WHERE l.FieldName IN ('NotificacionPendiente', 'NotificacionEnProceso')
+              AND l.OldValue IS NOT NULL
+            GROUP BY l.OldValue
+        )
+          AND NOT EXISTS (
+              SELECT 1
+              FROM {logs_table} e
+              WHERE e.TicketId = p.TicketId
+                AND e.FieldName = 'NotificacionEnviada'
+                AND e.OldValue = p.OldValue
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM {outbox_table} o WHERE o.DedupeKey = p.OldValue
+          )
+        """
+    )
+    migrated = cursor.rowcount
+    cursor.execute(
+        f"""
+        UPDATE {logs_table}
+        SET FieldName = 'NotificacionMigrada'
+        WHERE FieldName IN ('NotificacionPendiente', 'NotificacionEnProceso')
+        """
+    )
+    _mark_migration_done(cursor, migrations_table)
+    return migrated
+
+
+def _mark_migration_done(cursor, migrations_table):
+    cursor.execute(
+        f"INSERT OR IGNORE INTO {migrations_table} (Name) VALUES (?)",
+        (LEGACY_QUEUE_MIGRATION,),
+    )
+
+
+def compute_retry_delay(attempts, base_seconds, max_seconds, rand=random.random):
+    """Backoff exponencial con jitter (mitad fija, mitad aleatoria)."""
+    exponent = max(0, int(attempts) - 1)
+    delay = min(float(max_seconds), float(base_seconds) * (2**exponent))
+    return int(delay / 2 + rand() * delay / 2)
+
+
+def redrive_dead_letters(conn, outbox_table, outbox_ids=None):
+    """Vuelve a encolar notificaciones en dead-letter; None reencola todas."""
+    now_sql = "CURRENT_TIMESTAMP" if _is_sqlite_conn(conn) else "SYSUTCDATETIME()"
+    sql = f"""
+        UPDATE {outbox_table}
+        SET Status = 'pending',
+            Attempts = 0,
+            NextAttemptAt = {now_sql},
+            ClaimedAt = NULL,
+            LastError = NULL
+        WHERE Status = 'dead'
+    """
+    params = []
+    if outbox_ids is not None:
+        ids = [int(oid) for oid in outbox_ids]
+        if not ids:
+            return 0
+        sql += f" AND OutboxId IN ({', '.join(['?'] * len(ids))})"
+        params = ids
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    return cursor.rowcount
+
+
+# Ajustes NOTIF_* del worker: (nombre, parámetro de configure_..., por defecto).
+WORKER_SETTINGS = (
+    ("NOTIF_CLAIM_TIMEOUT_SECONDS", "claim_timeout_seconds", 120),
+    ("NOTIF_MAX_ATTEMPTS", "max_attempts", 5),
+    ("NOTIF_RETRY_BASE_SECONDS", "retry_base_seconds", 30),
+    ("NOTIF_RETRY_MAX_SECONDS", "retry_max_seconds", 3600),
+    ("NOTIF_PRIORITY_MAX_WAIT_SECONDS", "priority_max_wait_seconds", 300),
+    ("NOTIF_SMTP_IDLE_SECONDS", "smtp_idle_seconds", 30),
+    ("NOTIF_METRICS_FILE", "metrics_file", ""),
+    ("NOTIF_METRICS_INTERVAL_SECONDS", "metrics_interval_seconds", 15),
+)
+
+
+def worker_settings(read_setting):
+    """kwargs de WORKER_SETTINGS leídos con read_setting(nombre, por_defecto).
+
+    La app pasa su get_secret y el worker standalone su setting(), así ambos
+    toman los NOTIF_* de las mismas fuentes.
+    """
+    return {
+        param: read_setting(name, default) for name, param, default in WORKER_SETTINGS
+    }
+
+
+def configure_assignment_notification_worker(
+    get_connection,
+    get_schema,
+    app_url,
+    poll_seconds=5,
+    smtp_config=None,
+    poll_max_seconds=60,
+    smtp_concurrency=4,
+    digest_window_seconds=0,
+    claim_timeout_seconds=120,
+    max_attempts=5,
+    retry_base_seconds=30,
+    retry_max_seconds=3600,
+    priority_max_wait_seconds=300,
+    smtp_idle_seconds=30,
+    metrics_file="",
+    metrics_interval_seconds=15,
+):
+    global _RUNTIME
+    _RUNTIME = {
+        "get_connection": get_connection,
+        "get_schema": get_schema,
+        "app_url": app_url or os.getenv("APP_BASE_URL", ""),
+        "poll_seconds": max(1, int(poll_seconds)),
+        "poll_max_seconds": max(int(poll_seconds), int(poll_max_seconds)),
+        "batch_size": 20,
+        "claim_timeout_seconds": max(30, int(claim_timeout_seconds)),
+        "next_stale_check": 0.0,
+        "max_attempts": max(1, int(max_attempts)),
+        "retry_base_seconds": max(1, int(retry_base_seconds)),
+        "retry_max_seconds": max(1, int(retry_max_seconds)),
+        "smtp_config": smtp_config or {},
+        "smtp_concurrency": max(1, int(smtp_concurrency)),
+        "digest_window_seconds": max(0, int(digest_window_seconds or 0)),
+        # Espera máxima (desde que la fila es elegible) antes de saltear prioridades.
+        "priority_max_wait_seconds": max(0, int(priority_max_wait_seconds)),
+        "smtp_idle_seconds": max(5, int(smtp_idle_seconds)),
+        "metrics_file": str(metrics_file or ""),
+        "metrics_interval_seconds": max(1, int(metrics_interval_seconds)),
+        "next_metrics_dump": 0.0,
+    }
+    return _RUNTIME
+
+
 def start_assignment_notification_worker_once(
     get_connection,
     get_schema,
     app_url,
     poll_seconds=5,
     smtp_config=None,
+    poll_max_seconds=60,
+    smtp_concurrency=4,
+    digest_window_seconds=0,
+    **settings,
 ):
-    global _WORKER_STARTED, _WORKER_THREAD, _RUNTIME
+    """settings: resto de parámetros de configure_assignment_notification_worker."""
+    global _WORKER_STARTED, _WORKER_THREAD
     with _WORKER_LOCK:
         if _WORKER_STARTED:
             return False
-        _RUNTIME = {
-            "get_connection": get_connection,
-            "get_schema": get_schema,
-            "app_url": app_url or os.getenv("APP_BASE_URL", ""),
-            "poll_seconds": max(1, int(poll_seconds)),
-            "claim_timeout_seconds": max(
-                30, int(os.getenv("NOTIF_CLAIM_TIMEOUT_SECONDS", "120"))
-            ),
-            "smtp_config": smtp_config or {},
-        }
+        configure_assignment_notification_worker(
+            get_connection,
+            get_schema,
+            app_url,
+            poll_seconds=poll_seconds,
+            smtp_config=smtp_config,
+            poll_max_seconds=poll_max_seconds,
+            smtp_concurrency=smtp_concurrency,
+            digest_window_seconds=digest_window_seconds,
+            **settings,
+        )
         _WORKER_THREAD = threading.Thread(
             target=_worker_loop,
             name="assignment-notification-worker",
@@ -56,14 +341,191 @@ def start_assignment_notification_worker_once(
         return True
 
 
+def start_worker_threads(count=1, daemon=False):
+    """Levanta N hilos de worker sobre el runtime ya configurado."""
+    _WORKER_STOP.clear()
+    threads = [
+        threading.Thread(
+            target=_worker_loop,
+            name=f"assignment-notification-worker-{i + 1}",
+            daemon=daemon,
+        )
+        for i in range(max(1, int(count)))
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def stop_assignment_notification_worker():
+    """Pide a los workers terminar al cerrar el lote en curso."""
+    _WORKER_STOP.set()
+    _signal_wakeup()
+
+
+def get_notification_metrics(conn=None, outbox_table=None):
+    """Métricas del worker de este proceso y, con conexión, profundidad de cola."""
+    metrics = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "worker": METRICS.snapshot(),
+        "worker_running": bool(_WORKER_STARTED and not _WORKER_STOP.is_set()),
+        "queue": None,
+    }
+    if conn is not None:
+        metrics["queue"] = fetch_queue_stats(conn, outbox_table or OUTBOX_TABLE)
+    return metrics
+
+
+def configured_metrics_file():
+    """NOTIF_METRICS_FILE que escribe el worker.
+
+    Con el worker en este proceso es la ruta con la que se configuró; si no, la
+    que resuelve el worker standalone (entorno y después .streamlit/secrets.toml).
+    """
+    if _RUNTIME:
+        return _RUNTIME.get("metrics_file", "")
+    return _standalone_setting("NOTIF_METRICS_FILE", "", _load_streamlit_secrets())
+
+
+def _maybe_dump_metrics():
+    path = _RUNTIME.get("metrics_file")
+    if not path:
+        return
+    now = time.monotonic()
+    if now < _RUNTIME.get("next_metrics_dump", 0.0):
+        return
+    _RUNTIME["next_metrics_dump"] = now + _RUNTIME["metrics_interval_seconds"]
+    try:
+        conn = _RUNTIME["get_connection"]()
+        try:
+            metrics = get_notification_metrics(conn, _qname(OUTBOX_TABLE))
+        finally:
+            conn.close()
+        metrics["worker_running"] = True
+        write_metrics_file(path, metrics)
+    except Exception as exc:
+        METRICS.record_loop_error(exc)
+
+
+def wake_assignment_notification_worker(delay_seconds=0):
+    """Avisa al worker que hay filas nuevas en el outbox (llamar tras el commit)."""
+    if delay_seconds and delay_seconds > 0:
+        # Fila retenida por la ventana de digest: despertar cuando venza.
+        _schedule_wakeup(delay_seconds)
+        return
+    _signal_wakeup()
+
+
+def _schedule_wakeup(delay_seconds):
+    """Agenda un aviso; solo se guarda el vencimiento más temprano."""
+    global _WAKE_DEADLINE
+    deadline = time.monotonic() + delay_seconds
+    with _WAKE_COND:
+        if _WAKE_DEADLINE is None or deadline < _WAKE_DEADLINE:
+            _WAKE_DEADLINE = deadline
+            _WAKE_COND.notify_all()
+
+
+def _signal_wakeup():
+    global _WAKE_SEQ
+    with _WAKE_COND:
+        _WAKE_SEQ += 1
+        _WAKE_COND.notify_all()
+
+
+def _wait_for_wakeup(seen_seq, timeout):
+    """True si llegó un aviso posterior a seen_seq (o stop) antes de timeout."""
+    global _WAKE_SEQ, _WAKE_DEADLINE
+    until = time.monotonic() + timeout
+    with _WAKE_COND:
+        while _WAKE_SEQ == seen_seq and not _WORKER_STOP.is_set():
+            now = time.monotonic()
+            if _WAKE_DEADLINE is not None and _WAKE_DEADLINE <= now:
+                # Venció la fila retenida: cuenta como aviso para todos los workers.
+                _WAKE_DEADLINE = None
+                _WAKE_SEQ += 1
+                _WAKE_COND.notify_all()
+                break
+            remaining = until - now
+            if remaining <= 0:
+                return False
+            if _WAKE_DEADLINE is not None:
+                remaining = min(remaining, _WAKE_DEADLINE - now)
+            _WAKE_COND.wait(remaining)
+        return True
+
+
+def _schedule_next_due():
+    """Agenda el NextAttemptAt pendiente más próximo (digest o backoff) de la base.
+
+    Cubre filas encoladas por otros procesos y vencimientos posteriores al que
+    ya estaba agendado.
+    """
+    conn = _RUNTIME["get_connection"]()
+    try:
+        cursor = conn.cursor()
+        if _is_sqlite_conn(conn):
+            seconds_sql = (
+                "(julianday(MIN(NextAttemptAt)) - julianday('now')) * 86400.0"
+            )
+        else:
+            seconds_sql = (
+                "DATEDIFF_BIG(MILLISECOND, SYSUTCDATETIME(), MIN(NextAttemptAt))"
+                " / 1000.0"
+            )
+        cursor.execute(
+            f"""
+            SELECT {seconds_sql}
+            FROM {_qname(OUTBOX_TABLE)}
+            WHERE Status = 'pending'
+            """
+        )
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    seconds = row[0] if row else None
+    # Vencidas sin reclamar (tomadas por otro proceso): queda el poll de respaldo.
+    if seconds is not None and float(seconds) > 0:
+        _schedule_wakeup(float(seconds))
+
+
+def _next_idle_wait(current_wait):
+    # Backoff exponencial mientras la cola siga vacía, acotado a poll_max_seconds.
+    return min(_RUNTIME["poll_max_seconds"], current_wait * 2)
+
+
 def _worker_loop():
-    while True:
+    idle_wait = _RUNTIME["poll_seconds"]
+    while not _WORKER_STOP.is_set():
+        # Se toma antes de procesar: un aviso durante el lote no se pierde.
+        seen_seq = _WAKE_SEQ
+        processed = 0
+        try:
+            processed = _process_pending_notifications_batch(_RUNTIME["batch_size"])
+        except Exception as exc:
+            # El worker no debe caerse por errores puntuales, pero quedan medidos.
+            METRICS.record_loop_error(exc)
+        METRICS.mark_loop()
+        _maybe_dump_metrics()
+        if _WORKER_STOP.is_set():
+            break
+        if processed >= _RUNTIME["batch_size"]:
+            # Lote completo: probablemente quedan más pendientes.
+            idle_wait = _RUNTIME["poll_seconds"]
+            continue
+        if processed:
+            idle_wait = _RUNTIME["poll_seconds"]
+        _prune_smtp_sessions()
         try:
-            _process_pending_notifications_batch()
-        except Exception:
-            # El worker no debe caerse por errores puntuales.
-            pass
-        time.sleep(_RUNTIME["poll_seconds"])
+            _schedule_next_due()
+        except Exception as exc:
+            METRICS.record_loop_error(exc)
+        woken = _wait_for_wakeup(seen_seq, idle_wait)
+        if woken:
+            idle_wait = _RUNTIME["poll_seconds"]
+        elif not processed:
+            # El poll periódico queda como respaldo para filas de otros procesos.
+            idle_wait = _next_idle_wait(idle_wait)
 
 
 def _qname(table_name):
@@ -76,194 +538,313 @@ def _is_sqlite_conn(conn):
 
 
 def _process_pending_notifications_batch(batch_size=20):
+    # Round trips por lote: liberar vencidos, claim de N, contactos y resultados.
     _release_stale_claims()
-    top_n = max(1, int(batch_size))
-    for _ in range(top_n):
-        claimed = _claim_one_pending()
-        if not claimed:
-            break
-        claim_log_id, ticket_id, actor_user_id, dedupe_key, payload_raw = claimed
-        _process_one_claimed(
-            claim_log_id=claim_log_id,
-            ticket_id=ticket_id,
-            actor_user_id=actor_user_id,
-            dedupe_key=dedupe_key,
-            payload_raw=payload_raw,
+    started = time.perf_counter()
+    claimed = _claim_pending_batch(batch_size)
+    METRICS.observe("claim", time.perf_counter() - started)
+    METRICS.incr("batches")
+    if not claimed:
+        return 0
+    METRICS.incr("claimed", len(claimed))
+
+    recipient_ids = set()
+    for item in claimed:
+        recipient_id = _recipient_id(
+            item.recipient_user_id, _safe_json_loads(item.payload)
+        )
+        if recipient_id is not None:
+            recipient_ids.add(recipient_id)
+    contacts = _fetch_user_contacts(recipient_ids)
+
+    # Los envíos corren en paralelo sobre sesiones SMTP reutilizadas.
+    executor = _get_send_executor()
+    groups = _group_for_delivery(claimed)
+    futures = [
+        executor.submit(_deliver_group, items=items, contacts=contacts)
+        for items in groups
+    ]
+    results = []
+    for items, future in zip(groups, futures):
+        result = future.result()
+        results.extend((item, result) for item in items)
+    _record_delivery_results(results)
+    return len(results)
+
+
+def _group_for_delivery(claimed):
+    """Un grupo por destinatario en modo digest; si no, un grupo por fila."""
+    if not _RUNTIME.get("digest_window_seconds"):
+        return [[item] for item in claimed]
+    groups = {}
+    singles = []
+    for item in claimed:
+        recipient_id = _recipient_id(
+            item.recipient_user_id, _safe_json_loads(item.payload)
         )
+        if recipient_id is None:
+            singles.append([item])
+        else:
+            groups.setdefault(recipient_id, []).append(item)
+    return list(groups.values()) + singles
 
 
 def _release_stale_claims():
+    # Solo cada media ventana de timeout: antes corría en cada lote.
+    now = time.monotonic()
+    if now < _RUNTIME.get("next_stale_check", 0.0):
+        return
+    _RUNTIME["next_stale_check"] = now + _RUNTIME["claim_timeout_seconds"] / 2.0
+
+    # Un claim vencido cuenta como intento fallido: reintento o dead-letter.
+    params = (
+        _RUNTIME["max_attempts"],
+        _RUNTIME["retry_base_seconds"],
+        _RUNTIME["claim_timeout_seconds"],
+    )
     conn = _RUNTIME["get_connection"]()
     try:
         cursor = conn.cursor()
         if _is_sqlite_conn(conn):
-            interval = f"-{int(_RUNTIME['claim_timeout_seconds'])} seconds"
             cursor.execute(
                 f"""
-                UPDATE {_qname("TicketLogs")}
-                SET
-                    FieldName = 'NotificacionPendiente',
-                    ChangedAt = CURRENT_TIMESTAMP
-                WHERE FieldName = 'NotificacionEnProceso'
-                  AND datetime(ChangedAt) <= datetime('now', ?)
-                  AND NOT EXISTS (
-                      SELECT 1
-                      FROM {_qname("TicketLogs")} e
-                      WHERE e.TicketId = {_qname("TicketLogs")}.TicketId
-                        AND e.FieldName = 'NotificacionEnviada'
-                        AND e.OldValue = {_qname("TicketLogs")}.OldValue
-                  )
+                UPDATE {_qname(OUTBOX_TABLE)}
+                SET Status = CASE WHEN Attempts >= ? THEN 'dead' ELSE 'pending' END,
+                    NextAttemptAt = datetime('now', '+' || ? || ' seconds'),
+                    LastError = 'ERROR:claim_timeout',
+                    ClaimedAt = NULL
+                WHERE Status = 'processing'
+                  AND ClaimedAt <= datetime('now', '-' || ? || ' seconds')
                 """,
-                (interval,),
+                params,
             )
         else:
             cursor.execute(
                 f"""
-                UPDATE p
-                SET
-                    p.FieldName = 'NotificacionPendiente',
-                    p.ChangedAt = SYSUTCDATETIME()
-                FROM {_qname("TicketLogs")} p
-                WHERE p.FieldName = 'NotificacionEnProceso'
-                  AND DATEDIFF(SECOND, p.ChangedAt, SYSUTCDATETIME()) >= ?
-                  AND NOT EXISTS (
-                      SELECT 1
-                      FROM {_qname("TicketLogs")} e
-                      WHERE e.TicketId = p.TicketId
-                        AND e.FieldName = 'NotificacionEnviada'
-                        AND e.OldValue = p.OldValue
-                  )
+                UPDATE {_qname(OUTBOX_TABLE)}
+                SET Status = CASE WHEN Attempts >= ? THEN 'dead' ELSE 'pending' END,
+                    NextAttemptAt = DATEADD(SECOND, ?, SYSUTCDATETIME()),
+                    LastError = 'ERROR:claim_timeout',
+                    ClaimedAt = NULL
+                WHERE Status = 'processing'
+                  AND ClaimedAt <= DATEADD(SECOND, -?, SYSUTCDATETIME())
                 """,
-                (_RUNTIME["claim_timeout_seconds"],),
+                params,
             )
         conn.commit()
     finally:
         conn.close()
 
 
-def _claim_one_pending():
+def _claim_pending_batch(batch_size):
+    top_n = max(1, int(batch_size))
+    # En modo digest se suman las filas retenidas del mismo destinatario.
+    digest = 1 if _RUNTIME.get("digest_window_seconds") else 0
+    # Las filas elegibles hace más de max_wait pasan antes que cualquier prioridad.
+    max_wait = int(_RUNTIME.get("priority_max_wait_seconds", 300))
     conn = _RUNTIME["get_connection"]()
     try:
         cursor = conn.cursor()
         if _is_sqlite_conn(conn):
+            # Un solo UPDATE ... RETURNING dentro de BEGIN IMMEDIATE (SQLite >= 3.35).
             cursor.execute("BEGIN IMMEDIATE")
             cursor.execute(
                 f"""
-                SELECT
-                    p.LogId,
-                    p.TicketId,
-                    p.UserId,
-                    p.OldValue,
-                    p.NewValue
-                FROM {_qname("TicketLogs")} p
-                WHERE p.FieldName = 'NotificacionPendiente'
-                  AND NOT EXISTS (
-                      SELECT 1
-                      FROM {_qname("TicketLogs")} sub
-                      WHERE sub.TicketId = p.TicketId
-                        AND sub.OldValue = p.OldValue
-                        AND sub.FieldName IN ('NotificacionEnProceso', 'NotificacionEnviada')
-                        AND sub.LogId <> p.LogId
+                WITH aged AS (
+                    SELECT OutboxId
+                    FROM {_qname(OUTBOX_TABLE)}
+                    WHERE Status = 'pending'
+                      AND NextAttemptAt <= datetime('now', '-' || ? || ' seconds')
+                    ORDER BY NextAttemptAt ASC, OutboxId ASC
+                    LIMIT ?
+                ),
+                ranked AS (
+                    -- Sin ANALYZE el planificador prefiere IX_..._Pending y ordena aparte.
+                    SELECT OutboxId
+                    FROM {_qname(OUTBOX_TABLE)}
+                        INDEXED BY IX_NotificationOutbox_PendingPriority
+                    WHERE Status = 'pending'
+                      AND NextAttemptAt <= CURRENT_TIMESTAMP
+                    ORDER BY PrioridadNivel ASC, NextAttemptAt ASC, OutboxId ASC
+                    LIMIT ?
+                ),
+                candidates AS (
+                    SELECT OutboxId, MIN(Tier) AS Tier
+                    FROM (
+                        SELECT OutboxId, 0 AS Tier FROM aged
+                        UNION ALL
+                        SELECT OutboxId, 1 AS Tier FROM ranked
+                    )
+                    GROUP BY OutboxId
+                ),
+                due AS (
+                    SELECT o.OutboxId, o.RecipientUserId
+                    FROM {_qname(OUTBOX_TABLE)} o
+                    JOIN candidates c ON c.OutboxId = o.OutboxId
+                    ORDER BY c.Tier, o.PrioridadNivel, o.NextAttemptAt, o.OutboxId
+                    LIMIT ?
+                )
+                UPDATE {_qname(OUTBOX_TABLE)}
+                SET Status = 'processing',
+                    ClaimedAt = CURRENT_TIMESTAMP,
+                    Attempts = Attempts + 1
+                WHERE Status = 'pending'
+                  AND (
+                      OutboxId IN (SELECT OutboxId FROM due)
+                      OR (
+                          ? = 1
+                          AND Attempts = 0
+                          AND RecipientUserId IN (
+                              SELECT RecipientUserId FROM due
+                              WHERE RecipientUserId IS NOT NULL
+                          )
+                      )
                   )
-                ORDER BY p.ChangedAt ASC, p.LogId ASC
-                LIMIT 1
-                """
+                RETURNING
+                    OutboxId,
+                    TicketId,
+                    ActorUserId,
+                    RecipientUserId,
+                    DedupeKey,
+                    Payload,
+                    Attempts,
+                    PrioridadNivel
+                """,
+                (max_wait, top_n, top_n, top_n, digest),
             )
-            row = cursor.fetchone()
-            if row:
-                cursor.execute(
-                    f"""
-                    UPDATE {_qname("TicketLogs")}
-                    SET FieldName = 'NotificacionEnProceso',
-                        ChangedAt = CURRENT_TIMESTAMP
-                    WHERE LogId = ?
-                    """,
-                    (row[0],),
-                )
         else:
             cursor.execute(
                 f"""
-                WITH next_pending AS (
-                    SELECT TOP 1
-                        p.LogId
-                    FROM {_qname("TicketLogs")} p WITH (UPDLOCK, READPAST, ROWLOCK)
-                    WHERE p.FieldName = 'NotificacionPendiente'
-                      AND NOT EXISTS (
-                          SELECT 1
-                          FROM {_qname("TicketLogs")} sub
-                          WHERE sub.TicketId = p.TicketId
-                            AND sub.OldValue = p.OldValue
-                            AND sub.FieldName IN ('NotificacionEnProceso', 'NotificacionEnviada')
-                            AND sub.LogId <> p.LogId
-                      )
-                    ORDER BY p.ChangedAt ASC, p.LogId ASC
+                WITH aged AS (
+                    SELECT TOP (?) OutboxId
+                    FROM {_qname(OUTBOX_TABLE)} WITH (READPAST)
+                    WHERE Status = 'pending'
+                      AND NextAttemptAt <= DATEADD(SECOND, -?, SYSUTCDATETIME())
+                    ORDER BY NextAttemptAt ASC, OutboxId ASC
+                ),
+                ranked AS (
+                    SELECT TOP (?) OutboxId
+                    FROM {_qname(OUTBOX_TABLE)} WITH (READPAST)
+                    WHERE Status = 'pending'
+                      AND NextAttemptAt <= SYSUTCDATETIME()
+                    ORDER BY PrioridadNivel ASC, NextAttemptAt ASC, OutboxId ASC
+                ),
+                candidates AS (
+                    SELECT u.OutboxId, MIN(u.Tier) AS Tier
+                    FROM (
+                        SELECT OutboxId, 0 AS Tier FROM aged
+                        UNION ALL
+                        SELECT OutboxId, 1 AS Tier FROM ranked
+                    ) u
+                    GROUP BY u.OutboxId
+                ),
+                due AS (
+                    SELECT TOP (?) o.OutboxId, o.RecipientUserId
+                    FROM {_qname(OUTBOX_TABLE)} o WITH (UPDLOCK, READPAST, ROWLOCK)
+                    JOIN candidates c ON c.OutboxId = o.OutboxId
+                    WHERE o.Status = 'pending'
+                    ORDER BY c.Tier, o.PrioridadNivel, o.NextAttemptAt, o.OutboxId
                 )
-                UPDATE p
+                UPDATE o
                 SET
-                    p.FieldName = 'NotificacionEnProceso',
-                    p.ChangedAt = SYSUTCDATETIME()
+                    o.Status = 'processing',
+                    o.ClaimedAt = SYSUTCDATETIME(),
+                    o.Attempts = o.Attempts + 1
                 OUTPUT
-                    inserted.LogId,
+                    inserted.OutboxId,
                     inserted.TicketId,
-                    inserted.UserId,
-                    inserted.OldValue,
-                    inserted.NewValue
-                FROM {_qname("TicketLogs")} p
-                INNER JOIN next_pending np ON np.LogId = p.LogId;
-                """
+                    inserted.ActorUserId,
+                    inserted.RecipientUserId,
+                    inserted.DedupeKey,
+                    inserted.Payload,
+                    inserted.Attempts,
+                    inserted.PrioridadNivel
+                FROM {_qname(OUTBOX_TABLE)} o WITH (UPDLOCK, READPAST, ROWLOCK)
+                WHERE o.Status = 'pending'
+                  AND (
+                      o.OutboxId IN (SELECT OutboxId FROM due)
+                      OR (
+                          ? = 1
+                          AND o.Attempts = 0
+                          AND o.RecipientUserId IN (
+                              SELECT RecipientUserId FROM due
+                              WHERE RecipientUserId IS NOT NULL
+                          )
+                      )
+                  );
+                """,
+                (top_n, max_wait, top_n, top_n, digest),
             )
-            row = cursor.fetchone()
+        # Ni RETURNING ni OUTPUT garantizan orden: se reordena por prioridad.
+        rows = sorted(
+            (ClaimedNotification(*r) for r in cursor.fetchall()),
+            key=lambda r: (r.priority_level, r.outbox_id),
+        )
         conn.commit()
-        return row
+        return rows
     finally:
         conn.close()
 
 
-def _process_one_claimed(
-    claim_log_id, ticket_id, actor_user_id, dedupe_key, payload_raw
-):
-    payload = _safe_json_loads(payload_raw)
-    assignee_id = payload.get("new_assignee_id")
+def _recipient_id(recipient_user_id, payload):
+    if recipient_user_id is not None:
+        return recipient_user_id
+    return payload.get("new_assignee_id")
+
+
+def _deliver_group(items, contacts):
+    """Envía un mail por grupo (un ticket o el digest de un destinatario)."""
+    first_payload = _safe_json_loads(items[0].payload)
+    assignee_id = _recipient_id(items[0].recipient_user_id, first_payload)
     if assignee_id is None:
-        _insert_delivery_log(
-            ticket_id, actor_user_id, dedupe_key, "ERROR:missing_new_assignee_id"
-        )
-        return
+        METRICS.record_failure("missing_new_assignee_id", len(items))
+        return "ERROR:missing_new_assignee_id"
 
-    title = payload.get("title") or ""
-    estado = payload.get("estado") or ""
-    assigned_by = payload.get("assigned_by") or "Sistema"
-    recipient_email, _recipient_username = _fetch_user_contact(assignee_id)
+    recipient_email, _recipient_username = contacts.get(assignee_id, (None, None))
     if not recipient_email:
-        _insert_delivery_log(
-            ticket_id, actor_user_id, dedupe_key, "ERROR:assignee_without_email"
+        METRICS.record_failure("assignee_without_email", len(items))
+        return "ERROR:assignee_without_email"
+
+    tickets = []
+    for item in items:
+        payload = _safe_json_loads(item.payload)
+        tickets.append(
+            {
+                "ticket_id": item.ticket_id,
+                "title": payload.get("title") or "",
+                "estado": payload.get("estado") or "",
+                "assigned_by": payload.get("assigned_by") or "Sistema",
+            }
         )
-        return
 
-    subject = f"Nuevo ticket asignado #{ticket_id}"
+    if len(tickets) == 1:
+        subject = f"Nuevo ticket asignado #{tickets[0]['ticket_id']}"
+    else:
+        subject = f"Nuevos tickets asignados ({len(tickets)})"
     body_html = _build_assignment_mail_html(
-        ticket_id=ticket_id,
-        title=title,
-        estado=estado,
-        assigned_by=assigned_by,
+        ticket_id=tickets[0]["ticket_id"],
+        title=tickets[0]["title"],
+        estado=tickets[0]["estado"],
+        assigned_by=tickets[0]["assigned_by"],
         app_url=_RUNTIME.get("app_url", ""),
+        tickets=tickets,
     )
 
+    started = time.perf_counter()
     try:
         _send_html_mail_smtp(
             to_email=recipient_email, subject=subject, html_body=body_html
         )
-        _insert_delivery_log(ticket_id, actor_user_id, dedupe_key, "OK")
+        METRICS.observe("send", time.perf_counter() - started)
+        METRICS.incr("sent", len(items))
+        return "OK"
     except Exception as exc:
+        METRICS.observe("send", time.perf_counter() - started)
+        METRICS.record_failure(exc.__class__.__name__, len(items))
         err_detail = str(exc).strip()
         if len(err_detail) > 240:
             err_detail = err_detail[:240]
-        _insert_delivery_log(
-            ticket_id,
-            actor_user_id,
-            dedupe_key,
-            f"ERROR:{err_detail or 'smtp_send_failed'}",
-        )
+        return f"ERROR:{err_detail or 'smtp_send_failed'}"
 
 
 def _safe_json_loads(raw_text):
@@ -275,58 +856,139 @@ def _safe_json_loads(raw_text):
         return {}
 
 
-def _fetch_user_contact(user_id):
+def _fetch_user_contacts(user_ids):
+    """Devuelve {UserId: (Email, Username)} con una sola consulta IN."""
+    ids = sorted({int(uid) for uid in user_ids if uid is not None})
+    if not ids:
+        return {}
+    placeholders = ", ".join(["?"] * len(ids))
     conn = _RUNTIME["get_connection"]()
     try:
         cursor = conn.cursor()
-        if _is_sqlite_conn(conn):
-            cursor.execute(
-                f"SELECT Username, Email FROM {_qname('Users')} WHERE UserId = ? LIMIT 1",
-                (user_id,),
-            )
-        else:
-            cursor.execute(
-                f"SELECT TOP 1 Username, Email FROM {_qname('Users')} WHERE UserId = ?",
-                (user_id,),
-            )
-        row = cursor.fetchone()
-        if not row:
-            return None, None
-        return row[1], row[0]
+        cursor.execute(
+            f"""
+            SELECT UserId, Username, Email
+            FROM {_qname('Users')}
+            WHERE UserId IN ({placeholders})
+            """,
+            ids,
+        )
+        return {int(row[0]): (row[2], row[1]) for row in cursor.fetchall()}
     finally:
         conn.close()
 
 
-def _insert_delivery_log(ticket_id, actor_user_id, dedupe_key, result):
+def _delivery_outcome(result, attempts):
+    """(Status, LastError, segundos hasta el próximo intento) para un resultado."""
+    if result == "OK":
+        return "sent", None, 0
+    error = str(result)[:400]
+    if result in PERMANENT_DELIVERY_ERRORS or attempts >= _RUNTIME["max_attempts"]:
+        return "dead", error, 0
+    delay = compute_retry_delay(
+        attempts, _RUNTIME["retry_base_seconds"], _RUNTIME["retry_max_seconds"]
+    )
+    return "pending", error, delay
+
+
+def _record_delivery_results(results):
+    if not results:
+        return
     conn = _RUNTIME["get_connection"]()
     try:
+        is_sqlite = _is_sqlite_conn(conn)
+        if is_sqlite:
+            now_sql = "CURRENT_TIMESTAMP"
+            next_sql = "datetime('now', '+' || ? || ' seconds')"
+        else:
+            now_sql = "SYSUTCDATETIME()"
+            next_sql = "DATEADD(SECOND, ?, SYSUTCDATETIME())"
+        outbox_rows = []
+        log_rows = []
+        for item, result in results:
+            status, error, delay = _delivery_outcome(result, item.attempts)
+            if status == "pending":
+                METRICS.incr("retried")
+            elif status == "dead":
+                METRICS.incr("dead")
+            outbox_rows.append((status, error, delay, status, item.outbox_id))
+            log_rows.append(
+                (
+                    item.ticket_id,
+                    item.actor_user_id,
+                    str(item.dedupe_key),
+                    str(result),
+                    item.recipient_user_id,
+                )
+            )
+
         cursor = conn.cursor()
-        cursor.execute(
+        cursor.executemany(
             f"""
-            INSERT INTO {_qname("TicketLogs")} (TicketId, UserId, IsAi, FieldName, OldValue, NewValue)
-            VALUES (?, ?, 0, 'NotificacionEnviada', ?, ?)
+            UPDATE {_qname(OUTBOX_TABLE)}
+            SET Status = ?,
+                LastError = ?,
+                NextAttemptAt = {next_sql},
+                SentAt = CASE WHEN ? = 'sent' THEN {now_sql} ELSE SentAt END,
+                ClaimedAt = NULL
+            WHERE OutboxId = ?
             """,
-            (ticket_id, actor_user_id, str(dedupe_key), str(result)),
+            outbox_rows,
+        )
+        # Cada intento queda además en el historial visible del ticket.
+        cursor.executemany(
+            f"""
+            INSERT INTO {_qname("TicketLogs")} (
+                TicketId, UserId, IsAi, FieldName, OldValue, NewValue, EventType, NewId
+            )
+            VALUES (?, ?, 0, 'NotificacionEnviada', ?, ?, '{EVENT_NOTIFICATION}', ?)
+            """,
+            log_rows,
         )
         conn.commit()
     finally:
         conn.close()
 
 
-def _build_assignment_mail_html(ticket_id, title, estado, assigned_by, app_url):
+def _build_assignment_mail_html(
+    ticket_id, title, estado, assigned_by, app_url, tickets=None
+):
+    app_url_safe = escape(str(app_url or ""))
+    footer = (
+        f"<p>Ingresa a la aplicacion para gestionarlo:<br>"
+        f'<a href="{app_url_safe}">{app_url_safe}</a></p>'
+        f"<p>Este es un mensaje automatico.</p>"
+    )
+    if tickets and len(tickets) > 1:
+        # Digest: una fila por ticket asignado dentro de la ventana.
+        rows = "".join(
+            "<tr>"
+            f"<td>#{escape(str(t.get('ticket_id')))}</td>"
+            f"<td>{escape(str(t.get('title') or 'Sin titulo'))[:120]}</td>"
+            f"<td>{escape(str(t.get('estado') or 'Sin estado'))}</td>"
+            f"<td>{escape(str(t.get('assigned_by') or 'Sistema'))}</td>"
+            "</tr>"
+            for t in tickets
+        )
+        return (
+            f"<p>Se te han asignado {len(tickets)} tickets</p>"
+            '<table border="1" cellpadding="4" cellspacing="0">'
+            "<tr><th>Ticket</th><th>Titulo</th><th>Estado</th>"
+            "<th>Asignado por</th></tr>"
+            f"{rows}</table>"
+            f"{footer}"
+        )
+
     ticket_id_safe = escape(str(ticket_id))
     title_safe = escape(str(title or "Sin titulo"))[:120]
     estado_safe = escape(str(estado or "Sin estado"))
     assigned_by_safe = escape(str(assigned_by or "Sistema"))
-    app_url_safe = escape(str(app_url or ""))
     return (
         f"<p>Se te ha asignado el ticket #{ticket_id_safe}</p>"
         f"<p><strong>Titulo:</strong> {title_safe}</p>"
         f"<p><strong>Estado:</strong> {estado_safe}</p>"
         f"<p><strong>Asignado por:</strong> {assigned_by_safe}</p>"
-        f"<p>Ingresa a la aplicacion para gestionarlo:<br>"
-        f'<a href="{app_url_safe}">{app_url_safe}</a></p>'
-        f"<p>Este es un mensaje automatico.</p>"
+        f"{footer}"
     )
 
 
@@ -337,6 +999,7 @@ def _send_html_mail_smtp(to_email, subject, html_body):
     smtp_user = smtp_cfg.get("SMTP_USER") or os.getenv("SMTP_USER")
     smtp_password = smtp_cfg.get("SMTP_PASSWORD") or os.getenv("SMTP_PASSWORD")
     smtp_sender = smtp_cfg.get("SMTP_SENDER") or os.getenv("SMTP_SENDER")
+    smtp_starttls = smtp_cfg.get("SMTP_STARTTLS") or os.getenv("SMTP_STARTTLS", "true")
 
     missing = [
         key
@@ -358,9 +1021,163 @@ def _send_html_mail_smtp(to_email, subject, html_body):
     msg["To"] = to_email
     msg.attach(MIMEText(html_body, "html", "utf-8"))
 
-    with smtplib.SMTP(smtp_host, smtp_port, timeout=30) as server:
-        server.ehlo()
-        server.starttls()
-        server.ehlo()
-        server.login(smtp_user, smtp_password)
-        server.sendmail(smtp_sender, [to_email], msg.as_string())
+    pool = _get_smtp_pool(
+        smtp_host,
+        smtp_port,
+        smtp_user,
+        smtp_password,
+        use_starttls=str(smtp_starttls).strip().lower() not in ("0", "false", "no"),
+    )
+    pool.send(smtp_sender, [to_email], msg.as_string())
+
+
+def _get_smtp_pool(host, port, user, password, use_starttls=True):
+    global _SMTP_POOL
+    with _SMTP_LOCK:
+        if _SMTP_POOL is None:
+            _SMTP_POOL = SmtpTransportPool(
+                host,
+                port,
+                user,
+                password,
+                max_sessions=_RUNTIME.get("smtp_concurrency", 4),
+                idle_seconds=_RUNTIME.get("smtp_idle_seconds", 30),
+                use_starttls=use_starttls,
+            )
+        return _SMTP_POOL
+
+
+def _get_send_executor():
+    global _SEND_EXECUTOR
+    with _SMTP_LOCK:
+        if _SEND_EXECUTOR is None:
+            _SEND_EXECUTOR = ThreadPoolExecutor(
+                max_workers=_RUNTIME.get("smtp_concurrency", 4),
+                thread_name_prefix="assignment-notification-send",
+            )
+        return _SEND_EXECUTOR
+
+
+def _prune_smtp_sessions():
+    with _SMTP_LOCK:
+        pool = _SMTP_POOL
+    if pool is not None:
+        pool.prune_idle()
+
+
+def _shutdown_delivery():
+    global _SEND_EXECUTOR, _SMTP_POOL
+    with _SMTP_LOCK:
+        executor, _SEND_EXECUTOR = _SEND_EXECUTOR, None
+        pool, _SMTP_POOL = _SMTP_POOL, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+    if pool is not None:
+        pool.close()
+
+
+def _standalone_setting(name, default=None, secrets=None):
+    value = os.getenv(name)
+    if value not in (None, ""):
+        return value
+    value = (secrets or {}).get(name)
+    if value not in (None, ""):
+        return value
+    return default
+
+
+def _load_streamlit_secrets(path=".streamlit/secrets.toml"):
+    if tomllib is None or not os.path.exists(path):
+        return {}
+    with open(path, "rb") as fh:
+        return tomllib.load(fh)
+
+
+def main(argv=None):
+    """Worker standalone: python -m notification_assignment [--workers N]."""
+    import argparse
+    import signal
+
+    from db_adapter import DBAdapter
+
+    parser = argparse.ArgumentParser(
+        description="Worker de notificaciones de asignación (NotificationOutbox)."
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--poll-seconds", type=int, default=None)
+    parser.add_argument("--poll-max-seconds", type=int, default=None)
+    parser.add_argument("--smtp-concurrency", type=int, default=None)
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Procesa un lote y termina (útil para cron/diagnóstico).",
+    )
+    args = parser.parse_args(argv)
+
+    if load_dotenv is not None:
+        load_dotenv()
+    secrets = _load_streamlit_secrets(args.secrets)
+
+    def setting(name, default=None):
+        return _standalone_setting(name, default, secrets)
+
+    adapter = DBAdapter(
+        mode=setting("DB_MODE", "azure"),
+        schema=setting("DB_SCHEMA", "gestar"),
+        sqlite_path=setting("SQLITE_PATH", "tickets_mvp.db"),
+        odbc_conn_str=setting("ODBC_CONN_STR"),
+    )
+    configure_assignment_notification_worker(
+        get_connection=adapter.connect,
+        get_schema=lambda: "" if adapter.is_sqlite else adapter.schema,
+        app_url=setting("APP_BASE_URL", ""),
+        poll_seconds=args.poll_seconds or int(setting("NOTIF_POLL_SECONDS", 5)),
+        poll_max_seconds=args.poll_max_seconds
+        or int(setting("NOTIF_POLL_MAX_SECONDS", 60)),
+        smtp_concurrency=args.smtp_concurrency
+        or int(setting("NOTIF_SMTP_CONCURRENCY", 4)),
+        digest_window_seconds=int(setting("NOTIF_DIGEST_WINDOW_SECONDS", 0)),
+        **worker_settings(setting),
+        smtp_config={
+            key: setting(key, "")
+            for key in (
+                "SMTP_HOST",
+                "SMTP_PORT",
+                "SMTP_USER",
+                "SMTP_PASSWORD",
+                "SMTP_SENDER",
+                "SMTP_STARTTLS",
+            )
+        },
+    )
+
+    if args.once:
+        processed = _process_pending_notifications_batch(_RUNTIME["batch_size"])
+        METRICS.mark_loop()
+        _maybe_dump_metrics()
+        _shutdown_delivery()
+        print(f"Notificaciones procesadas: {processed}")
+        return 0
+
+    def _handle_signal(signum, _frame):
+        print(f"Señal {signum} recibida; cerrando al terminar el lote en curso.")
+        stop_assignment_notification_worker()
+
+    signal.signal(signal.SIGINT, _handle_signal)
+    signal.signal(signal.SIGTERM, _handle_signal)
+
+    # Varios workers (hilos o procesos) comparten el outbox: el claim usa
+    # UPDLOCK/READPAST en Azure y BEGIN IMMEDIATE en SQLite.
+    threads = start_worker_threads(args.workers)
+    print(f"Worker de notificaciones iniciado ({len(threads)} hilo/s).")
+    while any(thread.is_alive() for thread in threads):
+        for thread in threads:
+            thread.join(timeout=1.0)
+    _shutdown_delivery()
+    print("Worker de notificaciones detenido.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
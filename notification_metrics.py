@@ -0,0 +1,185 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+
+class NotificationMetrics:
+    """Contadores y duraciones del worker de notificaciones (por proceso)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {
+                "batches": 0,
+                "claimed": 0,
+                "sent": 0,
+                "failed": 0,
+                "retried": 0,
+                "dead": 0,
+            }
+            self._failures_by_class = {}
+            self._loop_errors = {}
+            self._durations = {}
+            self.last_error = None
+            self.last_loop_at = None
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_failure(self, error_class, amount=1):
+        with self._lock:
+            self._counters["failed"] += amount
+            key = str(error_class or "unknown")
+            self._failures_by_class[key] = self._failures_by_class.get(key, 0) + amount
+
+    def record_loop_error(self, exc):
+        with self._lock:
+            key = exc.__class__.__name__
+            self._loop_errors[key] = self._loop_errors.get(key, 0) + 1
+            self.last_error = f"{key}: {str(exc)[:240]}"
+
+    def mark_loop(self):
+        with self._lock:
+            self.last_loop_at = time.time()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            stat = self._durations.setdefault(
+                name, {"count": 0, "total": 0.0, "max": 0.0, "last": 0.0}
+            )
+            stat["count"] += 1
+            stat["total"] += seconds
+            stat["last"] = seconds
+            stat["max"] = max(stat["max"], seconds)
+
+    def snapshot(self):
+        with self._lock:
+            durations = {}
+            for name, stat in self._durations.items():
+                durations[name] = {
+                    "count": stat["count"],
+                    "avg": stat["total"] / stat["count"] if stat["count"] else 0.0,
+                    "max": stat["max"],
+                    "last": stat["last"],
+                }
+            return {
+                "counters": dict(self._counters),
+                "failures_by_class": dict(self._failures_by_class),
+                "loop_errors": dict(self._loop_errors),
+                "durations": durations,
+                "last_error": self.last_error,
+                "last_loop_at": _iso(self.last_loop_at),
+            }
+
+
+def fetch_queue_stats(conn, outbox_table):
+    """Profundidad de la cola y antigüedad del pendiente vencido más viejo.
+
+    Las filas retenidas (digest o backoff, NextAttemptAt futuro) se cuentan
+    aparte en pending_held y no entran en la antigüedad: esperar es lo previsto.
+    """
+    is_sqlite = conn.__class__.__module__.startswith("sqlite3")
+    if is_sqlite:
+        now_sql = "CURRENT_TIMESTAMP"
+        age_sql = (
+            "CAST((julianday('now') - julianday(MIN(CreatedAt))) * 86400 AS INTEGER)"
+        )
+    else:
+        now_sql = "SYSUTCDATETIME()"
+        age_sql = "DATEDIFF(SECOND, MIN(CreatedAt), SYSUTCDATETIME())"
+    # Subconsultas por estado para aprovechar los índices parciales/filtrados.
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT
+            (SELECT COUNT(1) FROM {outbox_table} WHERE Status = 'pending'),
+            (SELECT COUNT(1) FROM {outbox_table} WHERE Status = 'processing'),
+            (SELECT COUNT(1) FROM {outbox_table} WHERE Status = 'dead'),
+            (
+                SELECT COUNT(1) FROM {outbox_table}
+                WHERE Status = 'pending' AND NextAttemptAt > {now_sql}
+            ),
+            (
+                SELECT {age_sql} FROM {outbox_table}
+                WHERE Status = 'pending' AND NextAttemptAt <= {now_sql}
+            )
+        """
+    )
+    row = cursor.fetchone() or (0, 0, 0, 0, None)
+    return {
+        "pending": int(row[0] or 0),
+        "processing": int(row[1] or 0),
+        "dead": int(row[2] or 0),
+        "pending_held": int(row[3] or 0),
+        "oldest_pending_age_seconds": None if row[4] is None else int(row[4]),
+    }
+
+
+def render_prometheus(metrics, prefix="gestar_notif"):
+    lines = []
+    queue = metrics.get("queue") or {}
+    for key in ("pending", "processing", "dead"):
+        if key in queue:
+            lines.append(f'{prefix}_queue_depth{{status="{key}"}} {queue[key]}')
+    if "pending_held" in queue:
+        lines.append(f"{prefix}_pending_held {queue['pending_held']}")
+    if queue.get("oldest_pending_age_seconds") is not None:
+        lines.append(
+            f"{prefix}_oldest_pending_age_seconds {queue['oldest_pending_age_seconds']}"
+        )
+    worker = metrics.get("worker") or {}
+    for key, value in (worker.get("counters") or {}).items():
+        lines.append(f"{prefix}_{key}_total {value}")
+    for key, value in (worker.get("failures_by_class") or {}).items():
+        lines.append(f'{prefix}_failures_total{{error_class="{key}"}} {value}')
+    for key, value in (worker.get("loop_errors") or {}).items():
+        lines.append(f'{prefix}_loop_errors_total{{error_class="{key}"}} {value}')
+    for name, stat in (worker.get("durations") or {}).items():
+        lines.append(f"{prefix}_{name}_seconds_avg {stat['avg']:.6f}")
+        lines.append(f"{prefix}_{name}_seconds_max {stat['max']:.6f}")
+        lines.append(f"{prefix}_{name}_seconds_count {stat['count']}")
+    if worker.get("last_loop_at"):
+        last_loop = datetime.fromisoformat(worker["last_loop_at"]).timestamp()
+        lines.append(f"{prefix}_last_loop_timestamp_seconds {last_loop:.0f}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path, metrics):
+    """Escribe JSON o, si la extensión es .prom, formato texto de Prometheus."""
+    if str(path).endswith(".prom"):
+        content = render_prometheus(metrics)
+    else:
+        content = json.dumps(metrics, ensure_ascii=False, indent=2)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".notif_metrics_", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(content)
+        # Reemplazo atómico: un lector nunca ve un archivo a medio escribir.
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def read_metrics_file(path):
+    if not path or str(path).endswith(".prom") or not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _iso(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
@@ -0,0 +1,278 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from html import escape as html_escape
+
+import pandas as pd
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import (
+        LongTable,
+        Paragraph,
+        SimpleDocTemplate,
+        Spacer,
+        TableStyle,
+    )
+except ImportError:
+    colors = None
+
+
+DEFAULT_PAGE_ROWS = 40
+_CACHE_MAX_ENTRIES = 16
+_CACHE_LOCK = threading.Lock()
+_HTML_CACHE = OrderedDict()
+_PDF_CACHE = OrderedDict()
+
+# Ancho relativo por columna (en unidades de 120px, igual que la vista original).
+_COLUMN_WIDTH_UNITS = {"Title": 2, "Description": 3}
+_BASE_COL_WIDTH_PX = 120
+
+_PRINT_CSS = """
+    :root {
+      --text: #111827;
+      --line: #d1d5db;
+      --header-bg: #f3f4f6;
+    }
+    body {
+      margin: 0;
+      padding: 16px;
+      font-family: Segoe UI, Calibri, Arial, sans-serif;
+      color: var(--text);
+      background: #ffffff;
+    }
+    .toolbar {
+      display: flex;
+      justify-content: space-between;
+      align-items: center;
+      margin-bottom: 12px;
+    }
+    .title {
+      font-size: 18px;
+      font-weight: 600;
+    }
+    .page-label {
+      font-size: 11px;
+      color: #6b7280;
+      margin: 8px 0 4px 0;
+    }
+    button {
+      border: 1px solid #111827;
+      background: #111827;
+      color: #ffffff;
+      padding: 8px 12px;
+      border-radius: 6px;
+      cursor: pointer;
+    }
+    table.print-table {
+      border-collapse: collapse;
+      width: 100%;
+      font-size: 12px;
+    }
+    table.print-table th,
+    table.print-table td {
+      border: 1px solid var(--line);
+      padding: 6px 8px;
+      vertical-align: top;
+      text-align: left;
+    }
+    table.print-table th {
+      background: var(--header-bg);
+      font-weight: 700;
+    }
+    .print-page {
+      break-after: page;
+      page-break-after: always;
+    }
+    .print-page:last-child {
+      break-after: auto;
+      page-break-after: auto;
+    }
+    @media print {
+      @page {
+        size: A4 landscape;
+        margin: 10mm;
+      }
+      .toolbar,
+      .page-label {
+        display: none;
+      }
+      table.print-table thead {
+        display: table-header-group;
+      }
+      table.print-table tr {
+        page-break-inside: avoid;
+      }
+    }
+"""
+
+
+def dataframe_content_hash(df, *extra):
+    digest = hashlib.sha1()
+    digest.update("\x1f".join(str(c) for c in df.columns).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    for part in extra:
+        digest.update(b"\x1e")
+        digest.update(str(part).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def page_count(total_rows, page_rows=DEFAULT_PAGE_ROWS):
+    page_rows = max(1, int(page_rows))
+    return max(1, -(-int(total_rows) // page_rows))
+
+
+def get_printable_html(df, title, page_rows=DEFAULT_PAGE_ROWS, page_index=None):
+    """HTML cacheado por contenido; page_index=None arma el documento completo."""
+    key = dataframe_content_hash(df, title, page_rows, page_index)
+    cached = _cache_get(_HTML_CACHE, key)
+    if cached is not None:
+        return cached
+    html_doc = build_printable_html(df, title, page_rows, page_index)
+    _cache_put(_HTML_CACHE, key, html_doc)
+    return html_doc
+
+
+def get_printable_pdf(df, title):
+    key = dataframe_content_hash(df, title, "pdf")
+    cached = _cache_get(_PDF_CACHE, key)
+    if cached is not None:
+        return cached
+    pdf_bytes = build_printable_pdf(df, title)
+    _cache_put(_PDF_CACHE, key, pdf_bytes)
+    return pdf_bytes
+
+
+def pdf_export_available():
+    return colors is not None
+
+
+def build_printable_html(df, title, page_rows=DEFAULT_PAGE_ROWS, page_index=None):
+    page_rows = max(1, int(page_rows))
+    total_pages = page_count(len(df), page_rows)
+    if page_index is None:
+        page_numbers = range(total_pages)
+    else:
+        page_numbers = [min(max(0, int(page_index)), total_pages - 1)]
+
+    colgroup_html = _build_colgroup(df.columns)
+    sections = []
+    for page_no in page_numbers:
+        chunk = df.iloc[page_no * page_rows : (page_no + 1) * page_rows]
+        table_html = chunk.to_html(index=False, escape=True, classes="print-table")
+        table_html = table_html.replace(">", ">" + colgroup_html, 1)
+        label = ""
+        if total_pages > 1:
+            label = (
+                f'<div class="page-label">Página {page_no + 1} de {total_pages}</div>'
+            )
+        sections.append(f'<section class="print-page">{label}{table_html}</section>')
+
+    # Paginado: el botón deja claro que window.print() solo imprime esta página.
+    print_label = "Imprimir"
+    if page_index is not None and total_pages > 1:
+        print_label = f"Imprimir página {page_numbers[0] + 1} de {total_pages}"
+
+    title_safe = html_escape(title)
+    return f"""
+    <!doctype html>
+    <html>
+    <head>
+      <meta charset="utf-8" />
+      <style>{_PRINT_CSS}</style>
+    </head>
+    <body>
+      <div class="toolbar">
+        <div class="title">{title_safe}</div>
+        <button onclick="window.print()">{print_label}</button>
+      </div>
+      {"".join(sections)}
+    </body>
+    </html>
+    """
+
+
+def build_printable_pdf(df, title):
+    if colors is None:
+        raise RuntimeError("reportlab no está instalado")
+
+    styles = getSampleStyleSheet()
+    cell_style = styles["BodyText"].clone("print_cell", fontSize=7, leading=8.5)
+    head_style = cell_style.clone("print_head", fontName="Helvetica-Bold")
+
+    columns = [str(c) for c in df.columns]
+    units = [_COLUMN_WIDTH_UNITS.get(c, 1) for c in columns]
+    page_size = landscape(A4)
+    usable_width = page_size[0] - 20 * mm
+    col_widths = [usable_width * u / float(sum(units)) for u in units]
+
+    data = [[Paragraph(html_escape(c), head_style) for c in columns]]
+    for row in df.itertuples(index=False, name=None):
+        data.append(
+            [Paragraph(html_escape(_pdf_cell_text(v)), cell_style) for v in row]
+        )
+
+    # LongTable reparte filas entre páginas y repite el encabezado.
+    table = LongTable(data, colWidths=col_widths, repeatRows=1)
+    table.setStyle(
+        TableStyle(
+            [
+                ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#d1d5db")),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f3f4f6")),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]
+        )
+    )
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=page_size,
+        leftMargin=10 * mm,
+        rightMargin=10 * mm,
+        topMargin=10 * mm,
+        bottomMargin=10 * mm,
+        title=title,
+    )
+    doc.build(
+        [Paragraph(html_escape(title), styles["Heading3"]), Spacer(1, 4 * mm), table]
+    )
+    return buffer.getvalue()
+
+
+def _pdf_cell_text(value):
+    if value is None:
+        return ""
+    try:
+        if pd.isna(value):
+            return ""
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def _build_colgroup(columns):
+    col_widths = []
+    for col in columns:
+        width_px = _BASE_COL_WIDTH_PX * _COLUMN_WIDTH_UNITS.get(col, 1)
+        col_widths.append(f'<col style="width:{width_px}px">')
+    return "<colgroup>" + "".join(col_widths) + "</colgroup>"
+
+
+def _cache_get(cache, key):
+    with _CACHE_LOCK:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_put(cache, key, value):
+    with _CACHE_LOCK:
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > _CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
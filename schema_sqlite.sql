@@ -58,6 +58,18 @@ CREATE TABLE IF NOT EXISTS Users (
     FOREIGN KEY (DivisionId) REFERENCES Divisiones (DivisionId)
 );
 
+CREATE TABLE IF NOT EXISTS MasterDataVersion (
+    Catalog TEXT PRIMARY KEY,
+    Version INTEGER NOT NULL DEFAULT 0,
+    UpdatedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Migraciones de datos ya aplicadas en esta base (una fila por migración).
+CREATE TABLE IF NOT EXISTS SchemaMigrations (
+    Name TEXT PRIMARY KEY,
+    AppliedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE IF NOT EXISTS Tickets (
     TicketId INTEGER PRIMARY KEY AUTOINCREMENT,
     Title TEXT NOT NULL,
@@ -99,10 +111,60 @@ CREATE TABLE IF NOT EXISTS TicketLogs (
     OldValue TEXT,
     NewValue TEXT,
     ChangedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    EventType TEXT,
+    OldId INTEGER,
+    NewId INTEGER,
     FOREIGN KEY (TicketId) REFERENCES Tickets (TicketId),
     FOREIGN KEY (UserId) REFERENCES Users (UserId)
 );
 
+CREATE TABLE IF NOT EXISTS TicketLogsArchive (
+    LogId INTEGER PRIMARY KEY,
+    TicketId INTEGER NOT NULL,
+    UserId INTEGER,
+    IsAi INTEGER NOT NULL DEFAULT 0,
+    FieldName TEXT NOT NULL,
+    OldValue TEXT,
+    NewValue TEXT,
+    ChangedAt TEXT NOT NULL,
+    EventType TEXT,
+    OldId INTEGER,
+    NewId INTEGER,
+    ArchivedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS TicketStateCheckpoints (
+    TicketId INTEGER NOT NULL,
+    LogId INTEGER NOT NULL,
+    AsOf TEXT NOT NULL,
+    State TEXT NOT NULL,
+    CreatedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (TicketId, LogId),
+    FOREIGN KEY (TicketId) REFERENCES Tickets (TicketId)
+);
+
+CREATE TABLE IF NOT EXISTS NotificationOutbox (
+    OutboxId INTEGER PRIMARY KEY AUTOINCREMENT,
+    TicketId INTEGER NOT NULL,
+    ActorUserId INTEGER,
+    RecipientUserId INTEGER,
+    DedupeKey TEXT NOT NULL UNIQUE,
+    Payload TEXT,
+    Status TEXT NOT NULL DEFAULT 'pending',
+    Attempts INTEGER NOT NULL DEFAULT 0,
+    NextAttemptAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    ClaimedAt TEXT,
+    SentAt TEXT,
+    LastError TEXT,
+    PrioridadId INTEGER,
+    PrioridadNivel INTEGER NOT NULL DEFAULT 99,
+    CreatedAt TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (TicketId) REFERENCES Tickets (TicketId),
+    FOREIGN KEY (ActorUserId) REFERENCES Users (UserId),
+    FOREIGN KEY (RecipientUserId) REFERENCES Users (UserId),
+    FOREIGN KEY (PrioridadId) REFERENCES Prioridades (PrioridadId)
+);
+
 CREATE TABLE IF NOT EXISTS Subtasks (
     SubtaskId INTEGER PRIMARY KEY AUTOINCREMENT,
     TicketId INTEGER NOT NULL,
@@ -128,4 +190,14 @@ CREATE INDEX IF NOT EXISTS IX_Tickets_Estado ON Tickets (EstadoId);
 CREATE INDEX IF NOT EXISTS IX_Tickets_Requester ON Tickets (RequesterId);
 CREATE INDEX IF NOT EXISTS IX_Tickets_Conversation ON Tickets (ConversationId);
 CREATE INDEX IF NOT EXISTS IX_TicketLogs_TicketId ON TicketLogs (TicketId, ChangedAt DESC);
+CREATE INDEX IF NOT EXISTS IX_TicketLogs_TicketLogId ON TicketLogs (TicketId, LogId DESC);
+CREATE INDEX IF NOT EXISTS IX_TicketLogs_EventType ON TicketLogs (EventType, ChangedAt);
+CREATE INDEX IF NOT EXISTS IX_TicketLogsArchive_TicketId ON TicketLogsArchive (TicketId, ChangedAt DESC);
+CREATE INDEX IF NOT EXISTS IX_TicketLogsArchive_TicketLogId ON TicketLogsArchive (TicketId, LogId DESC);
+CREATE INDEX IF NOT EXISTS IX_TicketStateCheckpoints_AsOf ON TicketStateCheckpoints (TicketId, AsOf);
+CREATE INDEX IF NOT EXISTS IX_NotificationOutbox_Pending ON NotificationOutbox (NextAttemptAt, OutboxId) WHERE Status = 'pending';
+CREATE INDEX IF NOT EXISTS IX_NotificationOutbox_PendingPriority ON NotificationOutbox (PrioridadNivel, NextAttemptAt, OutboxId) WHERE Status = 'pending';
+CREATE INDEX IF NOT EXISTS IX_NotificationOutbox_PendingRecipient ON NotificationOutbox (RecipientUserId) WHERE Status = 'pending';
+CREATE INDEX IF NOT EXISTS IX_NotificationOutbox_Processing ON NotificationOutbox (ClaimedAt) WHERE Status = 'processing';
+CREATE INDEX IF NOT EXISTS IX_NotificationOutbox_Dead ON NotificationOutbox (OutboxId) WHERE Status = 'dead';
 CREATE INDEX IF NOT EXISTS IX_Subtasks_TicketId_SortOrder ON Subtasks (TicketId, SortOrder, SubtaskId);
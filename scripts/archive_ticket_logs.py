@@ -0,0 +1,118 @@
+import argparse
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from db_adapter import DBAdapter  # noqa: E402
+from ticket_log_archive import ARCHIVE_TABLE, archive_ticket_logs  # noqa: E402
+
+try:
+    import tomllib  # Python 3.11+
+except ModuleNotFoundError:
+    tomllib = None
+
+
+def load_setting(name, default=None):
+    env_value = os.getenv(name)
+    if env_value:
+        return env_value
+
+    secrets_path = REPO_ROOT / ".streamlit" / "secrets.toml"
+    if secrets_path.exists() and tomllib is not None:
+        data = tomllib.loads(secrets_path.read_text(encoding="utf-8"))
+        if data.get(name) not in (None, ""):
+            return str(data[name])
+    return default
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Mueve a TicketLogsArchive los logs de tickets cerrados o archivados "
+            "hace más de N días, en lotes acotados."
+        )
+    )
+    parser.add_argument(
+        "--mode",
+        default=(load_setting("DB_MODE", "azure") or "azure").strip().lower(),
+        choices=["sqlite", "azure"],
+        help="Base de datos (default: DB_MODE).",
+    )
+    parser.add_argument(
+        "--sqlite",
+        default=load_setting("SQLITE_PATH", str(REPO_ROOT / "tickets_mvp.db")),
+        help="Archivo SQLite (modo sqlite).",
+    )
+    parser.add_argument(
+        "--schema",
+        default=load_setting("DB_SCHEMA", "gestar"),
+        help="Schema en Azure SQL (default: gestar).",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        default=180,
+        help="Antigüedad mínima del cierre del ticket, en días.",
+    )
+    parser.add_argument(
+        "--batch-tickets",
+        type=int,
+        default=50,
+        help="Tickets por lote; cada lote es una transacción.",
+    )
+    parser.add_argument(
+        "--max-batches",
+        type=int,
+        default=None,
+        help="Corta tras N lotes (para correr en ventanas acotadas).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Solo informa el primer lote sin mover filas.",
+    )
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    adapter = DBAdapter(
+        mode=args.mode,
+        schema=args.schema,
+        sqlite_path=args.sqlite,
+        odbc_conn_str=load_setting("ODBC_CONN_STR"),
+    )
+    conn = adapter.connect()
+    try:
+        if not adapter.table_exists(conn, ARCHIVE_TABLE):
+            raise RuntimeError(
+                f"No existe {ARCHIVE_TABLE}. Ejecuta primero el bootstrap del esquema "
+                "(SQLite) o info/create_ticket_logs_archive.sql (Azure)."
+            )
+        totals = archive_ticket_logs(
+            conn,
+            is_sqlite=adapter.is_sqlite,
+            logs_table=adapter.qname("TicketLogs"),
+            archive_table=adapter.qname(ARCHIVE_TABLE),
+            tickets_table=adapter.qname("Tickets"),
+            estados_table=adapter.qname("Estados"),
+            older_than_days=args.days,
+            batch_tickets=args.batch_tickets,
+            max_batches=args.max_batches,
+            dry_run=args.dry_run,
+        )
+    finally:
+        conn.close()
+
+    label = "A archivar (primer lote)" if args.dry_run else "Archivados"
+    print(
+        f"{label}: {totals['rows']} logs de {totals['tickets']} tickets "
+        f"en {totals['batches']} lotes."
+    )
+
+
+if __name__ == "__main__":
+    main()
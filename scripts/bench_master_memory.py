@@ -0,0 +1,234 @@
+import argparse
+import gc
+import json
+import pathlib
+import random
+import re
+import sys
+import tracemalloc
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from catalog_retrieval import LLM_CATALOGS, CatalogRetriever  # noqa: E402
+from display_resolver import build_label_maps  # noqa: E402
+from fuzzy_index import FuzzyIndex  # noqa: E402
+from master_catalog import (  # noqa: E402
+    CATALOG_RECORDS,
+    build_master_indexes,
+    build_mention_matcher,
+    llm_catalog_entries,
+    normalize_text,
+    user_fuzzy_keys,
+)
+from master_snapshot import freeze_master_data  # noqa: E402
+
+_NOMBRES = (
+    "juan maria jose ana carlos laura pablo lucia diego sofia martin paula "
+    "jorge valeria andres camila luis florencia pedro agustina"
+).split()
+_APELLIDOS = (
+    "perez gomez rodriguez fernandez lopez diaz martinez garcia sanchez romero "
+    "sosa torres alvarez ruiz ramirez flores benitez acosta medina herrera"
+).split()
+_ROLES = ("Solicitante", "Solicitante", "Solicitante", "Analista", "Jefe")
+
+
+def synthetic_rows(users, seed=7):
+    """Filas crudas (tuplas en el orden del SELECT) de un directorio sintético."""
+    rng = random.Random(seed)
+    divisiones = [(i, f"Division {i}") for i in range(1, 16)]
+    areas = [(i, f"Area {i}", rng.randint(1, 15)) for i in range(1, 301)]
+    subcats = [(i, f"Subcategoria {i}", rng.randint(1, 50)) for i in range(1, 401)]
+    usuarios = []
+    for i in range(1, users + 1):
+        username = f"{rng.choice(_APELLIDOS)}_{rng.choice(_NOMBRES)}{i}"
+        area_id = rng.choice((None, rng.randint(1, 300)))
+        division_id = rng.choice((None, None, rng.randint(1, 15)))
+        usuarios.append(
+            (
+                i,
+                username,
+                f"{username}@empresa.com.ar",
+                rng.choice(_ROLES),
+                area_id,
+                division_id,
+            )
+        )
+    return {
+        "plantas": [(i, f"Planta {i}") for i in range(1, 41)],
+        "divisiones": divisiones,
+        "areas": areas,
+        "categorias": [(i, f"Categoria {i}") for i in range(1, 51)],
+        "subcategorias": subcats,
+        "prioridades": [(1, "Crítica", 0), (2, "Alta", 1), (3, "Media", 2)],
+        "estados": [(i, f"Estado {i}") for i in range(1, 7)],
+        "usuarios": usuarios,
+    }
+
+
+def legacy_master_data(rows):
+    # Representación anterior: un dict por fila, cadenas sin internar.
+    return {
+        name: [dict(zip(CATALOG_RECORDS[name]._fields, row)) for row in items]
+        for name, items in rows.items()
+    }
+
+
+def legacy_master_indexes(master_data):
+    """Réplica de build_master_indexes previo: dicts por ID y un dict por usuario."""
+    indexes = {
+        "plantas_by_norm": {},
+        "divisiones_by_norm": {},
+        "areas_by_norm": {},
+        "categorias_by_norm": {},
+        "subcategorias_by_norm": {},
+        "prioridades_by_norm": {},
+        "usuarios_by_norm": {},
+        "usuarios_by_email_local": {},
+        "usuarios_by_token": {},
+        "areas_by_id": {},
+        "subcats_by_categoria_and_norm": {},
+        "user_to_area_division": {},
+        "labels_by_id": build_label_maps(master_data),
+    }
+    for name in ("plantas", "divisiones", "categorias", "prioridades"):
+        for row in master_data[name]:
+            indexes[f"{name}_by_norm"][normalize_text(row["nombre"])] = row
+    for a in master_data["areas"]:
+        indexes["areas_by_norm"][normalize_text(a["nombre"])] = a
+        indexes["areas_by_id"][a["id"]] = a
+    for s in master_data["subcategorias"]:
+        key = normalize_text(s["nombre"])
+        indexes["subcategorias_by_norm"].setdefault(key, []).append(s)
+        indexes["subcats_by_categoria_and_norm"][(s["categoria_id"], key)] = s
+    divisiones_by_id = {d["id"]: d for d in master_data["divisiones"]}
+    for u in master_data["usuarios"]:
+        norm_user = normalize_text(u["username"])
+        indexes["usuarios_by_norm"][norm_user] = u
+        email = normalize_text(u["email"])
+        indexes["usuarios_by_email_local"][email.split("@", 1)[0]] = u
+        for token in re.split(r"[_\s\.-]+", norm_user):
+            if token:
+                indexes["usuarios_by_token"].setdefault(token, []).append(u)
+        area = indexes["areas_by_id"].get(u["area_id"])
+        division = divisiones_by_id.get(u["division_id"]) or (
+            divisiones_by_id.get(area["division_id"]) if area else None
+        )
+        indexes["user_to_area_division"][norm_user] = {
+            "area_id": area["id"] if area else None,
+            "division_id": division["id"] if division else None,
+        }
+    return indexes
+
+
+def current_master_data(rows):
+    return {
+        name: [CATALOG_RECORDS[name](*row) for row in items]
+        for name, items in rows.items()
+    }
+
+
+def search_indexes(data, indexes):
+    """Copia de los índices *_fuzzy, mention_matcher y catalog_retriever."""
+    out = [build_mention_matcher(indexes)]
+    out.append(
+        CatalogRetriever(
+            {catalog: llm_catalog_entries(data, catalog) for catalog in LLM_CATALOGS}
+        )
+    )
+    for catalog in ("plantas", "areas", "categorias"):
+        out.append(FuzzyIndex(indexes[f"{catalog}_by_norm"].items()))
+    out.append(
+        FuzzyIndex(
+            (key, u)
+            for norm_user, u in indexes["usuarios_by_norm"].items()
+            for key in user_fuzzy_keys(norm_user)
+        )
+    )
+    return out
+
+
+def measure(build):
+    """(objeto, bytes asignados y retenidos por build())."""
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before
+
+
+def run(args):
+    # Las filas crudas simulan el resultado del driver y no se cuentan.
+    rows = synthetic_rows(args.users)
+    tracemalloc.start()
+
+    legacy_data, legacy_rows_bytes = measure(lambda: legacy_master_data(rows))
+    _legacy_idx, legacy_idx_bytes = measure(lambda: legacy_master_indexes(legacy_data))
+    legacy_copy = legacy_rows_bytes + legacy_idx_bytes
+
+    data, rows_bytes = measure(lambda: freeze_master_data(current_master_data(rows)))
+    indexes, idx_bytes = measure(lambda: build_master_indexes(data))
+    snapshot_bytes = rows_bytes + idx_bytes
+    # Índices de búsqueda (aproximada, menciones y candidatos del prompt) que la
+    # versión legacy no tenía: se miden armando una copia y se informan aparte.
+    _search, search_bytes = measure(lambda: search_indexes(data, indexes))
+
+    # Sesiones actuales: solo referencias al snapshot compartido.
+    sessions, sessions_bytes = measure(
+        lambda: [
+            {"master_data": data, "master_indexes": indexes, "master_data_version": 1}
+            for _ in range(args.sessions)
+        ]
+    )
+    tracemalloc.stop()
+    del sessions
+
+    mb = 1024 * 1024
+    per_session_now = sessions_bytes / max(1, args.sessions)
+    return {
+        "users": args.users,
+        "sessions": args.sessions,
+        "legacy_rows_mb": round(legacy_rows_bytes / mb, 2),
+        "legacy_indexes_mb": round(legacy_idx_bytes / mb, 2),
+        "records_rows_mb": round(rows_bytes / mb, 2),
+        "records_indexes_mb": round(idx_bytes / mb, 2),
+        "search_indexes_mb": round(search_bytes / mb, 2),
+        "copy_reduction_pct": round(
+            100 * (1 - (snapshot_bytes - search_bytes) / legacy_copy), 1
+        ),
+        # Antes cada sesión cargaba su propia copia de maestros.
+        "legacy_per_session_mb": round(legacy_copy / mb, 2),
+        "shared_per_session_kb": round(per_session_now / 1024, 2),
+        "legacy_process_mb": round(legacy_copy * args.sessions / mb, 2),
+        "shared_process_mb": round((snapshot_bytes + sessions_bytes) / mb, 2),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Memoria de datos maestros: filas dict + copia por sesión contra "
+            "filas compactas + snapshot compartido."
+        )
+    )
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument(
+        "--sessions", type=int, default=200, help="Sesiones abiertas simuladas."
+    )
+    parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f"{key:32s} {value}")
+
+
+if __name__ == "__main__":
+    main()
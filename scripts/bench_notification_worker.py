@@ -0,0 +1,320 @@
+import argparse
+import email
+import json
+import pathlib
+import re
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import notification_assignment as na  # noqa: E402
+from db_adapter import DBAdapter, apply_sqlite_schema  # noqa: E402
+
+_SUBJECT_RE = re.compile(r"^Subject: .*?#(\d+)", re.MULTILINE)
+_DIGEST_RE = re.compile(r"<td>#(\d+)</td>")
+
+
+def _read_sql_file(path):
+    text = path.read_text(encoding="utf-8")
+    return [chunk.strip() for chunk in text.split(";") if chunk.strip()]
+
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo en memoria: acepta todo y registra la hora de llegada."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, handshake_ms=0, message_ms=0):
+        super().__init__(("127.0.0.1", 0), _SmtpSinkHandler)
+        self.handshake_seconds = handshake_ms / 1000.0
+        self.message_seconds = message_ms / 1000.0
+        self.lock = threading.Lock()
+        self.delivered = {}  # TicketId -> hora de recepción
+        self.connections = 0
+        self.messages = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def record(self, data):
+        now = time.time()
+        message = email.message_from_string(data)
+        body = "".join(
+            part.get_payload(decode=True).decode("utf-8", "replace")
+            for part in message.walk()
+            if not part.is_multipart()
+        )
+        ticket_ids = _DIGEST_RE.findall(body) or _SUBJECT_RE.findall(data)
+        with self.lock:
+            self.messages += 1
+            for ticket_id in ticket_ids:
+                self.delivered.setdefault(int(ticket_id), now)
+
+
+class _SmtpSinkHandler(socketserver.StreamRequestHandler):
+    def _reply(self, line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.handshake_seconds:
+            time.sleep(server.handshake_seconds)
+        self._reply("220 bench-sink ESMTP")
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb in ("EHLO", "HELO"):
+                self._reply("250-bench-sink")
+                self._reply("250 AUTH PLAIN LOGIN")
+            elif verb == "AUTH":
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line.decode("utf-8", "replace"))
+                if server.message_seconds:
+                    time.sleep(server.message_seconds)
+                server.record("".join(lines))
+                self._reply("250 2.0.0 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self._reply("250 OK")
+
+
+def seed_database(db_path, recipients, tickets):
+    adapter = DBAdapter(mode="sqlite", sqlite_path=str(db_path))
+    conn = adapter.connect()
+    try:
+        apply_sqlite_schema(conn, _read_sql_file(REPO_ROOT / "schema_sqlite.sql"))
+        apply_sqlite_schema(conn, _read_sql_file(REPO_ROOT / "seed_sqlite.sql"))
+        cursor = conn.cursor()
+        user_ids = []
+        for i in range(recipients):
+            cursor.execute(
+                "INSERT INTO Users (Username, Email, Role, Active) VALUES (?, ?, ?, 1)",
+                (f"bench_{i}", f"bench_{i}@example.com", "Analista"),
+            )
+            user_ids.append(cursor.lastrowid)
+        cursor.executemany(
+            "INSERT INTO Tickets (Title, Description, RequesterId) VALUES (?, ?, ?)",
+            [(f"Bench {i}", "bench", user_ids[0]) for i in range(tickets)],
+        )
+        conn.commit()
+        cursor.execute("SELECT TicketId FROM Tickets WHERE Title LIKE 'Bench %'")
+        ticket_ids = [row[0] for row in cursor.fetchall()]
+        return adapter, user_ids, ticket_ids
+    finally:
+        conn.close()
+
+
+def enqueue(adapter, user_ids, ticket_ids, rate, digest_seconds, enqueued_at):
+    """Encola una notificación por ticket; rate=0 carga todo de una vez (backlog)."""
+    conn = adapter.connect()
+    try:
+        cursor = conn.cursor()
+        interval = 1.0 / rate if rate else 0.0
+        started = time.time()
+        for i, ticket_id in enumerate(ticket_ids):
+            if interval:
+                delay = started + i * interval - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            recipient_id = user_ids[i % len(user_ids)]
+            na.enqueue_assignment_notification(
+                cursor,
+                outbox_table="NotificationOutbox",
+                ticket_id=ticket_id,
+                actor_user_id=user_ids[0],
+                recipient_user_id=recipient_id,
+                dedupe_key=f"bench:{ticket_id}",
+                payload={
+                    "new_assignee_id": recipient_id,
+                    "title": f"Bench {ticket_id}",
+                    "estado": "Abierto",
+                    "assigned_by": "bench",
+                },
+                delay_seconds=digest_seconds,
+            )
+            if interval:
+                conn.commit()
+                enqueued_at[ticket_id] = time.time()
+                na.wake_assignment_notification_worker(delay_seconds=digest_seconds)
+        if not interval:
+            conn.commit()
+            now = time.time()
+            for ticket_id in ticket_ids:
+                enqueued_at[ticket_id] = now
+            na.wake_assignment_notification_worker(delay_seconds=digest_seconds)
+    finally:
+        conn.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run(args):
+    tmp_dir = tempfile.TemporaryDirectory(prefix="bench_notif_")
+    db_path = pathlib.Path(args.db or (pathlib.Path(tmp_dir.name) / "bench.db"))
+    if db_path.exists():
+        db_path.unlink()
+
+    adapter, user_ids, ticket_ids = seed_database(
+        db_path, args.recipients, args.messages
+    )
+
+    sink = SmtpSink(handshake_ms=args.handshake_ms, message_ms=args.message_ms)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+
+    statements = []
+    connections = [0]
+    stats_lock = threading.Lock()
+
+    def get_connection():
+        conn = adapter.connect()
+        with stats_lock:
+            connections[0] += 1
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    na.configure_assignment_notification_worker(
+        get_connection=get_connection,
+        get_schema=lambda: "",
+        app_url="http://bench.local",
+        poll_seconds=args.poll_seconds,
+        poll_max_seconds=args.poll_seconds,
+        smtp_concurrency=args.smtp_concurrency,
+        digest_window_seconds=args.digest_seconds,
+        smtp_config={
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": sink.port,
+            "SMTP_USER": "bench",
+            "SMTP_PASSWORD": "bench",
+            "SMTP_SENDER": "bench@example.com",
+            "SMTP_STARTTLS": "false",
+        },
+    )
+    na._RUNTIME["batch_size"] = args.batch_size
+    na.METRICS.reset()
+
+    enqueued_at = {}
+    started = time.time()
+    threads = na.start_worker_threads(args.workers, daemon=True)
+    enqueue(
+        adapter, user_ids, ticket_ids, args.rate, args.digest_seconds, enqueued_at
+    )
+
+    deadline = time.time() + args.timeout
+    while len(sink.delivered) < len(ticket_ids) and time.time() < deadline:
+        time.sleep(0.05)
+    elapsed = time.time() - started
+    na.stop_assignment_notification_worker()
+    for thread in threads:
+        thread.join(timeout=10)
+    na._shutdown_delivery()
+    sink.shutdown()
+
+    delivered = len(sink.delivered)
+    latencies = [
+        sink.delivered[tid] - enqueued_at[tid]
+        for tid in sink.delivered
+        if tid in enqueued_at
+    ]
+    # Las sentencias se cuentan solo en conexiones abiertas por el worker.
+    worker_statements = [s for s in statements if not s.upper().startswith("PRAGMA")]
+    report = {
+        "messages": len(ticket_ids),
+        "delivered": delivered,
+        "emails_sent": sink.messages,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_msgs_per_second": _ratio(delivered, elapsed),
+        "latency_p50_seconds": _round(percentile(latencies, 50)),
+        "latency_p95_seconds": _round(percentile(latencies, 95)),
+        "latency_max_seconds": _round(max(latencies) if latencies else None),
+        "db_statements_per_message": _ratio(len(worker_statements), delivered),
+        "db_connections_per_message": _ratio(connections[0], delivered),
+        "smtp_connections": sink.connections,
+        "worker": na.METRICS.snapshot()["counters"],
+    }
+    tmp_dir.cleanup()
+    return report
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+def _ratio(numerator, denominator):
+    return round(numerator / float(denominator), 3) if denominator else None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark del worker de notificaciones contra un SMTP local."
+    )
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--recipients", type=int, default=50)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0.0,
+        help="Mensajes/s encolados durante la prueba; 0 = backlog precargado.",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--smtp-concurrency", type=int, default=4)
+    parser.add_argument("--digest-seconds", type=int, default=0)
+    parser.add_argument("--poll-seconds", type=int, default=1)
+    parser.add_argument(
+        "--handshake-ms",
+        type=int,
+        default=0,
+        help="Demora simulada por conexión SMTP (TLS + login).",
+    )
+    parser.add_argument(
+        "--message-ms",
+        type=int,
+        default=0,
+        help="Demora simulada por mensaje en el servidor SMTP.",
+    )
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--db", default=None, help="SQLite a usar (se recrea).")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for key, value in report.items():
+        print(f"{key:32s} {value}")
+
+
+if __name__ == "__main__":
+    main()
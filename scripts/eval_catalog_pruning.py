@@ -0,0 +1,188 @@
+import argparse
+import json
+import pathlib
+import random
+import sys
+import time
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+from bench_master_memory import current_master_data, synthetic_rows  # noqa: E402
+from catalog_retrieval import (  # noqa: E402
+    LLM_CATALOG_FIELDS,
+    LLM_CATALOG_FULL_MAX,
+    LLM_CATALOG_TOP_K,
+    format_catalog_lines,
+)
+from master_catalog import (  # noqa: E402
+    build_master_indexes,
+    normalize_text,
+    records_from_dicts,
+)
+from master_snapshot import freeze_master_data  # noqa: E402
+
+_FIELD_CATALOG = {field: catalog for field, catalog, _label in LLM_CATALOG_FIELDS}
+_TEMPLATES = (
+    "No funciona la bomba del {area}, que lo vea {usuario}",
+    "Pedido de {subcategoria} para {area}. Responsable {usuario}",
+    "{usuario} tiene que revisar la falla de {subcategoria}",
+    "Se cortó la luz en {area}",
+)
+
+
+def _typo(text, rng):
+    # Dos letras invertidas en una palabra de 5 o más.
+    words = text.split(" ")
+    candidates = [i for i, word in enumerate(words) if len(word) >= 5]
+    if not candidates:
+        return text
+    i = rng.choice(candidates)
+    word = words[i]
+    j = rng.randrange(1, len(word) - 2)
+    words[i] = word[:j] + word[j + 1] + word[j] + word[j + 2 :]
+    return " ".join(words)
+
+
+def synthetic_cases(master_data, count, typo_rate, seed=11):
+    """Mensajes con entidades conocidas: {"mensaje": ..., "esperado": {...}}."""
+    rng = random.Random(seed)
+    areas = master_data["areas"]
+    subcats = master_data["subcategorias"]
+    users = master_data["usuarios"]
+    cases = []
+    for _ in range(count):
+        template = rng.choice(_TEMPLATES)
+        user = rng.choice(users)
+        values = {
+            "area": rng.choice(areas)["nombre"],
+            "subcategoria": rng.choice(subcats)["nombre"],
+            # Como lo escribe una persona: "juan perez" y no "perez_juan".
+            "usuario": " ".join(reversed(user["username"].split("_"))),
+        }
+        message = template.format(**values)
+        if rng.random() < typo_rate:
+            message = _typo(message, rng)
+        expected = {}
+        if "{area}" in template:
+            expected["area"] = values["area"]
+        if "{subcategoria}" in template:
+            expected["subcategoria"] = values["subcategoria"]
+        if "{usuario}" in template:
+            expected["usuario_sugerido"] = user["username"]
+        cases.append({"mensaje": message, "esperado": expected})
+    return cases
+
+
+def load_snapshot_master_data(path):
+    """master_data de una copia local (.cache/master_data.json) de la app."""
+    with open(path, "rb") as handle:
+        handle.readline()  # checksum
+        data = json.loads(handle.read().decode("utf-8"))
+    return records_from_dicts(data["master_data"])
+
+
+def load_cases(path):
+    with open(path, encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def evaluate(indexes, cases, top_k, full_max):
+    retriever = indexes["catalog_retriever"]
+    full = retriever.full()
+    full_chars = len(format_catalog_lines(full))
+    hits = {}
+    totals = {}
+    pruned_chars = 0
+    elapsed = 0.0
+    for case in cases:
+        start = time.perf_counter()
+        pruned = retriever.select(
+            normalize_text(case["mensaje"]), top_k=top_k, full_max=full_max
+        )
+        elapsed += time.perf_counter() - start
+        pruned_chars += len(format_catalog_lines(pruned))
+        for field, value in case.get("esperado", {}).items():
+            catalog = _FIELD_CATALOG[field]
+            norm = normalize_text(value)
+            totals[field] = totals.get(field, 0) + 1
+            # Antes: el valor está en el catálogo completo. Después: en el recorte.
+            if any(normalize_text(name) == norm for name in pruned[catalog]):
+                hits[field] = hits.get(field, 0) + 1
+
+    n = max(1, len(cases))
+    expected_total = sum(totals.values()) or 1
+    return {
+        "cases": len(cases),
+        "top_k": top_k,
+        "full_max": full_max,
+        "catalog_chars_before": full_chars,
+        "catalog_chars_after_avg": round(pruned_chars / n),
+        # ~4 caracteres por token en español.
+        "catalog_tokens_before": full_chars // 4,
+        "catalog_tokens_after_avg": round(pruned_chars / n / 4),
+        "prompt_reduction_pct": round(100 * (1 - pruned_chars / n / full_chars), 1)
+        if full_chars
+        else 0.0,
+        "recall_before": 1.0,
+        "recall_after": round(sum(hits.values()) / expected_total, 3),
+        "recall_after_by_field": {
+            field: round(hits.get(field, 0) / total, 3)
+            for field, total in sorted(totals.items())
+        },
+        "select_ms_avg": round(1000 * elapsed / n, 3),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Evalúa offline el recorte de catálogos del prompt de extracción: "
+            "tamaño de la sección de catálogos y si el valor esperado sigue "
+            "entre los candidatos (cota de la precisión de extracción)."
+        )
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Copia local de maestros de la app (.cache/master_data.json). "
+        "Sin esto se usa un directorio sintético.",
+    )
+    parser.add_argument("--users", type=int, default=2000, help="Usuarios sintéticos.")
+    parser.add_argument(
+        "--cases",
+        help='JSONL con {"mensaje": ..., "esperado": {"area": ..., ...}} por línea. '
+        "Sin esto se generan casos a partir de los maestros.",
+    )
+    parser.add_argument("--count", type=int, default=500, help="Casos sintéticos.")
+    parser.add_argument(
+        "--typo-rate", type=float, default=0.3, help="Casos sintéticos con errores."
+    )
+    parser.add_argument("--top-k", type=int, default=LLM_CATALOG_TOP_K)
+    parser.add_argument("--full-max", type=int, default=LLM_CATALOG_FULL_MAX)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON.")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.snapshot:
+        master_data = load_snapshot_master_data(args.snapshot)
+    else:
+        master_data = current_master_data(synthetic_rows(args.users))
+    master_data = freeze_master_data(master_data)
+    indexes = build_master_indexes(master_data)
+    if args.cases:
+        cases = load_cases(args.cases)
+    else:
+        cases = synthetic_cases(master_data, args.count, args.typo_rate)
+    report = evaluate(indexes, cases, args.top_k, args.full_max)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        return
+    for key, value in report.items():
+        print(f"{key:28s} {value}")
+
+
+if __name__ == "__main__":
+    main()
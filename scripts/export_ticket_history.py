@@ -0,0 +1,188 @@
+import argparse
+import csv
+import os
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from db_adapter import DBAdapter  # noqa: E402
+from display_resolver import format_plain_value  # noqa: E402
+from ticket_history import (  # noqa: E402
+    CHECKPOINT_TABLE,
+    TRACKED_FIELDS,
+    TicketHistory,
+    summarize_time_in_state,
+)
+from ticket_log_archive import ARCHIVE_TABLE  # noqa: E402
+
+try:
+    import tomllib  # Python 3.11+
+except ModuleNotFoundError:
+    tomllib = None
+
+
+def load_setting(name, default=None):
+    env_value = os.getenv(name)
+    if env_value:
+        return env_value
+
+    secrets_path = REPO_ROOT / ".streamlit" / "secrets.toml"
+    if secrets_path.exists() and tomllib is not None:
+        data = tomllib.loads(secrets_path.read_text(encoding="utf-8"))
+        if data.get(name) not in (None, ""):
+            return str(data[name])
+    return default
+
+
+def iter_ticket_id_pages(conn, adapter, ticket_ids=None, page_size=2000):
+    """Páginas de TicketId por cursor, para recorrer todos los tickets en lotes."""
+    if ticket_ids:
+        yield list(ticket_ids)
+        return
+    last_id = 0
+    cursor = conn.cursor()
+    while True:
+        if adapter.is_sqlite:
+            sql = (
+                f"SELECT TicketId FROM {adapter.qname('Tickets')} "
+                "WHERE TicketId > ? ORDER BY TicketId LIMIT ?"
+            )
+            params = (last_id, page_size)
+        else:
+            sql = (
+                f"SELECT TOP (?) TicketId FROM {adapter.qname('Tickets')} "
+                "WHERE TicketId > ? ORDER BY TicketId"
+            )
+            params = (page_size, last_id)
+        cursor.execute(sql, params)
+        page = [row[0] for row in cursor.fetchall()]
+        if not page:
+            return
+        yield page
+        last_id = page[-1]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Historial de tickets: checkpoints de estado y tiempo por estado."
+    )
+    parser.add_argument(
+        "command",
+        choices=["checkpoints", "time-in-state", "state-at"],
+        help=(
+            "checkpoints: escribe checkpoints pendientes; time-in-state: exporta "
+            "tramos a CSV; state-at: muestra el estado de un ticket en una fecha."
+        ),
+    )
+    parser.add_argument(
+        "--mode",
+        default=(load_setting("DB_MODE", "azure") or "azure").strip().lower(),
+        choices=["sqlite", "azure"],
+    )
+    parser.add_argument(
+        "--sqlite",
+        default=load_setting("SQLITE_PATH", str(REPO_ROOT / "tickets_mvp.db")),
+    )
+    parser.add_argument("--schema", default=load_setting("DB_SCHEMA", "gestar"))
+    parser.add_argument("--ticket", type=int, action="append", dest="tickets")
+    parser.add_argument(
+        "--every", type=int, default=50, help="Cambios entre checkpoints."
+    )
+    parser.add_argument(
+        "--field",
+        default="Estado",
+        choices=list(TRACKED_FIELDS),
+        help="Campo para time-in-state.",
+    )
+    parser.add_argument("--until", default=None, help="Fin de los tramos abiertos.")
+    parser.add_argument("--at", default=None, help="Fecha para state-at.")
+    parser.add_argument(
+        "--summary",
+        action="store_true",
+        help="time-in-state: totales por ticket y valor en lugar de tramos.",
+    )
+    parser.add_argument("--out", default="-", help="CSV de salida (default: stdout).")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    adapter = DBAdapter(
+        mode=args.mode,
+        schema=args.schema,
+        sqlite_path=args.sqlite,
+        odbc_conn_str=load_setting("ODBC_CONN_STR"),
+    )
+    conn = adapter.connect()
+    try:
+        archive_table = None
+        if adapter.table_exists(conn, ARCHIVE_TABLE):
+            archive_table = adapter.qname(ARCHIVE_TABLE)
+        history = TicketHistory(adapter, archive_table=archive_table)
+
+        if args.command == "state-at":
+            if not args.tickets or not args.at:
+                raise SystemExit("state-at requiere --ticket y --at.")
+            state = history.state_at(conn, args.tickets[0], args.at)
+            if state is None:
+                print("El ticket no existía en esa fecha.")
+                return
+            for field, value in state.items():
+                print(f"{field:14s} {value}")
+            return
+
+        if args.command == "checkpoints":
+            if not adapter.table_exists(conn, CHECKPOINT_TABLE):
+                raise RuntimeError(
+                    f"No existe {CHECKPOINT_TABLE}. Ejecuta el bootstrap del esquema "
+                    "(SQLite) o info/create_ticket_state_checkpoints.sql (Azure)."
+                )
+            written = 0
+            for page in iter_ticket_id_pages(conn, adapter, args.tickets):
+                written += history.write_checkpoints(conn, page, every=args.every)
+                conn.commit()
+            print(f"Checkpoints escritos: {written}")
+            return
+
+        out = sys.stdout if args.out == "-" else open(
+            args.out, "w", encoding="utf-8", newline=""
+        )
+        try:
+            writer = csv.writer(out)
+            if args.summary:
+                writer.writerow(["TicketId", args.field, "Seconds"])
+            else:
+                writer.writerow(
+                    ["TicketId", args.field, "EnteredAt", "LeftAt", "Seconds"]
+                )
+            for page in iter_ticket_id_pages(conn, adapter, args.tickets):
+                segments = history.time_in_state(
+                    conn, page, field=args.field, until=args.until
+                )
+                if args.summary:
+                    totals = summarize_time_in_state(segments, field=args.field)
+                    for ticket_id, per_value in totals.items():
+                        for value, seconds in per_value.items():
+                            writer.writerow([ticket_id, value, seconds])
+                    continue
+                for seg in segments:
+                    writer.writerow(
+                        [
+                            seg["TicketId"],
+                            seg[args.field],
+                            format_plain_value(seg["EnteredAt"]),
+                            format_plain_value(seg["LeftAt"]),
+                            seg["Seconds"],
+                        ]
+                    )
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
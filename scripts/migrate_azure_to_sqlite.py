@@ -22,8 +22,12 @@ TABLE_ORDER = [
     "Prioridades",
     "Estados",
     "Users",
+    "MasterDataVersion",
     "Tickets",
     "TicketLogs",
+    "TicketLogsArchive",
+    "TicketStateCheckpoints",
+    "NotificationOutbox",
     "Subtasks",
 ]
 
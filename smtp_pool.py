@@ -0,0 +1,126 @@
+import smtplib
+import threading
+import time
+
+# Errores de transporte: la sesión quedó inutilizable y vale reconectar.
+_RECONNECT_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    smtplib.SMTPHeloError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+class SmtpTransportPool:
+    """Sesiones SMTP autenticadas que se reutilizan entre envíos."""
+
+    def __init__(
+        self,
+        host,
+        port,
+        user,
+        password,
+        max_sessions=4,
+        idle_seconds=30,
+        timeout=30,
+        use_starttls=True,
+        smtp_factory=smtplib.SMTP,
+    ):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.max_sessions = max(1, int(max_sessions))
+        self.idle_seconds = max(1, int(idle_seconds))
+        self.timeout = timeout
+        self.use_starttls = use_starttls
+        self._smtp_factory = smtp_factory
+        self._slots = threading.BoundedSemaphore(self.max_sessions)
+        self._lock = threading.Lock()
+        self._idle = []  # [(server, last_used)]
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def send(self, sender, recipients, message):
+        """Envía un mensaje ya serializado; reconecta una vez si la sesión cayó."""
+        with self._slots:
+            server = self._checkout()
+            try:
+                server.sendmail(sender, recipients, message)
+            except _RECONNECT_ERRORS:
+                self._discard(server)
+                server = self._open()
+                try:
+                    server.sendmail(sender, recipients, message)
+                except Exception:
+                    self._discard(server)
+                    raise
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # Error del destinatario/mensaje: la sesión sigue sana.
+                self._checkin(server)
+                raise
+            except Exception:
+                self._discard(server)
+                raise
+            self._checkin(server)
+            with self._lock:
+                self.messages_sent += 1
+
+    def prune_idle(self):
+        """Cierra sesiones ociosas más viejas que idle_seconds."""
+        now = time.monotonic()
+        with self._lock:
+            keep = [(s, t) for s, t in self._idle if now - t < self.idle_seconds]
+            stale = [s for s, t in self._idle if now - t >= self.idle_seconds]
+            self._idle = keep
+        for server in stale:
+            self._discard(server)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _last_used in idle:
+            self._discard(server)
+
+    def _checkout(self):
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, last_used = self._idle.pop()
+            if now - last_used < self.idle_seconds:
+                return server
+            self._discard(server)
+        return self._open()
+
+    def _checkin(self, server):
+        with self._lock:
+            self._idle.append((server, time.monotonic()))
+
+    def _open(self):
+        server = self._smtp_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_starttls:
+                server.starttls()
+                server.ehlo()
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            self._discard(server)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _discard(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
@@ -0,0 +1,99 @@
+import pathlib
+
+from audit_events import (
+    EVENT_ASSIGNMENT,
+    EVENT_FIELD_CHANGE,
+    EVENT_STATUS_CHANGE,
+    insert_field_change_logs,
+    legacy_event_type_sql,
+)
+from db_adapter import DBAdapter, apply_sqlite_schema
+from display_resolver import DisplayValueResolver, build_label_maps
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def _read_statements(name):
+    text = (REPO_ROOT / name).read_text(encoding="utf-8")
+    return [chunk.strip() for chunk in text.split(";") if chunk.strip()]
+
+
+def _bootstrap(tmp_path):
+    adapter = DBAdapter(mode="sqlite", sqlite_path=str(tmp_path / "audit.db"))
+    conn = adapter.connect()
+    apply_sqlite_schema(conn, _read_statements("schema_sqlite.sql"))
+    apply_sqlite_schema(conn, _read_statements("seed_sqlite.sql"))
+    conn.commit()
+    master_data = {
+        "estados": [
+            {"id": r[0], "nombre": r[1]}
+            for r in conn.execute("SELECT EstadoId, Nombre FROM Estados")
+        ],
+        "usuarios": [
+            {"id": r[0], "username": r[1]}
+            for r in conn.execute("SELECT UserId, Username FROM Users WHERE Active = 1")
+        ],
+    }
+    resolver = DisplayValueResolver(build_label_maps(master_data), adapter)
+    return conn, master_data, resolver
+
+
+def test_field_change_logs_write_one_typed_insert_per_change(tmp_path):
+    conn, master_data, resolver = _bootstrap(tmp_path)
+    try:
+        admin_id = master_data["usuarios"][0]["id"]
+        estado_ids = [e["id"] for e in master_data["estados"]]
+        ticket_id = conn.execute(
+            "INSERT INTO Tickets (Title, Description, RequesterId, EstadoId) "
+            "VALUES ('viejo', 'desc', ?, ?)",
+            (admin_id, estado_ids[0]),
+        ).lastrowid
+        conn.commit()
+        changes = [
+            ("EstadoId", estado_ids[0], estado_ids[1]),
+            ("AssigneeId", None, admin_id),
+            ("Title", "viejo", "nuevo"),
+        ]
+        statements = []
+        conn.set_trace_callback(statements.append)
+
+        insert_field_change_logs(
+            conn.cursor(), "TicketLogs", ticket_id, admin_id, changes, resolver
+        )
+        conn.set_trace_callback(None)
+
+        # Solo los INSERT del log: ninguna consulta de catálogos por campo.
+        queries = [sql for sql in statements if sql.strip() != "BEGIN"]
+        assert len(queries) == len(changes)
+        assert all(sql.lstrip().startswith("INSERT") for sql in queries)
+        rows = conn.execute(
+            "SELECT FieldName, OldValue, NewValue, EventType, OldId, NewId "
+            "FROM TicketLogs WHERE TicketId = ? ORDER BY LogId",
+            (ticket_id,),
+        ).fetchall()
+        assert rows == [
+            (
+                "Estado",
+                "Abierto",
+                "En Progreso",
+                EVENT_STATUS_CHANGE,
+                estado_ids[0],
+                estado_ids[1],
+            ),
+            ("Assignee", None, "gauto_pablo", EVENT_ASSIGNMENT, None, admin_id),
+            ("Title", "viejo", "nuevo", EVENT_FIELD_CHANGE, None, None),
+        ]
+    finally:
+        conn.close()
+
+
+def test_azure_backfill_case_matches_legacy_mapping():
+    script = (REPO_ROOT / "info" / "add_ticket_logs_event_types.sql").read_text(
+        encoding="utf-8"
+    )
+    # El CASE del script va dentro de SQL dinámico, con las comillas duplicadas.
+    start = script.index("CASE\n", script.index("SET EventType ="))
+    end = script.index("WHERE LogId", start)
+    script_case = " ".join(script[start:end].replace("''", "'").split())
+
+    assert script_case == " ".join(legacy_event_type_sql().split())
@@ -0,0 +1,135 @@
+import pathlib
+
+from db_adapter import DBAdapter, apply_sqlite_schema
+from display_resolver import DisplayValueResolver, build_label_maps
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def _read_statements(name):
+    text = (REPO_ROOT / name).read_text(encoding="utf-8")
+    return [chunk.strip() for chunk in text.split(";") if chunk.strip()]
+
+
+def _bootstrap(tmp_path):
+    adapter = DBAdapter(mode="sqlite", sqlite_path=str(tmp_path / "resolver.db"))
+    conn = adapter.connect()
+    apply_sqlite_schema(conn, _read_statements("schema_sqlite.sql"))
+    apply_sqlite_schema(conn, _read_statements("seed_sqlite.sql"))
+    conn.execute(
+        "INSERT INTO Users (Username, Email, Role, Active) VALUES (?, ?, ?, 0)",
+        ("baja_usuario", "baja@taranto.com.ar", "Analista"),
+    )
+    conn.commit()
+    return adapter, conn
+
+
+def _master_data(conn):
+    cursor = conn.cursor()
+    estados = cursor.execute("SELECT EstadoId, Nombre FROM Estados").fetchall()
+    prioridades = cursor.execute(
+        "SELECT PrioridadId, Nombre, Nivel FROM Prioridades"
+    ).fetchall()
+    usuarios = cursor.execute(
+        "SELECT UserId, Username FROM Users WHERE Active = 1"
+    ).fetchall()
+    return {
+        "estados": [{"id": r[0], "nombre": r[1]} for r in estados],
+        "prioridades": [
+            {"id": r[0], "nombre": r[1], "nivel": r[2]} for r in prioridades
+        ],
+        "usuarios": [{"id": r[0], "username": r[1]} for r in usuarios],
+    }
+
+
+def test_update_logging_issues_no_lookup_queries(tmp_path):
+    adapter, conn = _bootstrap(tmp_path)
+    try:
+        master_data = _master_data(conn)
+        resolver = DisplayValueResolver(build_label_maps(master_data), adapter)
+        statements = []
+        conn.set_trace_callback(statements.append)
+        cursor = conn.cursor()
+
+        admin_id = master_data["usuarios"][0]["id"]
+        estado_ids = [e["id"] for e in master_data["estados"]]
+        prio_ids = [p["id"] for p in master_data["prioridades"]]
+        # Mismo patrón que update_ticket_from_form: valor anterior y nuevo por campo.
+        changes = [
+            ("EstadoId", estado_ids[0], estado_ids[1]),
+            ("PrioridadId", prio_ids[2], prio_ids[0]),
+            ("AssigneeId", None, admin_id),
+            ("Title", "viejo", "nuevo"),
+        ]
+        displayed = [
+            (
+                resolver.display_value(cursor, field, old),
+                resolver.display_value(cursor, field, new),
+            )
+            for field, old, new in changes
+        ]
+        actor = resolver.label(cursor, "Users", admin_id)
+
+        assert statements == []
+        assert displayed[0] == ("Abierto", "En Progreso")
+        assert displayed[2] == (None, "gauto_pablo")
+        assert displayed[3] == ("viejo", "nuevo")
+        assert actor == "gauto_pablo"
+    finally:
+        conn.close()
+
+
+def test_cache_miss_falls_back_to_database_once(tmp_path):
+    adapter, conn = _bootstrap(tmp_path)
+    try:
+        resolver = DisplayValueResolver(build_label_maps(_master_data(conn)), adapter)
+        inactive_id = conn.execute(
+            "SELECT UserId FROM Users WHERE Username = 'baja_usuario'"
+        ).fetchone()[0]
+        statements = []
+        conn.set_trace_callback(statements.append)
+        cursor = conn.cursor()
+
+        first = resolver.display_value(cursor, "AssigneeId", inactive_id)
+        second = resolver.display_value(cursor, "AssigneeId", inactive_id)
+        missing = resolver.display_value(cursor, "EstadoId", 999)
+        resolver.display_value(cursor, "EstadoId", 999)
+
+        assert first == second == "baja_usuario"
+        assert missing == "999"
+        assert len(statements) == 2
+        assert resolver.misses == 2
+    finally:
+        conn.close()
+
+
+def test_display_changes_label_an_update_without_queries(tmp_path):
+    adapter, conn = _bootstrap(tmp_path)
+    try:
+        master_data = _master_data(conn)
+        resolver = DisplayValueResolver(build_label_maps(master_data), adapter)
+        admin_id = master_data["usuarios"][0]["id"]
+        estado_ids = [e["id"] for e in master_data["estados"]]
+        # Lo que arma update_ticket_from_form antes de escribir TicketLogs.
+        changes = [
+            ("EstadoId", estado_ids[0], estado_ids[1]),
+            ("AssigneeId", None, admin_id),
+            ("Title", "viejo", "nuevo"),
+            ("PlantaId", None, 999),
+        ]
+        statements = []
+        conn.set_trace_callback(statements.append)
+
+        labels = resolver.display_changes(conn.cursor(), changes)
+        conn.set_trace_callback(None)
+
+        # Solo el ID inexistente consulta la base, y una sola vez.
+        assert len(statements) == 1
+        assert labels == [
+            ("Abierto", "En Progreso"),
+            (None, "gauto_pablo"),
+            ("viejo", "nuevo"),
+            (None, "999"),
+        ]
+    finally:
+        conn.close()
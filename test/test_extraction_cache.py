@@ -0,0 +1,62 @@
+import sqlite3
+import threading
+from contextlib import closing
+
+import extraction_cache
+from extraction_cache import ExtractionCache
+
+
+def _file_rows(path):
+    with closing(sqlite3.connect(path)) as conn:
+        return conn.execute("SELECT COUNT(1) FROM ExtractionCache").fetchone()[0]
+
+
+def test_file_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ExtractionCache(max_entries=4, path=path).put("k", {"a": 1}, 250)
+
+    cache = ExtractionCache(max_entries=4, path=path)
+
+    assert cache.get("k") == ({"a": 1}, 250.0)
+    assert cache.stats()["hits"] == 1
+
+
+def test_prune_caps_file_to_max_entries(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction_cache, "_PRUNE_EVERY", 5)
+    path = str(tmp_path / "cache.db")
+    cache = ExtractionCache(max_entries=3, path=path)
+
+    for i in range(10):
+        cache.put(f"k{i}", {"i": i}, 1)
+
+    assert _file_rows(path) == 3
+    assert ExtractionCache(max_entries=3, path=path).get("k9") == ({"i": 9}, 1.0)
+
+
+def test_file_io_runs_outside_lock(tmp_path, monkeypatch):
+    cache = ExtractionCache(max_entries=4, path=str(tmp_path / "cache.db"))
+    cache.put("memoria", {"ok": True}, 1)
+    cache._entries.clear()
+    loading = threading.Event()
+    release = threading.Event()
+    original_load = cache._load
+
+    def slow_load(path, key, now):
+        loading.set()
+        release.wait(5)
+        return original_load(path, key, now)
+
+    monkeypatch.setattr(cache, "_load", slow_load)
+    reader = threading.Thread(target=cache.get, args=("memoria",))
+    reader.start()
+    assert loading.wait(5)
+
+    # Con el archivo ocupado, el lock sigue libre para otros hilos.
+    assert cache._lock.acquire(timeout=1)
+    cache._lock.release()
+    cache.put("otra", {"ok": False}, 1)
+    release.set()
+    reader.join(5)
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,112 @@
+from fuzzy_index import FUZZY_ACCEPT_SCORE, FuzzyIndex, edit_similarity, pick_fuzzy
+from master_catalog import (
+    build_master_indexes,
+    records_from_dicts,
+    resolve_catalog_candidate,
+    resolve_user_candidate,
+)
+
+
+def _indexes():
+    master_data = records_from_dicts(
+        {
+            "plantas": [
+                {"id": 1, "nombre": "Planta Norte"},
+                {"id": 2, "nombre": "Planta Sur"},
+            ],
+            "areas": [
+                {"id": 10, "nombre": "Calidad", "division_id": None},
+                {"id": 11, "nombre": "Mantenimiento", "division_id": None},
+            ],
+            "categorias": [{"id": 20, "nombre": "Hardware"}],
+            "usuarios": [
+                {"id": 100, "username": "perez_juan", "email": "jperez@x.com"},
+                {"id": 101, "username": "perez_juana", "email": "juana@x.com"},
+                {"id": 102, "username": "firmapaz_alfredo", "email": "af@x.com"},
+            ],
+        }
+    )
+    return build_master_indexes(master_data)
+
+
+def test_search_tolerates_typos_and_transpositions():
+    index = FuzzyIndex([("calidad", "A"), ("mantenimiento", "B"), ("compras", "C")])
+
+    assert index.search("calidda", limit=1)[0][0] == "A"
+    assert index.search("mantenimeinto", limit=1)[0][0] == "B"
+    assert index.search("zzzz") == []
+    assert edit_similarity("calidad", "calidda") > FUZZY_ACCEPT_SCORE
+
+
+def test_search_returns_each_item_once():
+    item = object()
+    index = FuzzyIndex([("perez juan", item), ("juan perez", item)])
+
+    hits = index.search("juan perez")
+
+    assert hits == [(item, 1.0)]
+
+
+def test_pick_fuzzy_rejects_close_runner_up():
+    index = FuzzyIndex([("planta norte", "N"), ("planta nortes", "NS")])
+
+    picked, hits = pick_fuzzy(index, "planta nortez")
+
+    assert picked is None
+    assert {item for item, _score in hits} == {"N", "NS"}
+
+
+def test_pick_fuzzy_accepts_identical_key_despite_runner_up():
+    index = _indexes()["usuarios_fuzzy"]
+
+    picked, hits = pick_fuzzy(index, "juan perez")
+
+    assert picked["username"] == "perez_juan"
+    assert hits[1][1] > hits[0][1] - 0.1
+
+
+def test_resolve_user_exact_tiers_have_no_warning():
+    indexes = _indexes()
+
+    assert resolve_user_candidate("perez_juan", indexes)[0]["id"] == 100
+    assert resolve_user_candidate("jperez", indexes) == (
+        indexes["usuarios_by_norm"]["perez_juan"],
+        None,
+    )
+    assert resolve_user_candidate("Alfredo", indexes)[0]["id"] == 102
+    assert resolve_user_candidate("Juan Perez", indexes) == (
+        indexes["usuarios_by_norm"]["perez_juan"],
+        None,
+    )
+
+
+def test_resolve_user_fuzzy_tier_warns():
+    indexes = _indexes()
+
+    user, warning = resolve_user_candidate("Perez Juan", indexes)
+    typo_user, typo_warning = resolve_user_candidate("firmapas alfredo", indexes)
+
+    assert user["id"] == 100
+    assert warning == "Usuario 'Perez Juan' interpretado como 'perez_juan'."
+    assert typo_user["id"] == 102
+    assert "interpretado como 'firmapaz_alfredo'" in typo_warning
+
+
+def test_resolve_user_reports_ambiguity():
+    user, warning = resolve_user_candidate("perez", _indexes())
+
+    assert user is None
+    assert warning.startswith("Usuario ambiguo 'perez'")
+
+
+def test_resolve_catalog_exact_then_fuzzy():
+    indexes = _indexes()
+
+    exact = resolve_catalog_candidate("planta norte", indexes, "plantas", "Planta")
+    fuzzy = resolve_catalog_candidate("Calida", indexes, "areas", "Área")
+    missing = resolve_catalog_candidate("Logística", indexes, "areas", "Área")
+
+    assert exact == (indexes["plantas_by_norm"]["planta norte"], None)
+    assert fuzzy[0]["id"] == 10
+    assert fuzzy[1] == "Área 'Calida' interpretada como 'Calidad'."
+    assert missing == (None, None)
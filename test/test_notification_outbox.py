@@ -0,0 +1,201 @@
+import pathlib
+import sqlite3
+
+import notification_assignment as na
+from db_adapter import DBAdapter, apply_sqlite_schema
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def _read_statements(name):
+    text = (REPO_ROOT / name).read_text(encoding="utf-8")
+    return [chunk.strip() for chunk in text.split(";") if chunk.strip()]
+
+
+def _bootstrap(tmp_path):
+    adapter = DBAdapter(mode="sqlite", sqlite_path=str(tmp_path / "outbox.db"))
+    conn = adapter.connect()
+    apply_sqlite_schema(conn, _read_statements("schema_sqlite.sql"))
+    apply_sqlite_schema(conn, _read_statements("seed_sqlite.sql"))
+    user_id = conn.execute("SELECT MIN(UserId) FROM Users").fetchone()[0]
+    ticket_id = conn.execute(
+        "INSERT INTO Tickets (Title, Description, RequesterId) VALUES ('t', 'd', ?)",
+        (user_id,),
+    ).lastrowid
+    conn.commit()
+    conn.close()
+    na.configure_assignment_notification_worker(
+        adapter.connect, lambda: "", "http://localhost"
+    )
+    return adapter, user_id, ticket_id
+
+
+def _enqueue(adapter, ticket_id, user_id, key, level=None, delay=0):
+    conn = adapter.connect()
+    try:
+        na.enqueue_assignment_notification(
+            conn.cursor(),
+            na.OUTBOX_TABLE,
+            ticket_id=ticket_id,
+            actor_user_id=user_id,
+            recipient_user_id=user_id,
+            dedupe_key=key,
+            payload={"ticket_id": ticket_id, "new_assignee_id": user_id},
+            delay_seconds=delay,
+            priority_level=level,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_claim_uses_priority_index(tmp_path):
+    adapter, user_id, ticket_id = _bootstrap(tmp_path)
+    _enqueue(adapter, ticket_id, user_id, "k1", level=1)
+    statements = []
+    connect = adapter.connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    na._RUNTIME["get_connection"] = traced_connect
+    na._claim_pending_batch(5)
+    claim_sql = next(sql for sql in statements if "RETURNING" in sql)
+
+    # Dentro del CTE, sin el hint INDEXED BY se usa IX_..._Pending y un sort aparte.
+    conn = sqlite3.connect(adapter.sqlite_path)
+    try:
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {claim_sql}")]
+    finally:
+        conn.close()
+    assert any(
+        "USING INDEX IX_NotificationOutbox_PendingPriority" in step for step in plan
+    )
+
+
+def _outbox_rows(adapter):
+    conn = adapter.connect()
+    try:
+        return {
+            row[0]: row[1:]
+            for row in conn.execute(
+                "SELECT DedupeKey, Status, Attempts, LastError, "
+                "NextAttemptAt > CURRENT_TIMESTAMP FROM NotificationOutbox"
+            )
+        }
+    finally:
+        conn.close()
+
+
+def _set_next_attempt(adapter, key, offset_seconds):
+    conn = adapter.connect()
+    try:
+        conn.execute(
+            "UPDATE NotificationOutbox "
+            "SET NextAttemptAt = datetime('now', ? || ' seconds') WHERE DedupeKey = ?",
+            (str(offset_seconds), key),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def test_claim_orders_by_priority_and_skips_held_rows(tmp_path):
+    adapter, user_id, ticket_id = _bootstrap(tmp_path)
+    _enqueue(adapter, ticket_id, user_id, "baja", level=2)
+    _enqueue(adapter, ticket_id, user_id, "urgente", level=0)
+    _enqueue(adapter, ticket_id, user_id, "media", level=1)
+    _enqueue(adapter, ticket_id, user_id, "retenida", level=0, delay=60)
+
+    first = na._claim_pending_batch(2)
+    rest = na._claim_pending_batch(5)
+
+    assert [item.dedupe_key for item in first] == ["urgente", "media"]
+    assert [item.dedupe_key for item in rest] == ["baja"]
+    assert _outbox_rows(adapter)["retenida"][0] == "pending"
+
+
+def test_aged_rows_are_claimed_before_higher_priorities(tmp_path):
+    adapter, user_id, ticket_id = _bootstrap(tmp_path)
+    _enqueue(adapter, ticket_id, user_id, "vieja", level=5)
+    _enqueue(adapter, ticket_id, user_id, "urgente", level=0)
+    max_wait = na._RUNTIME["priority_max_wait_seconds"]
+    _set_next_attempt(adapter, "vieja", -(max_wait + 60))
+
+    claimed = na._claim_pending_batch(1)
+
+    assert [item.dedupe_key for item in claimed] == ["vieja"]
+
+
+def test_failures_back_off_then_dead_letter(tmp_path):
+    adapter, user_id, ticket_id = _bootstrap(tmp_path)
+    na._RUNTIME["max_attempts"] = 2
+    _enqueue(adapter, ticket_id, user_id, "k1")
+
+    (item,) = na._claim_pending_batch(5)
+    na._record_delivery_results([(item, "ERROR:timeout")])
+    status, attempts, error, held = _outbox_rows(adapter)["k1"]
+    assert (status, attempts, error, held) == ("pending", 1, "ERROR:timeout", 1)
+    assert na._claim_pending_batch(5) == []
+
+    _set_next_attempt(adapter, "k1", -1)
+    (item,) = na._claim_pending_batch(5)
+    na._record_delivery_results([(item, "ERROR:timeout")])
+    assert _outbox_rows(adapter)["k1"][:2] == ("dead", 2)
+
+    conn = adapter.connect()
+    try:
+        assert na.redrive_dead_letters(conn, na.OUTBOX_TABLE) == 1
+        conn.commit()
+    finally:
+        conn.close()
+    assert _outbox_rows(adapter)["k1"][:2] == ("pending", 0)
+
+
+def test_permanent_errors_skip_retries(tmp_path):
+    adapter, user_id, ticket_id = _bootstrap(tmp_path)
+    _enqueue(adapter, ticket_id, user_id, "k1")
+
+    (item,) = na._claim_pending_batch(5)
+    na._record_delivery_results([(item, "ERROR:assignee_without_email")])
+
+    assert _outbox_rows(adapter)["k1"][:2] == ("dead", 1)
+
+
+def test_retry_delay_grows_exponentially_with_cap():
+    assert na.compute_retry_delay(1, 30, 3600, rand=lambda: 0.0) == 15
+    assert na.compute_retry_delay(3, 30, 3600, rand=lambda: 1.0) == 120
+    assert na.compute_retry_delay(20, 30, 3600, rand=lambda: 1.0) == 3600
+
+
+def test_worker_settings_read_notif_values_from_secrets(monkeypatch):
+    for name, _param, _default in na.WORKER_SETTINGS:
+        monkeypatch.delenv(name, raising=False)
+    secrets = {"NOTIF_MAX_ATTEMPTS": 7, "NOTIF_METRICS_FILE": "metrics.json"}
+
+    runtime = na.configure_assignment_notification_worker(
+        lambda: None,
+        lambda: "",
+        "http://localhost",
+        **na.worker_settings(
+            lambda name, default: na._standalone_setting(name, default, secrets)
+        ),
+    )
+
+    assert runtime["max_attempts"] == 7
+    assert runtime["metrics_file"] == "metrics.json"
+    assert runtime["retry_max_seconds"] == 3600
+
+
+def test_admin_reads_the_metrics_file_the_worker_writes(monkeypatch):
+    monkeypatch.setenv("NOTIF_METRICS_FILE", "standalone.json")
+    monkeypatch.setattr(na, "_RUNTIME", {})
+    # Sin worker en el proceso: la misma resolución que el worker standalone.
+    assert na.configured_metrics_file() == "standalone.json"
+
+    na.configure_assignment_notification_worker(
+        lambda: None, lambda: "", "http://localhost", metrics_file="inprocess.json"
+    )
+    assert na.configured_metrics_file() == "inprocess.json"
@@ -0,0 +1,93 @@
+import smtplib
+
+import pytest
+
+import smtp_pool
+from smtp_pool import SmtpTransportPool
+
+
+class FakeSMTP:
+    """Sesión SMTP en memoria; `failures` son excepciones a lanzar en orden."""
+
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.failures = []
+        self.logged_in = False
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        self.logged_in = True
+
+    def sendmail(self, sender, recipients, message):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((sender, tuple(recipients), message))
+
+    def quit(self):
+        self.closed = True
+
+
+@pytest.fixture
+def pool():
+    FakeSMTP.instances = []
+    pool = SmtpTransportPool(
+        "smtp.local", 587, "user", "secret", idle_seconds=30, smtp_factory=FakeSMTP
+    )
+    yield pool
+    pool.close()
+
+
+def test_sessions_are_reused_between_sends(pool):
+    for index in range(3):
+        pool.send("app@local", [f"user{index}@local"], "mensaje")
+
+    assert pool.connections_opened == 1
+    assert pool.messages_sent == 3
+    assert len(FakeSMTP.instances[0].sent) == 3
+    assert FakeSMTP.instances[0].logged_in
+
+
+def test_dropped_session_reconnects_once(pool):
+    pool.send("app@local", ["a@local"], "primero")
+    FakeSMTP.instances[0].failures.append(smtplib.SMTPServerDisconnected())
+
+    pool.send("app@local", ["a@local"], "segundo")
+
+    assert pool.connections_opened == 2
+    assert FakeSMTP.instances[0].closed
+    assert FakeSMTP.instances[1].sent[0][2] == "segundo"
+
+
+def test_recipient_errors_keep_the_session(pool):
+    pool.send("app@local", ["a@local"], "primero")
+    FakeSMTP.instances[0].failures.append(
+        smtplib.SMTPRecipientsRefused({"b@local": (550, b"no existe")})
+    )
+
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send("app@local", ["b@local"], "rechazado")
+    pool.send("app@local", ["a@local"], "tercero")
+
+    assert pool.connections_opened == 1
+    assert not FakeSMTP.instances[0].closed
+
+
+def test_idle_sessions_are_pruned(pool, monkeypatch):
+    pool.send("app@local", ["a@local"], "mensaje")
+    now = smtp_pool.time.monotonic()
+    monkeypatch.setattr(smtp_pool.time, "monotonic", lambda: now + 31)
+
+    pool.prune_idle()
+    pool.send("app@local", ["a@local"], "otro")
+
+    assert FakeSMTP.instances[0].closed
+    assert pool.connections_opened == 2
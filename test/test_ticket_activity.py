@@ -0,0 +1,99 @@
+import pathlib
+
+from db_adapter import DBAdapter, apply_sqlite_schema
+from ticket_activity import fetch_activity_page
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def _read_statements(name):
+    text = (REPO_ROOT / name).read_text(encoding="utf-8")
+    return [chunk.strip() for chunk in text.split(";") if chunk.strip()]
+
+
+def _bootstrap(tmp_path):
+    adapter = DBAdapter(mode="sqlite", sqlite_path=str(tmp_path / "activity.db"))
+    conn = adapter.connect()
+    apply_sqlite_schema(conn, _read_statements("schema_sqlite.sql"))
+    apply_sqlite_schema(conn, _read_statements("seed_sqlite.sql"))
+    user_id = conn.execute("SELECT MIN(UserId) FROM Users").fetchone()[0]
+    ticket_id = conn.execute(
+        "INSERT INTO Tickets (Title, Description, RequesterId) VALUES ('t', 'd', ?)",
+        (user_id,),
+    ).lastrowid
+    conn.commit()
+    return conn, ticket_id
+
+
+def _insert_logs(conn, ticket_id, field_names, changed_at):
+    conn.executemany(
+        "INSERT INTO TicketLogs (TicketId, FieldName, NewValue, ChangedAt) "
+        "VALUES (?, ?, ?, ?)",
+        [(ticket_id, name, str(i), changed_at) for i, name in enumerate(field_names)],
+    )
+    conn.commit()
+
+
+def test_pages_cover_rows_with_equal_timestamps_once(tmp_path):
+    conn, ticket_id = _bootstrap(tmp_path)
+    try:
+        # Mismo ChangedAt en todas: el cursor no puede depender de la fecha.
+        _insert_logs(conn, ticket_id, ["comment"] * 5, "2026-01-01 10:00:00")
+        seen = []
+        after = None
+        while True:
+            rows, after = fetch_activity_page(
+                conn, "TicketLogs", ticket_id, True, after=after, page_size=2
+            )
+            seen.extend(row["LogId"] for row in rows)
+            if after is None:
+                break
+        assert seen == sorted(seen, reverse=True)
+        assert len(seen) == len(set(seen)) == 5
+    finally:
+        conn.close()
+
+
+def test_empty_type_selection_returns_empty_page(tmp_path):
+    conn, ticket_id = _bootstrap(tmp_path)
+    try:
+        _insert_logs(conn, ticket_id, ["comment", "Estado"], "2026-01-01 10:00:00")
+        all_rows, _ = fetch_activity_page(conn, "TicketLogs", ticket_id, True)
+        none_rows, cursor = fetch_activity_page(
+            conn, "TicketLogs", ticket_id, True, types=[]
+        )
+        comments, _ = fetch_activity_page(
+            conn, "TicketLogs", ticket_id, True, types=["comments"]
+        )
+        assert len(all_rows) == 2
+        assert (none_rows, cursor) == ([], None)
+        assert [row["Campo"] for row in comments] == ["comment"]
+    finally:
+        conn.close()
+
+
+def test_next_page_reads_the_index_in_order(tmp_path):
+    conn, ticket_id = _bootstrap(tmp_path)
+    try:
+        _insert_logs(conn, ticket_id, ["comment"] * 5, "2026-01-01 10:00:00")
+        statements = []
+        conn.set_trace_callback(statements.append)
+        fetch_activity_page(
+            conn,
+            "TicketLogs",
+            ticket_id,
+            True,
+            after=4,
+            archive_table="TicketLogsArchive",
+        )
+        conn.set_trace_callback(None)
+        page_sql = next(sql for sql in statements if "ORDER BY l.LogId" in sql)
+
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {page_sql}")]
+
+        # (TicketId, LogId DESC) en ambas tablas: "Cargar más" no ordena el historial.
+        assert not any("TEMP B-TREE" in step for step in plan)
+        assert any("IX_TicketLogs_TicketLogId" in step for step in plan)
+        assert any("IX_TicketLogsArchive_TicketLogId" in step for step in plan)
+    finally:
+        conn.close()
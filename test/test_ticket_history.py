@@ -0,0 +1,117 @@
+import pathlib
+from datetime import datetime
+
+from db_adapter import DBAdapter, apply_sqlite_schema
+from ticket_history import TicketHistory, summarize_time_in_state
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# (ChangedAt, OldValue, NewValue) de Estado; el ticket se crea el 1/1 en Abierto.
+ESTADO_CHANGES = [
+    ("2026-01-02 00:00:00", "Abierto", "En Progreso"),
+    ("2026-01-03 00:00:00", "En Progreso", "En Pausa"),
+    ("2026-01-04 00:00:00", "En Pausa", "En Progreso"),
+    ("2026-01-05 00:00:00", "En Progreso", "Resuelto"),
+]
+
+
+def _read_statements(name):
+    text = (REPO_ROOT / name).read_text(encoding="utf-8")
+    return [chunk.strip() for chunk in text.split(";") if chunk.strip()]
+
+
+def _bootstrap(tmp_path):
+    adapter = DBAdapter(mode="sqlite", sqlite_path=str(tmp_path / "history.db"))
+    conn = adapter.connect()
+    apply_sqlite_schema(conn, _read_statements("schema_sqlite.sql"))
+    apply_sqlite_schema(conn, _read_statements("seed_sqlite.sql"))
+    user_id = conn.execute("SELECT MIN(UserId) FROM Users").fetchone()[0]
+    resuelto = conn.execute(
+        "SELECT EstadoId FROM Estados WHERE Nombre = 'Resuelto'"
+    ).fetchone()[0]
+    ticket_id = conn.execute(
+        "INSERT INTO Tickets (Title, Description, RequesterId, EstadoId, CreatedAt) "
+        "VALUES ('t', 'd', ?, ?, '2026-01-01 00:00:00')",
+        (user_id, resuelto),
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO TicketLogs (TicketId, FieldName, OldValue, NewValue, ChangedAt) "
+        "VALUES (?, 'Estado', ?, ?, ?)",
+        [(ticket_id, old, new, at) for at, old, new in ESTADO_CHANGES],
+    )
+    conn.commit()
+    return adapter, conn, ticket_id
+
+
+def _estados_at(history, conn, ticket_id):
+    return [
+        (history.state_at(conn, ticket_id, as_of) or {}).get("Estado")
+        for as_of in (
+            "2025-12-31 00:00:00",
+            "2026-01-01 12:00:00",
+            "2026-01-03 12:00:00",
+            "2026-01-04 12:00:00",
+            "2026-01-06 00:00:00",
+        )
+    ]
+
+
+def test_state_at_matches_with_and_without_checkpoints(tmp_path):
+    adapter, conn, ticket_id = _bootstrap(tmp_path)
+    try:
+        history = TicketHistory(adapter)
+        expected = [None, "Abierto", "En Pausa", "En Progreso", "Resuelto"]
+        assert _estados_at(history, conn, ticket_id) == expected
+
+        assert history.write_checkpoints(conn, [ticket_id], every=2) == 2
+        conn.commit()
+        # Nada nuevo desde el último checkpoint: no se escribe otro.
+        assert history.write_checkpoints(conn, [ticket_id], every=2) == 0
+
+        # 4/1 12:00 parte del checkpoint del 3/1 y pliega hacia adelante.
+        assert _estados_at(history, conn, ticket_id) == expected
+    finally:
+        conn.close()
+
+
+def test_checkpoints_store_state_after_each_block(tmp_path):
+    adapter, conn, ticket_id = _bootstrap(tmp_path)
+    try:
+        history = TicketHistory(adapter)
+        history.write_checkpoints(conn, [ticket_id], every=2)
+        conn.commit()
+
+        checkpoint = history.latest_checkpoints(
+            conn, [ticket_id], as_of=datetime(2026, 1, 4, 12)
+        )[ticket_id]
+        log_id, as_of, state = checkpoint
+
+        assert as_of == datetime(2026, 1, 3)
+        assert state["Estado"] == "En Pausa"
+        assert state["Title"] == "t"
+        expected_log_id = conn.execute(
+            "SELECT LogId FROM TicketLogs WHERE ChangedAt = '2026-01-03 00:00:00'"
+        ).fetchone()[0]
+        assert log_id == expected_log_id
+    finally:
+        conn.close()
+
+
+def test_time_in_state_splits_segments_per_change(tmp_path):
+    adapter, conn, ticket_id = _bootstrap(tmp_path)
+    try:
+        history = TicketHistory(adapter)
+        segments = history.time_in_state(conn, [ticket_id], until=datetime(2026, 1, 6))
+
+        day = 86400
+        assert [(s["Estado"], s["Seconds"]) for s in segments] == [
+            ("Abierto", day),
+            ("En Progreso", day),
+            ("En Pausa", day),
+            ("En Progreso", day),
+            ("Resuelto", day),
+        ]
+        assert segments[-1]["LeftAt"] is None
+        assert summarize_time_in_state(segments)[ticket_id]["En Progreso"] == 2 * day
+    finally:
+        conn.close()
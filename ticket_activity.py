@@ -0,0 +1,121 @@
+from display_resolver import format_plain_value
+
+# Tipos de actividad del seguimiento -> etiqueta visible.
+ACTIVITY_TYPES = {
+    "comments": "Comentarios",
+    "changes": "Cambios de campos",
+    "subtasks": "Subtareas",
+    "notifications": "Notificaciones",
+}
+
+ACTIVITY_PAGE_SIZE = 50
+
+# Condición sobre FieldName de cada tipo; "changes" es todo lo demás.
+_TYPE_CONDITIONS = {
+    "comments": "l.FieldName = 'comment'",
+    "subtasks": "l.FieldName LIKE 'subtask%'",
+    "notifications": "l.FieldName LIKE 'Notificacion%'",
+}
+_TYPE_CONDITIONS["changes"] = "NOT ({})".format(
+    " OR ".join(_TYPE_CONDITIONS.values())
+)
+
+
+def classify_field(field_name):
+    name = str(field_name or "")
+    if name == "comment":
+        return "comments"
+    if name.startswith("subtask"):
+        return "subtasks"
+    if name.startswith("Notificacion"):
+        return "notifications"
+    return "changes"
+
+
+def fetch_activity_page(
+    conn,
+    logs_table,
+    ticket_id,
+    is_sqlite,
+    after=None,
+    page_size=ACTIVITY_PAGE_SIZE,
+    types=None,
+    resolve_username=None,
+    archive_table=None,
+):
+    """Una página del seguimiento, de la más nueva a la más vieja.
+
+    after es el cursor (LogId de la última fila de la página anterior); devuelve
+    (filas, cursor_siguiente) y cursor_siguiente es None al final. types=None
+    trae todos los tipos; una selección vacía devuelve una página vacía.
+    Con archive_table la página se arma sobre los logs en caliente y archivados.
+    """
+    page_size = max(1, int(page_size))
+    where = ["l.TicketId = ?"]
+    params = [ticket_id]
+    selected = [
+        t for t in (ACTIVITY_TYPES if types is None else types) if t in _TYPE_CONDITIONS
+    ]
+    if not selected:
+        return [], None
+    if len(selected) < len(ACTIVITY_TYPES):
+        where.append(
+            "(" + " OR ".join(_TYPE_CONDITIONS[t] for t in selected) + ")"
+        )
+    if after is not None:
+        # LogId es creciente y exacto; ChangedAt pierde precisión al pasar por
+        # pyodbc/pandas (DATETIME2) y el cursor podría saltear o repetir filas.
+        where.append("l.LogId < ?")
+        params.append(int(after))
+
+    # Se pide una fila extra para saber si hay otra página sin contar.
+    if is_sqlite:
+        top_clause, limit_clause = "", "LIMIT ?"
+    else:
+        top_clause, limit_clause = "TOP (?)", ""
+    columns = "l.LogId, l.ChangedAt, l.UserId, l.FieldName, l.OldValue, l.NewValue"
+    source = f"{logs_table} l WHERE {' AND '.join(where)}"
+    if archive_table:
+        # El archivo conserva LogId: el mismo cursor recorre ambas tablas.
+        source = f"""(
+            SELECT {columns} FROM {source}
+            UNION ALL
+            SELECT {columns} FROM {archive_table} l WHERE {' AND '.join(where)}
+        ) l"""
+        params = params + params
+    sql = f"""
+        SELECT {top_clause} {columns}
+        FROM {source}
+        ORDER BY l.LogId DESC
+        {limit_clause}
+    """
+    if is_sqlite:
+        params.append(page_size + 1)
+    else:
+        params.insert(0, page_size + 1)
+
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    raw_rows = cursor.fetchall()
+    has_more = len(raw_rows) > page_size
+    raw_rows = raw_rows[:page_size]
+
+    rows = []
+    for log_id, changed_at, user_id, field_name, old_value, new_value in raw_rows:
+        username = resolve_username(cursor, user_id) if resolve_username else None
+        rows.append(
+            {
+                "LogId": log_id,
+                "ChangedAt": changed_at,
+                "FechaHora": format_plain_value(changed_at),
+                "Usuario": username or "Sistema",
+                "Tipo": ACTIVITY_TYPES[classify_field(field_name)],
+                "Campo": field_name,
+                "Valor Anterior": old_value,
+                "Nuevo Valor": new_value,
+            }
+        )
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = rows[-1]["LogId"]
+    return rows, next_cursor
@@ -0,0 +1,310 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+DEFAULT_CHUNK_SIZE = 2000
+EXPORT_FILE_PREFIX = "gestar_export_"
+# Exportaciones nunca descargadas (p. ej. sesión cerrada) se borran pasado este tiempo.
+EXPORT_FILE_TTL_SECONDS = 3600
+
+EXPORT_FORMATS = {
+    "csv": {
+        "label": "CSV",
+        "extension": "csv",
+        "mime": "text/csv",
+    },
+    "xlsx": {
+        "label": "Excel (XLSX)",
+        "extension": "xlsx",
+        "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    },
+    "parquet": {
+        "label": "Parquet",
+        "extension": "parquet",
+        "mime": "application/vnd.apache.parquet",
+    },
+}
+
+
+def available_export_formats():
+    out = ["csv"]
+    if openpyxl is not None:
+        out.append("xlsx")
+    if pa is not None:
+        out.append("parquet")
+    return out
+
+
+def iter_cursor_chunks(cursor, chunk_size=DEFAULT_CHUNK_SIZE):
+    size = max(1, int(chunk_size))
+    while True:
+        rows = cursor.fetchmany(size)
+        if not rows:
+            break
+        yield rows
+
+
+def write_cursor_export(
+    cursor, export_format, target_path, chunk_size=DEFAULT_CHUNK_SIZE, on_progress=None
+):
+    """Vuelca el resultado de un cursor ya ejecutado a un archivo, por bloques."""
+    writers = {
+        "csv": _write_csv,
+        "xlsx": _write_xlsx,
+        "parquet": _write_parquet,
+    }
+    fmt = str(export_format or "").strip().lower()
+    if fmt not in writers:
+        raise ValueError(f"Formato de exportación no soportado: {export_format}")
+
+    columns = [c[0] for c in (cursor.description or [])]
+    chunks = iter_cursor_chunks(cursor, chunk_size)
+    return writers[fmt](columns, chunks, target_path, on_progress)
+
+
+def _notify(on_progress, rows_written):
+    if on_progress is not None:
+        on_progress(rows_written)
+
+
+def _write_csv(columns, chunks, target_path, on_progress):
+    rows_written = 0
+    # utf-8-sig para que Excel abra bien acentos al hacer doble click.
+    with open(target_path, "w", encoding="utf-8-sig", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows([[_plain_value(v) for v in row] for row in rows])
+            rows_written += len(rows)
+            _notify(on_progress, rows_written)
+    return rows_written
+
+
+def _write_xlsx(columns, chunks, target_path, on_progress):
+    if openpyxl is None:
+        raise RuntimeError("openpyxl no está instalado")
+    rows_written = 0
+    # write_only mantiene acotada la memoria: las filas se serializan al agregarlas.
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Tickets")
+    sheet.append(columns)
+    for rows in chunks:
+        for row in rows:
+            sheet.append([_xlsx_value(v) for v in row])
+        rows_written += len(rows)
+        _notify(on_progress, rows_written)
+    workbook.save(target_path)
+    return rows_written
+
+
+def _write_parquet(columns, chunks, target_path, on_progress):
+    if pa is None:
+        raise RuntimeError("pyarrow no está instalado")
+    rows_written = 0
+    writer = None
+    schema = None
+    try:
+        for rows in chunks:
+            column_values = [[row[i] for row in rows] for i in range(len(columns))]
+            if schema is None:
+                schema = _infer_parquet_schema(columns, column_values)
+                writer = pq.ParquetWriter(target_path, schema)
+            arrays = [
+                _to_arrow_array(values, schema.field(i).type)
+                for i, values in enumerate(column_values)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows_written += len(rows)
+            _notify(on_progress, rows_written)
+        if writer is None:
+            schema = pa.schema([(name, pa.string()) for name in columns])
+            writer = pq.ParquetWriter(target_path, schema)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows_written
+
+
+def _infer_parquet_schema(columns, column_values):
+    fields = []
+    for name, values in zip(columns, column_values):
+        try:
+            arrow_type = pa.array(values).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrow_type = pa.string()
+        if pa.types.is_null(arrow_type):
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _to_arrow_array(values, arrow_type):
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Tipado dinámico de SQLite: si un bloque no encaja, se exporta como texto.
+        if not pa.types.is_string(arrow_type):
+            raise
+        return pa.array(
+            [None if v is None else str(_plain_value(v)) for v in values],
+            type=arrow_type,
+        )
+
+
+def _plain_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0).isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+class ExportJob:
+    """Exportación en un hilo de fondo con progreso consultable desde la UI."""
+
+    def __init__(
+        self,
+        get_connection,
+        sql,
+        params,
+        export_format,
+        file_stem="export",
+        total_rows=None,
+        chunk_size=DEFAULT_CHUNK_SIZE,
+    ):
+        fmt = str(export_format or "").strip().lower()
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Formato de exportación no soportado: {export_format}")
+        self.job_id = uuid.uuid4().hex
+        self.export_format = fmt
+        self.file_name = f"{file_stem}.{EXPORT_FORMATS[fmt]['extension']}"
+        self.mime = EXPORT_FORMATS[fmt]["mime"]
+        self.total_rows = total_rows
+        self.rows_written = 0
+        self.status = "pending"  # pending | running | done | error
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._get_connection = get_connection
+        self._sql = sql
+        self._params = list(params or [])
+        self._chunk_size = chunk_size
+        fd, self.path = tempfile.mkstemp(prefix=EXPORT_FILE_PREFIX, suffix=f".{fmt}")
+        os.close(fd)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(0.99, self.rows_written / float(self.total_rows))
+
+    @property
+    def is_finished(self):
+        return self.status in ("done", "error")
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self.run,
+                name=f"tray-export-{self.job_id[:8]}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def run(self):
+        self.status = "running"
+        self.started_at = time.time()
+        conn = None
+        try:
+            conn = self._get_connection()
+            cursor = conn.cursor()
+            cursor.execute(self._sql, self._params)
+            self.rows_written = write_cursor_export(
+                cursor,
+                self.export_format,
+                self.path,
+                chunk_size=self._chunk_size,
+                on_progress=self._set_rows_written,
+            )
+            self.status = "done"
+        except Exception as exc:
+            self.error = str(exc)
+            self.status = "error"
+        finally:
+            self.finished_at = time.time()
+            if conn is not None:
+                conn.close()
+
+    def _set_rows_written(self, rows_written):
+        self.rows_written = rows_written
+
+    def read_bytes(self):
+        with open(self.path, "rb") as fh:
+            return fh.read()
+
+    def take_bytes(self):
+        """Contenido del archivo, que se borra después de leerlo (una descarga)."""
+        try:
+            return self.read_bytes()
+        finally:
+            self.cleanup()
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def cleanup_stale_exports(max_age_seconds=EXPORT_FILE_TTL_SECONDS, folder=None):
+    """Borra exportaciones viejas del directorio temporal; devuelve cuántas."""
+    folder = folder or tempfile.gettempdir()
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return 0
+    for name in names:
+        if not name.startswith(EXPORT_FILE_PREFIX):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
@@ -0,0 +1,294 @@
+import json
+from datetime import datetime, timezone
+
+from display_resolver import format_plain_value
+
+CHECKPOINT_TABLE = "TicketStateCheckpoints"
+
+# FieldName en TicketLogs -> columna de Tickets o (tabla, FK, columna de etiqueta).
+TRACKED_FIELDS = {
+    "Title": "Title",
+    "Description": "Description",
+    "Planta": ("Plantas", "PlantaId", "Nombre"),
+    "Area": ("Areas", "AreaId", "Nombre"),
+    "Categoria": ("Categorias", "CategoriaId", "Nombre"),
+    "Subcategoria": ("Subcategorias", "SubcategoriaId", "Nombre"),
+    "Prioridad": ("Prioridades", "PrioridadId", "Nombre"),
+    "Estado": ("Estados", "EstadoId", "Nombre"),
+    "Assignee": ("Users", "AssigneeId", "Username"),
+    "NeedByAt": "NeedByAt",
+}
+
+# Tope de parámetros por IN (Azure admite hasta 2100 por sentencia).
+_CHUNK_SIZE = 500
+
+
+def _to_datetime(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    text = str(value).strip().replace("T", " ")
+    for fmt in ("%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text[:26], fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _chunks(items, size=_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class TicketHistory:
+    """Estado de un ticket en cualquier fecha a partir de TicketLogs.
+
+    Los logs guardan valores visibles (nombres, no IDs); el estado reconstruido
+    usa la misma representación. Sin checkpoint se pliega hacia atrás desde el
+    estado actual; con checkpoint, hacia adelante desde el más cercano.
+    """
+
+    def __init__(self, adapter, archive_table=None):
+        self._adapter = adapter
+        self._qname = adapter.qname
+        self._logs_sources = [adapter.qname("TicketLogs")]
+        if archive_table:
+            self._logs_sources.append(archive_table)
+
+    def current_states(self, conn, ticket_ids):
+        """{TicketId: (CreatedAt, estado)} con los valores visibles de hoy."""
+        selects = []
+        joins = []
+        for index, (field, source) in enumerate(TRACKED_FIELDS.items()):
+            if isinstance(source, str):
+                selects.append(f"t.{source}")
+                continue
+            table, fk, label = source
+            alias = f"j{index}"
+            pk = "UserId" if table == "Users" else fk
+            selects.append(f"{alias}.{label}")
+            joins.append(
+                f"LEFT JOIN {self._qname(table)} {alias} ON {alias}.{pk} = t.{fk}"
+            )
+        states = {}
+        cursor = conn.cursor()
+        for chunk in _chunks(ticket_ids):
+            marks = ", ".join(["?"] * len(chunk))
+            cursor.execute(
+                f"""
+                SELECT t.TicketId, t.CreatedAt, {", ".join(selects)}
+                FROM {self._qname("Tickets")} t
+                {" ".join(joins)}
+                WHERE t.TicketId IN ({marks})
+                """,
+                chunk,
+            )
+            for row in cursor.fetchall():
+                state = {
+                    field: format_plain_value(value)
+                    for field, value in zip(TRACKED_FIELDS, row[2:])
+                }
+                states[row[0]] = (_to_datetime(row[1]), state)
+        return states
+
+    def field_logs(self, conn, ticket_ids, fields=None, after_log_ids=None):
+        """{TicketId: [(LogId, ChangedAt, FieldName, OldValue, NewValue), ...]}.
+
+        Orden cronológico; after_log_ids ({TicketId: LogId}) recorta lo ya plegado.
+        """
+        fields = list(fields or TRACKED_FIELDS)
+        field_marks = ", ".join(["?"] * len(fields))
+        after_log_ids = after_log_ids or {}
+        logs = {ticket_id: [] for ticket_id in ticket_ids}
+        cursor = conn.cursor()
+        for chunk in _chunks(ticket_ids):
+            marks = ", ".join(["?"] * len(chunk))
+            # El checkpoint más viejo del lote acota la lectura en la base.
+            min_after = min(after_log_ids.get(tid, 0) for tid in chunk)
+            union = " UNION ALL ".join(
+                f"""
+                SELECT LogId, TicketId, ChangedAt, FieldName, OldValue, NewValue
+                FROM {source}
+                WHERE TicketId IN ({marks}) AND FieldName IN ({field_marks})
+                  AND LogId > ?
+                """
+                for source in self._logs_sources
+            )
+            params = (list(chunk) + fields + [min_after]) * len(self._logs_sources)
+            cursor.execute(
+                f"SELECT * FROM ({union}) l ORDER BY l.TicketId, l.ChangedAt, l.LogId",
+                params,
+            )
+            for log_id, ticket_id, changed_at, field, old, new in cursor.fetchall():
+                if log_id <= after_log_ids.get(ticket_id, 0):
+                    continue
+                logs[ticket_id].append(
+                    (log_id, _to_datetime(changed_at), field, old, new)
+                )
+        return logs
+
+    def latest_checkpoints(self, conn, ticket_ids, as_of=None):
+        """{TicketId: (LogId, AsOf, estado)} del último checkpoint (<= as_of)."""
+        checkpoints = {}
+        cursor = conn.cursor()
+        for chunk in _chunks(ticket_ids):
+            marks = ", ".join(["?"] * len(chunk))
+            params = list(chunk)
+            as_of_clause = ""
+            if as_of is not None:
+                as_of_clause = "AND c.AsOf <= ?"
+                params.append(self._db_datetime(as_of))
+            cursor.execute(
+                f"""
+                SELECT c.TicketId, c.LogId, c.AsOf, c.State
+                FROM {self._qname(CHECKPOINT_TABLE)} c
+                WHERE c.TicketId IN ({marks}) {as_of_clause}
+                ORDER BY c.TicketId, c.LogId
+                """,
+                params,
+            )
+            for ticket_id, log_id, cp_as_of, state in cursor.fetchall():
+                # Queda el de mayor LogId por ticket.
+                checkpoints[ticket_id] = (
+                    log_id,
+                    _to_datetime(cp_as_of),
+                    json.loads(state),
+                )
+        return checkpoints
+
+    def state_at(self, conn, ticket_id, as_of):
+        """Estado visible del ticket en as_of (None si todavía no existía)."""
+        as_of = _to_datetime(as_of)
+        checkpoint = self.latest_checkpoints(conn, [ticket_id], as_of).get(ticket_id)
+        if checkpoint:
+            log_id, _cp_as_of, state = checkpoint
+            logs = self.field_logs(
+                conn, [ticket_id], after_log_ids={ticket_id: log_id}
+            )
+            for _log_id, changed_at, field, _old, new in logs[ticket_id]:
+                if changed_at > as_of:
+                    break
+                state[field] = new
+            return state
+
+        current = self.current_states(conn, [ticket_id]).get(ticket_id)
+        if current is None:
+            return None
+        created_at, state = current
+        if created_at is not None and as_of < created_at:
+            return None
+        logs = self.field_logs(conn, [ticket_id])
+        for _log_id, changed_at, field, old, _new in reversed(logs[ticket_id]):
+            if changed_at <= as_of:
+                break
+            state[field] = old
+        return state
+
+    def write_checkpoints(self, conn, ticket_ids, every=50):
+        """Guarda un checkpoint cada `every` cambios desde el último guardado.
+
+        Devuelve la cantidad escrita; el llamador hace commit.
+        """
+        every = max(1, int(every))
+        written = 0
+        cursor = conn.cursor()
+        for chunk in _chunks(ticket_ids):
+            checkpoints = self.latest_checkpoints(conn, chunk)
+            after = {tid: cp[0] for tid, cp in checkpoints.items()}
+            logs = self.field_logs(conn, chunk, after_log_ids=after)
+            pending = [tid for tid in chunk if len(logs[tid]) >= every]
+            if not pending:
+                continue
+            missing = [tid for tid in pending if tid not in checkpoints]
+            currents = self.current_states(conn, missing) if missing else {}
+            for ticket_id in pending:
+                if ticket_id in checkpoints:
+                    state = checkpoints[ticket_id][2]
+                elif ticket_id in currents:
+                    # Estado de alta: todo el log plegado hacia atrás desde hoy.
+                    state = currents[ticket_id][1]
+                    for _lid, _at, field, old, _new in reversed(logs[ticket_id]):
+                        state[field] = old
+                else:
+                    continue
+                for count, (log_id, changed_at, field, _old, new) in enumerate(
+                    logs[ticket_id], start=1
+                ):
+                    state[field] = new
+                    if count % every:
+                        continue
+                    cursor.execute(
+                        f"""
+                        INSERT INTO {self._qname(CHECKPOINT_TABLE)}
+                            (TicketId, LogId, AsOf, State)
+                        VALUES (?, ?, ?, ?)
+                        """,
+                        (
+                            ticket_id,
+                            log_id,
+                            self._db_datetime(changed_at),
+                            json.dumps(state, ensure_ascii=False),
+                        ),
+                    )
+                    written += 1
+        return written
+
+    def _db_datetime(self, value):
+        # SQLite guarda texto "YYYY-MM-DD HH:MM:SS"; pyodbc acepta datetime.
+        return format_plain_value(value) if self._adapter.is_sqlite else value
+
+    def time_in_state(self, conn, ticket_ids, field="Estado", until=None):
+        """Tramos por ticket: dicts TicketId, valor, EnteredAt, LeftAt, Seconds.
+
+        El último tramo queda abierto (LeftAt None) y se mide hasta `until`.
+        """
+        until = _to_datetime(until) or _utc_now()
+        segments = []
+        for chunk in _chunks(ticket_ids):
+            currents = self.current_states(conn, chunk)
+            logs = self.field_logs(conn, chunk, fields=[field])
+            for ticket_id in chunk:
+                if ticket_id not in currents:
+                    continue
+                created_at, state = currents[ticket_id]
+                changes = logs[ticket_id]
+                value = changes[0][3] if changes else state.get(field)
+                entered_at = created_at
+                for _log_id, changed_at, _field, _old, new in changes:
+                    segments.append(
+                        _segment(ticket_id, field, value, entered_at, changed_at)
+                    )
+                    value, entered_at = new, changed_at
+                segment = _segment(ticket_id, field, value, entered_at, until)
+                segment["LeftAt"] = None
+                segments.append(segment)
+        return segments
+
+
+def _utc_now():
+    # CreatedAt/ChangedAt se guardan en UTC sin zona.
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def _segment(ticket_id, field, value, entered_at, left_at):
+    seconds = None
+    if entered_at is not None and left_at is not None:
+        seconds = max(0, int((left_at - entered_at).total_seconds()))
+    return {
+        "TicketId": ticket_id,
+        field: value,
+        "EnteredAt": entered_at,
+        "LeftAt": left_at,
+        "Seconds": seconds,
+    }
+
+
+def summarize_time_in_state(segments, field="Estado"):
+    """{TicketId: {valor: segundos}} sumando los tramos."""
+    totals = {}
+    for segment in segments:
+        per_ticket = totals.setdefault(segment["TicketId"], {})
+        key = segment[field]
+        per_ticket[key] = per_ticket.get(key, 0) + (segment["Seconds"] or 0)
+    return totals
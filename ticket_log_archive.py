@@ -0,0 +1,116 @@
+ARCHIVE_TABLE = "TicketLogsArchive"
+
+# Estados cuyos tickets ya no reciben actividad habitual.
+ARCHIVABLE_ESTADOS = ("Cerrado", "Archivado")
+
+_LOG_COLUMNS = (
+    "LogId, TicketId, UserId, IsAi, FieldName, OldValue, NewValue, ChangedAt, "
+    "EventType, OldId, NewId"
+)
+
+
+def find_archivable_tickets(
+    conn,
+    is_sqlite,
+    logs_table,
+    tickets_table,
+    estados_table,
+    older_than_days,
+    limit,
+):
+    """Tickets cerrados/archivados hace más de N días que aún tienen logs en caliente."""
+    if is_sqlite:
+        top_clause, limit_clause = "", "LIMIT ?"
+        cutoff_sql = "datetime('now', '-' || ? || ' days')"
+    else:
+        top_clause, limit_clause = "TOP (?)", ""
+        cutoff_sql = "DATEADD(DAY, -?, SYSUTCDATETIME())"
+    estado_marks = ", ".join(["?"] * len(ARCHIVABLE_ESTADOS))
+    params = [*ARCHIVABLE_ESTADOS, int(older_than_days)]
+    if is_sqlite:
+        params.append(int(limit))
+    else:
+        params.insert(0, int(limit))
+    cursor = conn.cursor()
+    cursor.execute(
+        f"""
+        SELECT {top_clause} t.TicketId
+        FROM {tickets_table} t
+        JOIN {estados_table} e ON e.EstadoId = t.EstadoId
+        WHERE e.Nombre IN ({estado_marks})
+          AND COALESCE(t.ClosedAt, t.UpdatedAt) <= {cutoff_sql}
+          AND EXISTS (SELECT 1 FROM {logs_table} l WHERE l.TicketId = t.TicketId)
+        ORDER BY t.TicketId
+        {limit_clause}
+        """,
+        params,
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def archive_ticket_logs(
+    conn,
+    is_sqlite,
+    logs_table,
+    archive_table,
+    tickets_table,
+    estados_table,
+    older_than_days=180,
+    batch_tickets=50,
+    max_batches=None,
+    dry_run=False,
+):
+    """Mueve los logs de tickets cerrados a archive_table en lotes acotados.
+
+    Cada lote (hasta batch_tickets tickets) es una transacción propia: copia y
+    borra, así un corte a mitad de camino no duplica ni pierde filas.
+    """
+    batch_tickets = max(1, int(batch_tickets))
+    totals = {"batches": 0, "tickets": 0, "rows": 0}
+    while max_batches is None or totals["batches"] < int(max_batches):
+        ticket_ids = find_archivable_tickets(
+            conn,
+            is_sqlite,
+            logs_table,
+            tickets_table,
+            estados_table,
+            older_than_days,
+            batch_tickets,
+        )
+        if not ticket_ids:
+            break
+        marks = ", ".join(["?"] * len(ticket_ids))
+        cursor = conn.cursor()
+        if dry_run:
+            cursor.execute(
+                f"SELECT COUNT(1) FROM {logs_table} WHERE TicketId IN ({marks})",
+                ticket_ids,
+            )
+            totals["batches"] += 1
+            totals["tickets"] += len(ticket_ids)
+            totals["rows"] += int(cursor.fetchone()[0] or 0)
+            # Sin mover filas el mismo lote volvería a salir: se informa uno solo.
+            break
+        try:
+            cursor.execute(
+                f"""
+                INSERT INTO {archive_table} ({_LOG_COLUMNS})
+                SELECT {_LOG_COLUMNS}
+                FROM {logs_table}
+                WHERE TicketId IN ({marks})
+                """,
+                ticket_ids,
+            )
+            cursor.execute(
+                f"DELETE FROM {logs_table} WHERE TicketId IN ({marks})",
+                ticket_ids,
+            )
+            moved = cursor.rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        totals["batches"] += 1
+        totals["tickets"] += len(ticket_ids)
+        totals["rows"] += max(0, moved)
+    return totals